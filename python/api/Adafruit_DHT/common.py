@@ -18,6 +18,10 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import asyncio
+import functools
+import random
+import threading
 import time
 
 from . import platform_detect
@@ -38,8 +42,12 @@ AM2302 = 22
 SENSORS = [DHT11, DHT22, AM2302]
 
 
+@functools.lru_cache(maxsize=None)
 def get_platform():
-    """Return a DHT platform interface for the currently detected platform."""
+    """Return a DHT platform interface for the currently detected platform.
+    Detection parses /proc/cpuinfo, so the result is cached after the first
+    successful call (a failed detection raises and is tried again next time).
+    """
     plat = platform_detect.platform_detect()
     if plat == platform_detect.RASPBERRY_PI:
         # Check for version 1 or 2 of the pi.
@@ -62,6 +70,76 @@ def get_platform():
     else:
         raise RuntimeError('Unknown platform.')
 
+class ReadStats(object):
+    """Attempt and failure counters of one sensor (type and pin)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = 0
+        self.failed_attempts = 0
+        self.errors = 0
+        self.reads = 0
+        self.failed_reads = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success = None
+
+    def record_attempt(self, ok, error=None):
+        with self.lock:
+            self.attempts += 1
+            if ok:
+                self.consecutive_failures = 0
+                self.last_success = time.time()
+            else:
+                self.failed_attempts += 1
+                self.consecutive_failures += 1
+            if error is not None:
+                self.errors += 1
+                self.last_error = error
+
+    def record_read(self, ok):
+        with self.lock:
+            self.reads += 1
+            if not ok:
+                self.failed_reads += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'attempts': self.attempts,
+                'failed_attempts': self.failed_attempts,
+                'attempt_error_rate': round(self.failed_attempts / self.attempts, 4) if self.attempts else None,
+                'errors': self.errors,
+                'reads': self.reads,
+                'failed_reads': self.failed_reads,
+                'consecutive_failures': self.consecutive_failures,
+                'last_error': self.last_error,
+                'last_success': self.last_success
+            }
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _stats_for(sensor, pin):
+    with _stats_lock:
+        stats = _stats.get((sensor, pin))
+        if stats is None:
+            stats = _stats[(sensor, pin)] = ReadStats()
+        return stats
+
+def get_stats(sensor=None, pin=None):
+    """Return the read statistics of the sensor on the specified pin as a dict
+    (attempts, failed attempts and their rate, errors raised by the driver,
+    retried reads that gave up, consecutive failures, last error and the
+    time of the last good reading). Without arguments, return a dict of all
+    sensors keyed by 'sensor:pin'.
+    """
+    if sensor is not None:
+        return _stats_for(sensor, pin).as_dict()
+    with _stats_lock:
+        items = list(_stats.items())
+    return {'{0}:{1}'.format(key[0], key[1]): stats.as_dict() for key, stats in items}
+
 def read(sensor, pin, platform=None):
     """Read DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
     specified pin and return a tuple of humidity (as a floating point value
@@ -78,9 +156,45 @@ def read(sensor, pin, platform=None):
         raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
     if platform is None:
         platform = get_platform()
-    return platform.read(sensor, pin)
+    stats = _stats_for(sensor, pin)
+    try:
+        humidity, temperature = platform.read(sensor, pin)
+    except Exception as e:
+        stats.record_attempt(False, str(e))
+        raise
+    stats.record_attempt(humidity is not None and temperature is not None)
+    return (humidity, temperature)
 
-def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None):
+def _retry_delays(retries, delay_seconds, deadline, backoff, max_delay_seconds, jitter):
+    """Yield the pause before each retry, then None once the retry count or the
+    deadline (a time.monotonic() value) leaves no room for another attempt.
+    Pauses start at delay_seconds, grow by the backoff factor up to
+    max_delay_seconds and get up to jitter * pause added at random, so they
+    never drop below the minimum sensor read interval and sensors that fail
+    together do not retry in lockstep.
+    """
+    if retries is None and deadline is None:
+        raise ValueError('Expected a retry count, a deadline or both.')
+    if retries is not None and retries < 1:
+        # As before the deadline support: no retries means no read at all.
+        return
+    delay = delay_seconds
+    attempt = 1
+    while retries is None or attempt < retries:
+        pause = delay + random.uniform(0, jitter * delay)
+        if max_delay_seconds is not None:
+            pause = min(pause, max_delay_seconds)
+        if deadline is not None and time.monotonic() + pause >= deadline:
+            break
+        yield pause
+        attempt += 1
+        delay *= backoff
+        if max_delay_seconds is not None:
+            delay = min(delay, max_delay_seconds)
+    yield None
+
+def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None,
+               deadline_seconds=None, backoff=1, max_delay_seconds=None, jitter=0):
     """Read DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
     specified pin and return a tuple of humidity (as a floating point value
     in percent) and temperature (as a floating point value in Celsius).
@@ -89,10 +203,47 @@ def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None):
     found. If a good reading cannot be found after the amount of retries, a tuple
     of (None, None) is returned. The delay between retries is by default 2
     seconds, but can be overridden.
+    deadline_seconds bounds the total time spent instead (set retries to None
+    to rely on the deadline alone): no retry is started that could not begin
+    before it. backoff multiplies the delay after every failed attempt (capped
+    at max_delay_seconds) and jitter adds up to that fraction of the delay at
+    random. The defaults keep the original 15 x 2 second behaviour.
     """
-    for i in range(retries):
+    deadline = None if deadline_seconds is None else time.monotonic() + deadline_seconds
+    stats = _stats_for(sensor, pin)
+    for pause in _retry_delays(retries, delay_seconds, deadline, backoff, max_delay_seconds, jitter):
         humidity, temperature = read(sensor, pin, platform)
         if humidity is not None and temperature is not None:
+            stats.record_read(True)
+            return (humidity, temperature)
+        if pause is None:
+            break
+        time.sleep(pause)
+    stats.record_read(False)
+    return (None, None)
+
+async def read_retry_async(sensor, pin, retries=None, delay_seconds=2, platform=None,
+                           deadline_seconds=10, backoff=1.5, max_delay_seconds=8, jitter=0.25,
+                           executor=None):
+    """Awaitable read_retry for asyncio code. Each read runs in an executor
+    (the driver busy-waits on the GPIO pin) and the pauses between attempts
+    are asyncio sleeps, so a flaky sensor never blocks the event loop or
+    holds a worker thread while waiting. By default it retries with
+    exponential backoff and jitter until a 10 second deadline.
+    """
+    if platform is None:
+        # Resolve once here so the executor threads never race on detection.
+        platform = get_platform()
+    loop = asyncio.get_running_loop()
+    deadline = None if deadline_seconds is None else time.monotonic() + deadline_seconds
+    stats = _stats_for(sensor, pin)
+    for pause in _retry_delays(retries, delay_seconds, deadline, backoff, max_delay_seconds, jitter):
+        humidity, temperature = await loop.run_in_executor(executor, read, sensor, pin, platform)
+        if humidity is not None and temperature is not None:
+            stats.record_read(True)
             return (humidity, temperature)
-        time.sleep(delay_seconds)
+        if pause is None:
+            break
+        await asyncio.sleep(pause)
+    stats.record_read(False)
     return (None, None)
@@ -0,0 +1,68 @@
+import io
+import sys
+import time
+import numpy as np
+from PIL import Image
+from image_decode import decode_image
+
+RESOLUTIONS = [(640, 480), (1920, 1080), (2592, 1944), (4000, 3000)]
+TARGET_SIZE = 224  # imgsz of the final-version model
+REPEATS = 10
+
+
+def make_image(width, height, fmt="jpeg", quality=90):
+    """Synthetic camera-like image (JPEG or PNG): smooth gradients plus sensor noise"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 4, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    if fmt == "png":
+        Image.fromarray(noisy).save(buffer, "PNG")
+    else:
+        Image.fromarray(noisy).save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def full_decode(data):
+    """
+    Decode path used before draft mode: full-size RGB array, followed by
+    the shorter-side resize the classifier then applies to it
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    array = np.array(image)
+    scale = TARGET_SIZE / min(image.size)
+    image.resize((round(image.width * scale), round(image.height * scale)), Image.BILINEAR)
+    return array
+
+
+def median_ms(fn, data):
+    timings = []
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), result
+
+
+def benchmark():
+    print(f"{'source':>11} {'jpeg KB':>8} {'full ms':>8} {'full MB':>8} {'fast ms':>8} {'fast MB':>8} {'speedup':>8}")
+    for width, height in RESOLUTIONS:
+        data = make_image(width, height)
+        full_ms, full = median_ms(full_decode, data)
+        fast_ms, (fast, _) = median_ms(lambda d: decode_image(d, TARGET_SIZE), data)
+        print(f"{width:>5}x{height:<5} {len(data) / 1024:>8.0f} {full_ms:>8.1f} {full.nbytes / 2**20:>8.1f} "
+              f"{fast_ms:>8.1f} {fast.nbytes / 2**20:>8.2f} {full_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        REPEATS = int(sys.argv[1])
+    benchmark()
+
+
+# how to run
+# python bench_decode.py [repeats]
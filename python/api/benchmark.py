@@ -0,0 +1,305 @@
+"""
+Inference Benchmark - Throughput and Latency Suite
+Drives PredictionService in process or the API over HTTP with synthetic
+images, sweeping concurrency and batch size, and compares runs against a
+stored baseline
+"""
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import config
+from bench_decode import make_image
+from metrics import latency_summary
+
+RESULTS_VERSION = 1
+# Per-image stages of the speed block (preprocess_ms covers decoding)
+STAGES = {
+    "decode": "preprocess_ms",
+    "queue_wait": "queue_wait_ms",
+    "inference": "inference_ms",
+    "postprocess": "postprocess_ms"
+}
+
+
+def parse_list(value: str) -> List[int]:
+    """Comma separated integers, e.g. "1,2,4" """
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+class ImageSource:
+    """
+    Endless supply of distinct copies of one encoded image
+    
+    A counter is appended after the end of the image data: decoders ignore
+    it, but every copy hashes differently, so the prediction cache never
+    answers a benchmark request.
+    """
+    
+    def __init__(self, image: bytes):
+        self.image = image
+        self._counter = count()
+        self._lock = threading.Lock()
+    
+    def take(self, size: int) -> List[bytes]:
+        with self._lock:
+            ids = [next(self._counter) for _ in range(size)]
+        return [self.image + idx.to_bytes(8, "little") for idx in ids]
+
+
+def service_target() -> Tuple[str, Callable[[List[bytes]], List[Dict[str, Any]]]]:
+    """
+    In-process target: the configured PredictionService, loaded and warmed up
+    
+    Returns:
+        Description and a function classifying a batch, returning the
+        per-image speed blocks
+    """
+    from predict_service import get_prediction_service
+    
+    service = get_prediction_service()
+    service.warmup()
+    
+    def run(images: List[bytes]) -> List[Dict[str, Any]]:
+        if len(images) == 1:
+            return [service.predict_image_bytes(images[0])["speed"]]
+        result = service.predict_batch_bytes(images)
+        if result["failed_predictions"]:
+            raise RuntimeError(result["errors"][0]["error"])
+        return [prediction["speed"] for prediction in result["predictions"]]
+    
+    return f"service ({service.backend_name}, {service.precision}, {config.INFERENCE_MODE})", run
+
+
+def http_target(url: str) -> Tuple[str, Callable[[List[bytes]], List[Dict[str, Any]]]]:
+    """
+    HTTP target: a running API, one keep-alive client per benchmark thread
+    
+    Single images go to /api/predict/raw, batches to /api/predict/upload/batch.
+    """
+    import httpx
+    
+    url = url.rstrip("/")
+    clients = threading.local()
+    content_type = "image/png" if config.BENCH_IMAGE_FORMAT == "png" else "image/jpeg"
+    
+    def run(images: List[bytes]) -> List[Dict[str, Any]]:
+        client = getattr(clients, "client", None)
+        if client is None:
+            client = clients.client = httpx.Client(timeout=60)
+        if len(images) == 1:
+            response = client.post(f"{url}/api/predict/raw", content=images[0],
+                                   headers={"Content-Type": content_type})
+        else:
+            files = [("files", (f"bench{idx}", image, content_type)) for idx, image in enumerate(images)]
+            response = client.post(f"{url}/api/predict/upload/batch", files=files)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        data = response.json()["data"]
+        if len(images) == 1:
+            return [data["speed"]]
+        return [prediction["speed"] for prediction in data["predictions"]]
+    
+    return f"http ({url})", run
+
+
+def run_scenario(run: Callable[[List[bytes]], List[Dict[str, Any]]], source: ImageSource,
+                 concurrency: int, batch_size: int, requests: int) -> Dict[str, Any]:
+    """
+    Send requests batches of batch_size images from concurrency threads
+    
+    Returns:
+        Scenario result with throughput, request latency and per-stage image latency percentiles
+    """
+    # One untimed request per thread: connections, batcher and allocations warmed up
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: run(source.take(batch_size)), range(concurrency)))
+    
+    latencies = []
+    stages = {stage: [] for stage in STAGES}
+    batch_sizes = []
+    errors = []
+    remaining = count()
+    lock = threading.Lock()
+    
+    def worker() -> None:
+        while next(remaining) < requests:
+            images = source.take(batch_size)
+            start = time.perf_counter()
+            try:
+                speeds = run(images)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                for speed in speeds:
+                    for stage, key in STAGES.items():
+                        stages[stage].append(speed[key])
+                    batch_sizes.append(speed.get("batch_size", 1))
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    
+    return {
+        "name": f"c{concurrency}-b{batch_size}",
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "requests": len(latencies),
+        "images": len(latencies) * batch_size,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2),
+        "images_per_s": round(len(latencies) * batch_size / wall, 2),
+        "latency_ms": latency_summary(latencies),
+        "stage_ms": {stage: latency_summary(values) for stage, values in stages.items()},
+        "mean_model_batch": round(float(np.mean(batch_sizes)), 2) if batch_sizes else 0.0
+    }
+
+
+def benchmark(target: str = "service", url: str = None, output_path: str = None) -> Dict[str, Any]:
+    """
+    Run every concurrency x batch size scenario against one target
+    
+    Args:
+        target: "service" (in process) or "http"
+        url: API base URL for the http target (default config.BENCH_URL)
+        output_path: Results file (default benchmark-<target>.json)
+    
+    Returns:
+        Results dictionary, also written to output_path
+    """
+    width, height = (int(side) for side in config.BENCH_IMAGE_SIZE.lower().split("x"))
+    image = make_image(width, height, config.BENCH_IMAGE_FORMAT)
+    if target == "http":
+        description, run = http_target(url or config.BENCH_URL)
+    else:
+        description, run = service_target()
+    source = ImageSource(image)
+    
+    print(f"Benchmarking {description}: {width}x{height} {config.BENCH_IMAGE_FORMAT} "
+          f"({len(image) / 1024:.0f} KB), {config.BENCH_REQUESTS} request(s) per scenario")
+    print(f"{'scenario':>10} {'img/s':>8} {'req p50':>8} {'req p95':>8} {'req p99':>8} "
+          f"{'decode':>7} {'queue':>7} {'infer':>7} {'post':>7} {'errors':>6}")
+    scenarios = []
+    for concurrency in parse_list(config.BENCH_CONCURRENCY):
+        for batch_size in parse_list(config.BENCH_BATCH_SIZES):
+            result = run_scenario(run, source, concurrency, batch_size, config.BENCH_REQUESTS)
+            scenarios.append(result)
+            stage = result["stage_ms"]
+            print(f"{result['name']:>10} {result['images_per_s']:>8.1f} {result['latency_ms']['p50']:>8.2f} "
+                  f"{result['latency_ms']['p95']:>8.2f} {result['latency_ms']['p99']:>8.2f} "
+                  f"{stage['decode']['p50']:>7.2f} {stage['queue_wait']['p50']:>7.2f} "
+                  f"{stage['inference']['p50']:>7.2f} {stage['postprocess']['p50']:>7.2f} {result['errors']:>6}")
+    
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": description,
+        "image": {"width": width, "height": height, "format": config.BENCH_IMAGE_FORMAT, "bytes": len(image)},
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "backend": config.INFERENCE_BACKEND,
+            "precision": config.MODEL_PRECISION,
+            "inference_mode": config.INFERENCE_MODE,
+            "batching": config.BATCH_ENABLED
+        },
+        "scenarios": scenarios
+    }
+    output_path = output_path or f"benchmark-{target}.json"
+    with open(output_path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"Results written to {output_path}")
+    return results
+
+
+def compare(baseline_path: str, results_path: str, tolerance: float = None) -> List[str]:
+    """
+    Flag scenarios that got slower than the baseline
+    
+    A scenario regresses when its image throughput dropped, or its p50 / p95
+    request latency grew, by more than tolerance (relative). Scenarios missing
+    from either file are skipped.
+    
+    Args:
+        baseline_path: Stored results of the reference build
+        results_path: Results to check
+        tolerance: Allowed relative change (default config.BENCH_REGRESSION_TOLERANCE)
+    
+    Returns:
+        One message per regression, empty when the results pass
+    """
+    tolerance = config.BENCH_REGRESSION_TOLERANCE if tolerance is None else tolerance
+    with open(baseline_path) as baseline_file:
+        baseline = {scenario["name"]: scenario for scenario in json.load(baseline_file)["scenarios"]}
+    with open(results_path) as results_file:
+        results = {scenario["name"]: scenario for scenario in json.load(results_file)["scenarios"]}
+    
+    regressions = []
+    print(f"{'scenario':>10} {'img/s':>18} {'req p50 ms':>20} {'req p95 ms':>20}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        checks = [
+            ("throughput", reference["images_per_s"], result["images_per_s"], -1),
+            ("p50", reference["latency_ms"]["p50"], result["latency_ms"]["p50"], 1),
+            ("p95", reference["latency_ms"]["p95"], result["latency_ms"]["p95"], 1)
+        ]
+        cells = []
+        for metric, old, new, direction in checks:
+            change = (new - old) / old if old else 0.0
+            cells.append(f"{old:>8.1f} -> {new:<8.1f} {change:>+5.0%}")
+            if change * direction > tolerance:
+                regressions.append(f"{name}: {metric} {old:g} -> {new:g} ({change:+.1%})")
+        if result["errors"] > reference["errors"]:
+            regressions.append(f"{name}: errors {reference['errors']} -> {result['errors']}")
+        print(f"{name:>10} " + " ".join(cells))
+    
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) beyond {tolerance:.0%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark.py service [results.json]")
+        print("       python benchmark.py http [base_url] [results.json]")
+        print("       python benchmark.py compare <baseline.json> <results.json> [tolerance]")
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == "service":
+        benchmark("service", output_path=sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == "http":
+        benchmark("http", sys.argv[2] if len(sys.argv) > 2 else None, sys.argv[3] if len(sys.argv) > 3 else None)
+    elif command == "compare" and len(sys.argv) >= 4:
+        found = compare(sys.argv[2], sys.argv[3], float(sys.argv[4]) if len(sys.argv) > 4 else None)
+        sys.exit(1 if found else 0)
+    else:
+        print(f"Unknown command: {command}")
+
+
+# how to run
+# python benchmark.py service baseline.json
+# BENCH_CONCURRENCY=1,4,8 BENCH_BATCH_SIZES=1,16 python benchmark.py service current.json
+# python benchmark.py http http://localhost:8000 current.json    (API started with main.py)
+# python benchmark.py compare baseline.json current.json 0.1      (exit code 1 on regression)
@@ -0,0 +1,180 @@
+"""
+Bulk Manifest - Resumable Bulk Classification
+Append-only JSONL record of the images a bulk run classified, so reruns skip
+files that did not change since
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+# (size, mtime_ns, content hash, class, confidence) per image path relative to the root
+Entry = Tuple[int, int, str, str, float]
+
+
+def content_hash(data: bytes) -> str:
+    """Short BLAKE2 digest of an image file's bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def manifest_path_for(root: str) -> Path:
+    """Default manifest of a folder: one file per absolute folder path in BULK_MANIFEST_DIR"""
+    key = hashlib.blake2b(os.path.abspath(root).encode(), digest_size=8).hexdigest()
+    return Path(config.BULK_MANIFEST_DIR) / f"{Path(os.path.abspath(root)).name or 'root'}-{key}.jsonl"
+
+
+class BulkManifest:
+    """
+    Completed images of a folder, one JSON line each, newest line per path wins
+    
+    The first line is a header with the model fingerprint; a manifest written
+    by another model (or backend, precision, decode size) is discarded. Lines
+    are buffered and written + fsynced every flush_records lines or
+    flush_interval seconds, a torn last line left by a crash is cut off on
+    open. When most lines are superseded the file is rewritten compacted.
+    """
+    
+    def __init__(self, path: str, model: str, flush_records: int = None, flush_interval: float = None):
+        """
+        Open (or create) a manifest
+        
+        Args:
+            path: Manifest file
+            model: Fingerprint of the model the results come from
+            flush_records: Lines buffered before a write (default config.BULK_MANIFEST_FLUSH_RECORDS)
+            flush_interval: Seconds before buffered lines are written anyway
+                (default config.BULK_MANIFEST_FLUSH_SECONDS)
+        """
+        self.path = Path(path)
+        self.model = model
+        self.flush_records = flush_records or config.BULK_MANIFEST_FLUSH_RECORDS
+        self.flush_interval = config.BULK_MANIFEST_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self.entries: Dict[str, Entry] = {}
+        self.appended = 0
+        self.flushes = 0
+        self.recovered_bytes = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lines = self._load()
+        # Missing / other model, or mostly superseded lines
+        if lines is None or lines > 2 * len(self.entries) + 1000:
+            self._rewrite()
+        self._file = open(self.path, "a", encoding="utf-8")
+    
+    def _load(self) -> Optional[int]:
+        """
+        Read the manifest into self.entries
+        
+        Returns:
+            Number of entry lines, or None when there is no usable manifest
+        """
+        try:
+            manifest_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with manifest_file:
+            header = manifest_file.readline()
+            try:
+                header_fields = json.loads(header)
+            except ValueError:
+                header_fields = {}
+            if header_fields.get("model") != self.model or header_fields.get("version") != MANIFEST_VERSION:
+                logger.info(f"Manifest {self.path} belongs to another model, starting over")
+                return None
+            valid = len(header)
+            lines = 0
+            for line in manifest_file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn line")
+                    record = json.loads(line)
+                    entry = (record["size"], record["mtime_ns"], record["hash"], record["class"], record["confidence"])
+                except (ValueError, KeyError):
+                    break
+                self.entries[record["path"]] = entry
+                valid += len(line)
+                lines += 1
+        size = self.path.stat().st_size
+        if valid != size:
+            with open(self.path, "r+b") as manifest_file:
+                manifest_file.truncate(valid)
+                os.fsync(manifest_file.fileno())
+            self.recovered_bytes = size - valid
+        return lines
+    
+    def _rewrite(self) -> None:
+        """Write header and current entries to a fresh file (atomically, via a temporary file)"""
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(json.dumps({"version": MANIFEST_VERSION, "model": self.model}) + "\n")
+            for path, entry in self.entries.items():
+                manifest_file.write(self._line(path, entry))
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(temp_path, self.path)
+    
+    @staticmethod
+    def _line(path: str, entry: Entry) -> str:
+        size, mtime_ns, digest, class_name, confidence = entry
+        return json.dumps({"path": path, "size": size, "mtime_ns": mtime_ns, "hash": digest,
+                           "class": class_name, "confidence": confidence}) + "\n"
+    
+    def lookup(self, path: str, size: int, mtime_ns: int) -> Optional[Entry]:
+        """Recorded entry of path if the file's size and modification time are unchanged"""
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return entry
+        return None
+    
+    def lookup_content(self, path: str, digest: str) -> Optional[Entry]:
+        """Recorded entry of path if the file content is unchanged (e.g. only touched or copied)"""
+        entry = self.entries.get(path)
+        if entry is not None and entry[2] == digest:
+            return entry
+        return None
+    
+    def add(self, path: str, entry: Entry) -> None:
+        """
+        Buffer one completed image, writing the buffer when it is due
+        
+        Entries loaded at open are not updated, lookups during a run see the
+        previous run's state.
+        """
+        self._buffer.append(self._line(path, entry))
+        self.appended += 1
+        if len(self._buffer) >= self.flush_records or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write and fsync every buffered line"""
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer = []
+            self.flushes += 1
+        self._last_flush = time.monotonic()
+    
+    def close(self) -> None:
+        """Flush and close the manifest"""
+        self.flush()
+        self._file.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and write counters"""
+        return {
+            "path": str(self.path),
+            "entries": len(self.entries),
+            "appended": self.appended,
+            "flushes": self.flushes,
+            "recovered_bytes": self.recovered_bytes
+        }
@@ -0,0 +1,83 @@
+"""
+Import-Time Budget Check
+Measures `import main` with `python -X importtime` in a fresh interpreter
+and fails when it exceeds the budget or pulls in the ML stack too early
+"""
+import os
+import subprocess
+import sys
+
+# Milliseconds `import main` may take; sensor nodes should boot well under a second
+DEFAULT_BUDGET_MS = 1000
+# Modules that must only load together with the model, never at import time
+HEAVY_MODULES = ("torch", "ultralytics", "cv2", "numpy", "PIL", "onnxruntime", "openvino")
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(env_overrides):
+    """
+    Import main in a subprocess with -X importtime
+    
+    Args:
+        env_overrides: Environment variables for the subprocess (e.g. PREDICTION_ENABLED)
+    
+    Returns:
+        Tuple of the cumulative import time of main in ms, set of imported
+        top-level packages and the slowest direct imports of main as
+        (ms, module) pairs
+    """
+    env = {**os.environ, **env_overrides}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{completed.stderr[-2000:]}")
+    
+    total_us = 0
+    packages = set()
+    direct = []
+    for line in completed.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        module = name.rstrip()
+        packages.add(module.strip().split(".")[0])
+        # Nesting is shown by indentation: " main", "   fastapi", ...
+        depth = (len(module) - len(module.lstrip())) // 2
+        if module.strip() == "main" and depth == 0:
+            total_us = int(cumulative)
+        elif depth == 1:
+            direct.append((int(cumulative) / 1000, module.strip()))
+    return total_us / 1000, packages, sorted(direct, reverse=True)[:8]
+
+
+def check(name, env_overrides, budget_ms, forbidden):
+    """Measure one startup mode and print whether it meets the budget"""
+    total_ms, packages, slowest = measure(env_overrides)
+    loaded_heavy = sorted(module for module in forbidden if module in packages)
+    ok = total_ms <= budget_ms and not loaded_heavy
+    
+    print(f"{'OK  ' if ok else 'FAIL'} {name}: import main {total_ms:.0f} ms (budget {budget_ms} ms)")
+    for module_ms, module in slowest:
+        print(f"       {module_ms:>8.1f} ms  {module}")
+    if loaded_heavy:
+        print(f"       heavy modules imported: {', '.join(loaded_heavy)}")
+    return ok
+
+
+if __name__ == "__main__":
+    budget_ms = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    
+    results = [
+        # Sensor-only node: prediction router not even imported
+        check("sensor-only (PREDICTION_ENABLED=False)", {"PREDICTION_ENABLED": "False"}, budget_ms, HEAVY_MODULES),
+        # Full API: the router is imported, the ML stack loads later in the startup hook
+        check("full API (model loads at startup)", {"PREDICTION_ENABLED": "True"}, budget_ms, HEAVY_MODULES)
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+# how to run
+# python check_import_time.py [budget_ms]
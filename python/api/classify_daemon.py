@@ -0,0 +1,314 @@
+"""
+Classification Daemon - Resident Model for CLI Tools
+Keeps the prediction service loaded behind a Unix domain socket, so
+single-classify.py / multi.py calls skip the torch and model start-up
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import config
+
+# Frame: header length, payload length, JSON header, binary payload
+FRAME = struct.Struct("<II")
+MAX_HEADER_BYTES = 1 << 20
+
+
+class DaemonError(Exception):
+    """Raised when the daemon answers a request with an error"""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly size bytes, b"" if the peer closed before the first byte"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            if remaining == size:
+                return b""
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b"") -> None:
+    """Send one framed message"""
+    encoded = json.dumps(header).encode()
+    sock.sendall(FRAME.pack(len(encoded), len(payload)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """
+    Receive one framed message
+    
+    Returns:
+        Tuple of header and payload, or None when the peer closed the connection
+    """
+    prefix = _recv_exact(sock, FRAME.size)
+    if not prefix:
+        return None
+    header_size, payload_size = FRAME.unpack(prefix)
+    if header_size > MAX_HEADER_BYTES:
+        raise ConnectionError(f"Header of {header_size} bytes is too large")
+    header = json.loads(_recv_exact(sock, header_size))
+    return header, _recv_exact(sock, payload_size) if payload_size else b""
+
+
+class DaemonClient:
+    """Connection to a running classification daemon"""
+    
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._lock = threading.Lock()
+    
+    def request(self, header: Dict[str, Any], payload: bytes = b"") -> Tuple[Dict[str, Any], bytes]:
+        """
+        Send a request and wait for its response
+        
+        Raises:
+            DaemonError: If the daemon reports an error
+        """
+        with self._lock:
+            send_message(self.sock, header, payload)
+            message = recv_message(self.sock)
+        if message is None:
+            raise ConnectionError("Daemon closed the connection")
+        response, data = message
+        if response.get("status") != "success":
+            raise DaemonError(response.get("error", "Unknown daemon error"))
+        return response, data
+    
+    def info(self) -> Dict[str, Any]:
+        """Model names, input and decode size, fingerprint and counters of the daemon"""
+        return self.request({"op": "info"})[0]["data"]
+    
+    def classify(self, image_data: bytes) -> Dict[str, Any]:
+        """Classify one encoded image, same result as /api/predict/single"""
+        return self.request({"op": "classify"}, image_data)[0]["data"]
+    
+    def infer(self, images: list) -> list:
+        """Run decoded images (uint8 HxWx3 arrays) through the model, one probability vector per image"""
+        import numpy as np
+        
+        images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+        response, data = self.request(
+            {"op": "infer", "shapes": [list(image.shape) for image in images]},
+            b"".join(image.tobytes() for image in images)
+        )
+        return list(np.frombuffer(data, dtype=np.float32).reshape(response["probs_shape"]))
+    
+    def close(self) -> None:
+        self.sock.close()
+    
+    def __enter__(self) -> "DaemonClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def connect_daemon(socket_path: str = None, timeout: float = None) -> Optional[DaemonClient]:
+    """
+    Connect to the daemon if it is running
+    
+    Args:
+        socket_path: Daemon socket (default config.CLASSIFY_SOCKET)
+        timeout: Socket timeout in seconds for every request (default config.CLASSIFY_TIMEOUT)
+    
+    Returns:
+        DaemonClient, or None if the daemon is disabled, not running or the
+        platform has no Unix domain sockets (callers then load the model themselves)
+    """
+    if not config.CLASSIFY_DAEMON_ENABLED or not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(config.CLASSIFY_TIMEOUT if timeout is None else timeout)
+    try:
+        sock.connect(socket_path or config.CLASSIFY_SOCKET)
+    except OSError:
+        sock.close()
+        return None
+    return DaemonClient(sock)
+
+
+class DaemonBackend:
+    """Inference backend (as in inference_backends) that runs on the daemon's resident model"""
+    
+    name = "daemon"
+    
+    def __init__(self, client: DaemonClient):
+        info = client.info()
+        self.client = client
+        self.names = {int(idx): name for idx, name in info["names"].items()}
+        self.input_size = info["input_size"]
+        self.decode_size = info["decode_size"]
+        self.fingerprint = info["fingerprint"]
+    
+    def infer(self, images: list) -> list:
+        """Run one batch through the daemon and return a probability vector per image"""
+        return self.client.infer(images)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server holding the prediction service"""
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, service):
+        self.service = service
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self._counter_lock = threading.Lock()
+        super().__init__(socket_path, DaemonHandler)
+    
+    def count(self, failed: bool) -> None:
+        with self._counter_lock:
+            self.requests += 1
+            self.errors += failed
+
+
+class DaemonHandler(socketserver.BaseRequestHandler):
+    """Answers the requests of one client connection until it closes"""
+    
+    def handle(self) -> None:
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if message is None:
+                return
+            header, payload = message
+            response, data = {"status": "success"}, b""
+            try:
+                response, data = self.dispatch(header, payload)
+            except Exception as e:
+                response = {"status": "failed", "error": str(e)}
+            self.server.count(response["status"] != "success")
+            try:
+                send_message(self.request, response, data)
+            except OSError:
+                return
+            if header.get("op") == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+    
+    def dispatch(self, header: Dict[str, Any], payload: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """Run one request against the prediction service"""
+        import numpy as np
+        
+        service = self.server.service
+        op = header.get("op")
+        if op == "classify":
+            return {"status": "success", "data": service.predict_image_bytes(payload)}, b""
+        if op == "infer":
+            images, offset = [], 0
+            for shape in header["shapes"]:
+                size = int(np.prod(shape))
+                images.append(np.frombuffer(payload, dtype=np.uint8, count=size, offset=offset).reshape(shape))
+                offset += size
+            futures = service.submit_images(images)
+            probs = np.stack([future.result()["probs"] for future in futures]).astype(np.float32)
+            return {"status": "success", "probs_shape": list(probs.shape)}, probs.tobytes()
+        if op == "info":
+            model = service.backend if service.backend is not None else service.scheduler
+            return {"status": "success", "data": {
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - self.server.started, 1),
+                "model_path": service.model_path,
+                "backend": service.backend_name,
+                "precision": service.precision,
+                "names": {str(idx): name for idx, name in service.names.items()},
+                "input_size": model.input_size,
+                "decode_size": service.decode_size,
+                "fingerprint": service.fingerprint,
+                "requests": self.server.requests,
+                "errors": self.server.errors
+            }}, b""
+        if op == "shutdown":
+            return {"status": "success"}, b""
+        raise ValueError(f"Unknown op '{op}'")
+
+
+def serve(socket_path: str = None) -> None:
+    """
+    Load the model and answer requests on the socket until stopped
+    
+    Args:
+        socket_path: Socket to listen on (default config.CLASSIFY_SOCKET)
+    """
+    from predict_service import get_prediction_service
+    
+    socket_path = socket_path or config.CLASSIFY_SOCKET
+    if connect_daemon(socket_path) is not None:
+        print(f"Error: a daemon is already listening on '{socket_path}'")
+        sys.exit(1)
+    
+    started = time.perf_counter()
+    service = get_prediction_service()
+    service.warmup()
+    print(f"✓ Model ready in {time.perf_counter() - started:.1f} s")
+    
+    # A socket file left by a daemon that was killed
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    # Only the user running the daemon may talk to it: the socket is created
+    # with these permissions, not opened up between bind() and a later chmod
+    umask = os.umask(0o177)
+    try:
+        server = DaemonServer(socket_path, service)
+    finally:
+        os.umask(umask)
+    print(f"✓ Classification daemon listening on {socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("Classification daemon stopped")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python classify_daemon.py serve|status|stop [socket_path]")
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+    
+    if command == "serve":
+        serve(path)
+    elif command in ("status", "stop"):
+        client = connect_daemon(path)
+        if client is None:
+            print(f"No daemon listening on '{path or config.CLASSIFY_SOCKET}'")
+            sys.exit(1)
+        with client:
+            if command == "status":
+                print(json.dumps(client.info(), indent=2))
+            else:
+                client.request({"op": "shutdown"})
+                print("Daemon stopping")
+    else:
+        print(f"Unknown command: {command}")
+
+
+# how to run
+# python classify_daemon.py serve        (keep running, e.g. as a systemd service)
+# python single-classify.py cls image.jpg   (uses the daemon when it is up)
+# python classify_daemon.py stop
@@ -7,6 +7,12 @@ from pathlib import Path
 # Get the base directory (api folder)
 BASE_DIR = Path(__file__).resolve().parent
 
+# Runtime state (sensor history, caches, manifests, traces, daemon socket) is kept outside the
+# source tree, so runs never leave files in the repository or trip the RELOAD watcher
+DATA_DIR = Path(os.getenv("DATA_DIR", str(
+    Path(os.getenv("XDG_DATA_HOME", str(Path.home() / ".local" / "share"))) / "autofeather"
+)))
+
 # Model Configuration
 MODEL_PATH = os.getenv("MODEL_PATH", str(BASE_DIR.parent / "model" / "final-version" / "weights" / "best.pt"))
 
@@ -19,6 +25,170 @@ RELOAD = os.getenv("RELOAD", "False").lower() == "true"  # was "True", change to
 # CORS Configuration
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
+# Startup Configuration
+# PREDICTION_ENABLED=False serves only the sensor routes (no numpy/torch/ultralytics imported).
+# MODEL_PRELOAD=False loads the model on the first prediction request instead of at startup.
+PREDICTION_ENABLED = os.getenv("PREDICTION_ENABLED", "True").lower() == "true"
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "True").lower() == "true"
+
+# Inference Batching Configuration
+# Images from concurrent requests are merged into a single YOLO forward pass
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "True").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 10))
+
+# Image Decoding Configuration
+# Decode uploads straight to the model input size (JPEG draft mode + shorter-side resize)
+DECODE_DOWNSCALE = os.getenv("DECODE_DOWNSCALE", "True").lower() == "true"
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", 0))  # 0 = read imgsz from the model
+
+# Prediction Cache Configuration
+# Results are cached by image content hash + model file identity
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", 16))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 3600))
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH", "")  # e.g. ~/.local/share/autofeather/predictions.sqlite3, empty = memory only
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", 100000))
+
+# Inference Mode Configuration
+# "thread": one model in the API process, fed by the in-process batcher
+# "process": MODEL_WORKERS processes each hold a model, images are passed through shared memory
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread").lower()
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", 2))
+MODEL_WORKER_THREADS = int(os.getenv("MODEL_WORKER_THREADS", 0))  # 0 = split cores evenly between workers
+MODEL_WORKER_PIN_CPUS = os.getenv("MODEL_WORKER_PIN_CPUS", "False").lower() == "true"
+MODEL_WORKER_JOB_TIMEOUT = float(os.getenv("MODEL_WORKER_JOB_TIMEOUT", 120))  # seconds until an unanswered image fails
+
+# Inference Backend Configuration
+# "torch": ultralytics + PyTorch on the .pt weights
+# "onnx" / "openvino": exported once next to the weights (best.onnx, best_openvino_model/) and reused
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+# "int8" serves best.int8.onnx made by quantize.py (onnx backend only)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
+# Compute threads in thread mode, 0 = runtime default (TORCH_THREADS is the old name)
+BACKEND_THREADS = int(os.getenv("BACKEND_THREADS", os.getenv("TORCH_THREADS", 0)))
+
+# Inference Worker Pool Configuration
+# Decoding and inference run in a dedicated thread pool instead of the event loop.
+# Keep INFERENCE_WORKERS >= BATCH_MAX_SIZE so concurrent requests can fill a batch.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", BATCH_MAX_SIZE))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("INFERENCE_QUEUE_DEPTH", 32))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", 1))  # seconds
+
+# Warm-up Configuration
+# Synthetic inferences at start-up so the first real request does not pay for lazy initialization.
+# /ready reports ready only once they finished; empty batch sizes = powers of two up to BATCH_MAX_SIZE
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+WARMUP_BATCH_SIZES = sorted(
+    {int(size) for size in os.getenv("WARMUP_BATCH_SIZES", "").split(",") if size.strip()}
+    or {2 ** power for power in range(BATCH_MAX_SIZE.bit_length())} | {BATCH_MAX_SIZE}
+)
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", 2))
+
+# Bulk Classification Configuration (multi.py)
+# Decode threads (0 = one per core), images per forward pass and capacity of each stage queue
+BULK_DECODE_WORKERS = int(os.getenv("BULK_DECODE_WORKERS", 0))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 16))
+BULK_QUEUE_DEPTH = int(os.getenv("BULK_QUEUE_DEPTH", 64))
+# Resumable runs: completed images are appended to a manifest per folder and skipped on rerun
+# while unchanged; lines are written + fsynced every FLUSH_RECORDS lines or FLUSH_SECONDS
+BULK_MANIFEST_ENABLED = os.getenv("BULK_MANIFEST_ENABLED", "True").lower() == "true"
+BULK_MANIFEST_DIR = os.getenv("BULK_MANIFEST_DIR", str(DATA_DIR / "manifests"))
+BULK_MANIFEST_FLUSH_RECORDS = int(os.getenv("BULK_MANIFEST_FLUSH_RECORDS", 512))
+BULK_MANIFEST_FLUSH_SECONDS = float(os.getenv("BULK_MANIFEST_FLUSH_SECONDS", 5))
+
+# Offline Evaluation Configuration (metrics.py)
+EVAL_SPLIT = os.getenv("EVAL_SPLIT", "val")  # split folder used when given a dataset root
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", 16))
+EVAL_CACHE_PATH = os.getenv("EVAL_CACHE_PATH", str(DATA_DIR / "eval_cache.sqlite3"))
+EVAL_CALIBRATION_BINS = int(os.getenv("EVAL_CALIBRATION_BINS", 10))
+
+# Benchmark Configuration (benchmark.py)
+BENCH_IMAGE_SIZE = os.getenv("BENCH_IMAGE_SIZE", "640x480")  # width x height of the synthetic image
+BENCH_IMAGE_FORMAT = os.getenv("BENCH_IMAGE_FORMAT", "jpeg").lower()  # jpeg or png
+BENCH_CONCURRENCY = os.getenv("BENCH_CONCURRENCY", "1,4")  # comma separated sweep
+BENCH_BATCH_SIZES = os.getenv("BENCH_BATCH_SIZES", "1,8")  # images per request, comma separated sweep
+BENCH_REQUESTS = int(os.getenv("BENCH_REQUESTS", 100))  # timed requests per scenario
+BENCH_URL = os.getenv("BENCH_URL", "http://localhost:8000")
+BENCH_REGRESSION_TOLERANCE = float(os.getenv("BENCH_REGRESSION_TOLERANCE", 0.1))
+
+# Classification Daemon Configuration (classify_daemon.py)
+# single-classify.py and multi.py use a running daemon's resident model instead of loading their own
+CLASSIFY_DAEMON_ENABLED = os.getenv("CLASSIFY_DAEMON_ENABLED", "True").lower() == "true"
+CLASSIFY_SOCKET = os.getenv("CLASSIFY_SOCKET", str(DATA_DIR / "classify.sock"))
+CLASSIFY_TIMEOUT = float(os.getenv("CLASSIFY_TIMEOUT", 60))  # seconds per request
+
+# Sensor Sampling Configuration
+# A background thread per sensor reads it every SENSOR_SAMPLE_INTERVAL seconds (at least the
+# minimum of its type, 2 s for a DHT22); /sensor endpoints return the cached samples,
+# flagged stale once older than SENSOR_STALE_AFTER
+SENSOR_SAMPLE_INTERVAL = float(os.getenv("SENSOR_SAMPLE_INTERVAL", 2))
+SENSOR_STALE_AFTER = float(os.getenv("SENSOR_STALE_AFTER", 10))
+# Longest a single sensor read may keep retrying (with backoff + jitter) before giving up
+SENSOR_READ_DEADLINE = float(os.getenv("SENSOR_READ_DEADLINE", 10))
+# Sensors as comma separated "id:type:pin[:zone[:interval]]" entries, type DHT22, AM2302 or DHT11
+SENSORS = [
+    {
+        "id": fields[0],
+        "type": fields[1].upper(),
+        "pin": int(fields[2]),
+        "zone": fields[3] if len(fields) > 3 and fields[3] else "default",
+        "interval": float(fields[4]) if len(fields) > 4 else SENSOR_SAMPLE_INTERVAL
+    }
+    for fields in (
+        [field.strip() for field in entry.split(":")]
+        for entry in os.getenv("SENSORS", "DHT22_SENSOR_01:DHT22:4:default").split(",") if entry.strip()
+    )
+]
+# On-device history: one segment file per day of fixed-width records, buffered + fsynced in batches
+SENSOR_STORE_PATH = os.getenv("SENSOR_STORE_PATH", str(DATA_DIR / "sensor"))  # empty = no history
+SENSOR_STORE_RETENTION_DAYS = float(os.getenv("SENSOR_STORE_RETENTION_DAYS", 180))
+SENSOR_STORE_FLUSH_SECONDS = float(os.getenv("SENSOR_STORE_FLUSH_SECONDS", 60))
+SENSOR_STORE_FLUSH_RECORDS = int(os.getenv("SENSOR_STORE_FLUSH_RECORDS", 256))
+# Min/mean/max rollups kept next to the raw history, days per tier ("tier:days,...")
+SENSOR_ROLLUP_RETENTION_DAYS = {
+    tier.strip(): float(days)
+    for tier, days in (
+        item.split(":") for item in os.getenv("SENSOR_ROLLUP_RETENTION_DAYS", "1m:90,15m:730,1h:3650").split(",")
+        if item.strip()
+    )
+}
+# /sensor/history returns at most this many points (default / upper limit of ?points=)
+SENSOR_HISTORY_POINTS = int(os.getenv("SENSOR_HISTORY_POINTS", 500))
+SENSOR_HISTORY_MAX_POINTS = int(os.getenv("SENSOR_HISTORY_MAX_POINTS", 5000))
+# Server-push stream: frames buffered per client (slow clients drop the oldest), client limit, keep-alive
+SENSOR_STREAM_QUEUE = int(os.getenv("SENSOR_STREAM_QUEUE", 4))
+SENSOR_STREAM_MAX_SUBSCRIBERS = int(os.getenv("SENSOR_STREAM_MAX_SUBSCRIBERS", 100))
+SENSOR_STREAM_KEEPALIVE = float(os.getenv("SENSOR_STREAM_KEEPALIVE", 15))
+
+# Fertility Surface Configuration
+# Precomputed fuzzy fertility scores over temperature x humidity, interpolated bilinearly.
+# Cells the interpolation misses by more than FERTILITY_SURFACE_TOLERANCE score points at their
+# center are scored exactly; the file is rebuilt whenever the grid or the fuzzy rules change
+FERTILITY_SURFACE_ENABLED = os.getenv("FERTILITY_SURFACE_ENABLED", "True").lower() == "true"
+FERTILITY_SURFACE_PATH = os.getenv("FERTILITY_SURFACE_PATH", str(DATA_DIR / "fertility_surface.npz"))  # empty = no cache file
+FERTILITY_SURFACE_TEMPERATURE_RANGE = tuple(
+    float(value) for value in os.getenv("FERTILITY_SURFACE_TEMPERATURE_RANGE", "-10:50").split(":")
+)
+FERTILITY_SURFACE_TEMPERATURE_STEP = float(os.getenv("FERTILITY_SURFACE_TEMPERATURE_STEP", 0.25))
+FERTILITY_SURFACE_HUMIDITY_STEP = float(os.getenv("FERTILITY_SURFACE_HUMIDITY_STEP", 0.5))
+FERTILITY_SURFACE_TOLERANCE = float(os.getenv("FERTILITY_SURFACE_TOLERANCE", 0.25))
+
+# Metrics Configuration
+# Prometheus text format on /metrics: prediction stages, decode sizes, batching, sensor reads
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+# Request Profiling Configuration
+# Off: no profiler code runs at all. On: requests with PROFILING_HEADER: 1, plus a
+# PROFILING_SAMPLE_RATE fraction of all single-image predictions, are stack-sampled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", 1))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(DATA_DIR / "profiles"))
+PROFILING_MAX_TRACES = int(os.getenv("PROFILING_MAX_TRACES", 50))
+
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
@@ -44,7 +214,14 @@ if __name__ == "__main__":
     print("=" * 60)
     print(f"Model Path: {MODEL_PATH}")
     print(f"Model Exists: {Path(MODEL_PATH).exists()}")
+    print(f"Data Dir: {DATA_DIR}")
     print(f"Host: {HOST}")
     print(f"Port: {PORT}")
     print(f"Reload: {RELOAD}")
+    print(f"Prediction: {PREDICTION_ENABLED} (preload model: {MODEL_PRELOAD})")
+    print(f"Inference Mode: {INFERENCE_MODE}")
+    print(f"Inference Backend: {INFERENCE_BACKEND} ({MODEL_PRECISION})")
+    print(f"Inference Workers: {INFERENCE_WORKERS} (queue depth {INFERENCE_QUEUE_DEPTH})")
+    print(f"Batching: {BATCH_ENABLED} (max size {BATCH_MAX_SIZE}, max wait {BATCH_MAX_WAIT_MS} ms)")
+    print(f"Warm-up: {WARMUP_ENABLED} (batch sizes {WARMUP_BATCH_SIZES}, {WARMUP_ITERATIONS} iteration(s))")
     print("=" * 60)
\ No newline at end of file
@@ -0,0 +1,445 @@
+"""
+Fertility Surface - Precomputed Fuzzy Fertility Scores
+Grid of fuzzy fertility scores over temperature x humidity per feather density,
+queried by bilinear interpolation instead of running the inference per reading
+"""
+import hashlib
+import math
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Union
+import numpy as np
+import config
+from fuzzy_service import (
+    FDS_VALUES, FEATHER_SETS, HIGH_HEAT_STRESS_TCI, HUMIDITY_SETS, RULES, TEMPERATURE_SETS,
+    FuzzyLogicService, fertility_levels, get_fuzzy_logic_service
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the surface layout or the way it is built changes (invalidates cached files)
+SURFACE_VERSION = 1
+# Density axis of the grids: index 1 for "HIGH", 0 for everything else (scored as LOW like the engine)
+DENSITIES = ("LOW", "HIGH")
+# Humidity is bounded physically, only the temperature range is configurable
+HUMIDITY_RANGE = (0.0, 100.0)
+# Random readings per density used to measure the interpolation error after the build
+VALIDATION_SAMPLES = 20000
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def breakpoints(sets: Dict[str, tuple]) -> list:
+    """
+    Inputs where a membership function jumps
+    
+    A set whose ramp is vertical (a == b or c == d) switches between 0 and 1
+    at that point, and so does the fertility score. The grid gets nodes on
+    both sides of these points so no cell interpolates across a jump.
+    
+    Args:
+        sets: Membership function parameters (a, b, c[, d])
+    
+    Returns:
+        Sorted breakpoints
+    """
+    points = set()
+    for params in sets.values():
+        a, b, c = params[:3]
+        d = params[3] if len(params) > 3 else c
+        if a == b:
+            points.add(float(a))
+        if c == d:
+            points.add(float(d))
+    return sorted(points)
+
+
+def grid_nodes(low: float, high: float, step: float, jumps: list) -> np.ndarray:
+    """Regular nodes from low to high, plus each jump and its two float neighbours"""
+    nodes = list(np.linspace(low, high, int(round((high - low) / step)) + 1))
+    for point in jumps:
+        nodes += [np.nextafter(point, -np.inf), point, np.nextafter(point, np.inf)]
+    nodes = np.unique(np.asarray(nodes, dtype=np.float64))
+    return nodes[(nodes >= low) & (nodes <= high)]
+
+
+def surface_fingerprint(temperature_range: tuple, temperature_step: float, humidity_step: float,
+                        tolerance: float) -> str:
+    """Hash of everything the surface depends on, a cached file with another fingerprint is rebuilt"""
+    spec = repr((
+        SURFACE_VERSION, FDS_VALUES, FEATHER_SETS, TEMPERATURE_SETS, HUMIDITY_SETS, RULES,
+        HIGH_HEAT_STRESS_TCI, tuple(temperature_range), temperature_step, humidity_step, tolerance
+    ))
+    return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+
+def straddles(flags: np.ndarray) -> np.ndarray:
+    """Cells (or segments) whose corner flags disagree, i.e. a switch lies inside the cell"""
+    if flags.ndim == 1:
+        corners = np.stack([flags[:-1], flags[1:]])
+    else:
+        corners = np.stack([flags[:-1, :-1], flags[1:, :-1], flags[:-1, 1:], flags[1:, 1:]])
+    return corners.any(axis=0) & ~corners.all(axis=0)
+
+
+class FertilitySurface:
+    """
+    Fertility score lookup over a temperature x humidity grid per feather density
+    
+    Scores between nodes are interpolated bilinearly (linearly over temperature
+    when the humidity is unknown). Cells where the score is discontinuous
+    (rule 13 switching at TCI 0.8, no rule firing at all) or where the
+    interpolation misses the exact score at the cell center by more than the
+    tolerance are flagged and their readings go through the exact engine,
+    as do readings outside the grid.
+    """
+    
+    def __init__(self, temperatures: np.ndarray, humidities: np.ndarray, scores: np.ndarray,
+                 curves: np.ndarray, exact_cells: np.ndarray, exact_segments: np.ndarray,
+                 max_error: np.ndarray, tolerance: float, fingerprint: str, engine: FuzzyLogicService = None):
+        self.temperatures = temperatures
+        self.humidities = humidities
+        self.scores = scores
+        self.curves = curves
+        self.exact_cells = exact_cells
+        self.exact_segments = exact_segments
+        self.max_error = max_error
+        self.tolerance = tolerance
+        self.fingerprint = fingerprint
+        self.engine = engine or get_fuzzy_logic_service()
+        self.build_seconds = None
+        self.loaded_from = None
+    
+    @classmethod
+    def build(cls, temperature_range: tuple, temperature_step: float, humidity_step: float,
+              tolerance: float, engine: FuzzyLogicService = None) -> "FertilitySurface":
+        """
+        Evaluate the fuzzy engine on the grid and flag the cells that need exact scoring
+        
+        Args:
+            temperature_range: (min, max) temperature of the grid in °C
+            temperature_step: Node spacing along temperature in °C
+            humidity_step: Node spacing along humidity in %
+            tolerance: Largest accepted interpolation error in score points
+            engine: Fuzzy engine to sample (default: the shared service)
+        
+        Returns:
+            FertilitySurface
+        """
+        started = time.perf_counter()
+        engine = engine or get_fuzzy_logic_service()
+        temperatures = grid_nodes(*temperature_range, temperature_step, breakpoints(TEMPERATURE_SETS))
+        humidities = grid_nodes(*HUMIDITY_RANGE, humidity_step, breakpoints(HUMIDITY_SETS))
+        grid_t, grid_h = np.meshgrid(temperatures, humidities, indexing="ij")
+        center_t, center_h = np.meshgrid(
+            (temperatures[:-1] + temperatures[1:]) / 2, (humidities[:-1] + humidities[1:]) / 2, indexing="ij"
+        )
+        
+        scores, curves, exact_cells, exact_segments = [], [], [], []
+        for density in DENSITIES:
+            nodes = engine.infer_batch(density, grid_t.ravel(), grid_h.ravel())
+            grid = nodes["fertility_score"].reshape(grid_t.shape)
+            switches = (
+                straddles((nodes["tci"] >= HIGH_HEAT_STRESS_TCI).reshape(grid_t.shape))
+                | straddles((nodes["rule_strengths"].max(axis=1) > 0).reshape(grid_t.shape))
+            )
+            centers = engine.infer_batch(density, center_t.ravel(), center_h.ravel())["fertility_score"]
+            interpolated = (grid[:-1, :-1] + grid[1:, :-1] + grid[:-1, 1:] + grid[1:, 1:]) / 4
+            scores.append(grid)
+            exact_cells.append(switches | (np.abs(interpolated - centers.reshape(center_t.shape)) > tolerance))
+            
+            # Humidity unknown: a curve over temperature
+            nodes = engine.infer_batch(density, temperatures)
+            curve = nodes["fertility_score"]
+            switches = (
+                straddles(nodes["tci"] >= HIGH_HEAT_STRESS_TCI)
+                | straddles(nodes["rule_strengths"].max(axis=1) > 0)
+            )
+            centers = engine.infer_batch(density, (temperatures[:-1] + temperatures[1:]) / 2)["fertility_score"]
+            curves.append(curve)
+            exact_segments.append(switches | (np.abs((curve[:-1] + curve[1:]) / 2 - centers) > tolerance))
+        
+        surface = cls(
+            temperatures, humidities, np.stack(scores), np.stack(curves), np.stack(exact_cells),
+            np.stack(exact_segments), np.zeros(len(DENSITIES)), tolerance,
+            surface_fingerprint(temperature_range, temperature_step, humidity_step, tolerance), engine
+        )
+        surface.max_error = surface.measure_error()
+        surface.build_seconds = time.perf_counter() - started
+        return surface
+    
+    def measure_error(self, samples: int = VALIDATION_SAMPLES, seed: int = 0) -> np.ndarray:
+        """
+        Largest difference to the exact engine over random readings in the grid
+        
+        Args:
+            samples: Readings per density (one in five without humidity)
+            seed: Random seed, fixed so rebuilds report the same bound
+        
+        Returns:
+            Max absolute error in score points per density
+        """
+        rng = np.random.default_rng(seed)
+        errors = []
+        for density in DENSITIES:
+            temperature = rng.uniform(self.temperatures[0], self.temperatures[-1], samples)
+            humidity = np.where(rng.random(samples) < 0.2, np.nan, rng.uniform(*HUMIDITY_RANGE, samples))
+            scores = self.score(density, temperature, humidity)["fertility_score"]
+            exact = self.engine.infer_batch(density, temperature, humidity)["fertility_score"]
+            errors.append(float(np.abs(scores - exact).max()))
+        return np.asarray(errors)
+    
+    def score(self, feather_density: Union[str, Sequence[str]], temperature: ArrayLike,
+              humidity: Optional[ArrayLike] = None) -> Dict[str, np.ndarray]:
+        """
+        Fertility scores of many readings from the precomputed grid
+        
+        Args:
+            feather_density: "LOW"/"HIGH" per reading, or one value for all
+            temperature: Temperatures in °C
+            humidity: Relative humidity in % (None or NaN entries = unknown)
+        
+        Returns:
+            Dictionary of arrays: fertility_score, fertility_level and exact
+            (True where the reading was scored by the fuzzy engine)
+        """
+        temperature = np.atleast_1d(np.asarray(temperature, dtype=np.float64))
+        if humidity is None:
+            humidity = np.full(temperature.shape, np.nan)
+        else:
+            humidity = np.atleast_1d(np.asarray(humidity, dtype=np.float64))
+        density = np.atleast_1d(np.asarray(feather_density))
+        high = density == "HIGH"
+        high, temperature, humidity = np.broadcast_arrays(high, temperature, humidity)
+        if not np.all(np.isfinite(temperature)):
+            raise ValueError("Temperature must be a finite number")
+        index = high.astype(np.intp)
+        
+        scores = np.empty(temperature.shape, dtype=np.float64)
+        exact = np.ones(temperature.shape, dtype=bool)
+        in_range = (temperature >= self.temperatures[0]) & (temperature <= self.temperatures[-1])
+        known = ~np.isnan(humidity)
+        i = np.clip(np.searchsorted(self.temperatures, temperature, side="right") - 1, 0, len(self.temperatures) - 2)
+        u = (temperature - self.temperatures[i]) / (self.temperatures[i + 1] - self.temperatures[i])
+        
+        # Humidity known: bilinear over the cell
+        cell = in_range & known & (humidity >= HUMIDITY_RANGE[0]) & (humidity <= HUMIDITY_RANGE[1])
+        d, ci, cu, h = index[cell], i[cell], u[cell], humidity[cell]
+        j = np.clip(np.searchsorted(self.humidities, h, side="right") - 1, 0, len(self.humidities) - 2)
+        v = (h - self.humidities[j]) / (self.humidities[j + 1] - self.humidities[j])
+        grid = self.scores
+        scores[cell] = (
+            grid[d, ci, j] * (1 - cu) * (1 - v) + grid[d, ci + 1, j] * cu * (1 - v)
+            + grid[d, ci, j + 1] * (1 - cu) * v + grid[d, ci + 1, j + 1] * cu * v
+        )
+        exact[cell] = self.exact_cells[d, ci, j]
+        
+        # Humidity unknown: linear along the temperature curve
+        segment = in_range & ~known
+        d, si, su = index[segment], i[segment], u[segment]
+        scores[segment] = self.curves[d, si] * (1 - su) + self.curves[d, si + 1] * su
+        exact[segment] = self.exact_segments[d, si]
+        
+        if exact.any():
+            fallback = self.engine.infer_batch(
+                np.where(high[exact], "HIGH", "LOW"), temperature[exact], humidity[exact]
+            )
+            scores[exact] = fallback["fertility_score"]
+        return {"fertility_score": scores, "fertility_level": fertility_levels(scores), "exact": exact}
+    
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the surface to an .npz file (atomically, via a temporary file)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as handle:
+            np.savez(
+                handle, temperatures=self.temperatures, humidities=self.humidities, scores=self.scores,
+                curves=self.curves, exact_cells=self.exact_cells, exact_segments=self.exact_segments,
+                max_error=self.max_error, tolerance=np.float64(self.tolerance),
+                fingerprint=np.array(self.fingerprint)
+            )
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path: Union[str, Path], fingerprint: str) -> Optional["FertilitySurface"]:
+        """
+        Read a surface saved by save()
+        
+        Returns:
+            FertilitySurface, or None if the file is missing, unreadable or
+            was built with other parameters
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    logger.info(f"Fertility surface {path} is outdated, rebuilding")
+                    return None
+                surface = cls(
+                    data["temperatures"], data["humidities"], data["scores"], data["curves"],
+                    data["exact_cells"], data["exact_segments"], data["max_error"],
+                    float(data["tolerance"]), fingerprint
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not read fertility surface {path}: {e}")
+            return None
+        surface.loaded_from = str(path)
+        return surface
+    
+    def stats(self) -> Dict[str, object]:
+        """Grid size, exact-fallback share and error bound of the surface"""
+        return {
+            "fingerprint": self.fingerprint,
+            "temperature_range": [float(self.temperatures[0]), float(self.temperatures[-1])],
+            "humidity_range": list(HUMIDITY_RANGE),
+            "nodes": int(self.scores[0].size),
+            "size_kb": round((self.scores.nbytes + self.curves.nbytes + self.exact_cells.nbytes
+                              + self.exact_segments.nbytes) / 1024, 1),
+            "exact_cell_fraction": {
+                density: round(float(self.exact_cells[index].mean()), 4) for index, density in enumerate(DENSITIES)
+            },
+            "tolerance": self.tolerance,
+            "max_error": {density: round(float(self.max_error[index]), 4) for index, density in enumerate(DENSITIES)},
+            "build_seconds": None if self.build_seconds is None else round(self.build_seconds, 3),
+            "loaded_from": self.loaded_from
+        }
+
+
+def fertility_history(surface: FertilitySurface, samples: Iterable[tuple], feather_density: str,
+                      start: float, end: float, max_points: int) -> Dict[str, object]:
+    """
+    Score every stored sample of a time range and summarize the scores per time bucket
+    
+    Args:
+        surface: Surface used for scoring
+        samples: (timestamp, sensor_id, temperature, humidity) tuples, e.g. SensorStore.query()
+        feather_density: "LOW" or "HIGH" for all samples
+        start: Range start in epoch seconds
+        end: Range end in epoch seconds
+        max_points: Most buckets returned
+    
+    Returns:
+        Dict with the sample count, bucket length, share of samples per
+        fertility level and (start, count, min, mean, max score) per bucket
+    """
+    values = np.fromiter(
+        (value for timestamp, _, temperature, humidity in samples for value in (timestamp, temperature, humidity)),
+        dtype=np.float64
+    ).reshape(-1, 3)
+    bucket_seconds = max(1, math.ceil((end - start) / max_points))
+    if not len(values):
+        return {"count": 0, "bucket_seconds": bucket_seconds, "levels": {}, "points": []}
+    
+    result = surface.score(feather_density, values[:, 1], values[:, 2])
+    scores = result["fertility_score"]
+    buckets, inverse, counts = np.unique(
+        ((values[:, 0] - start) // bucket_seconds).astype(np.int64), return_inverse=True, return_counts=True
+    )
+    sums = np.bincount(inverse, weights=scores)
+    minimums = np.full(len(buckets), np.inf)
+    maximums = np.full(len(buckets), -np.inf)
+    np.minimum.at(minimums, inverse, scores)
+    np.maximum.at(maximums, inverse, scores)
+    levels, level_counts = np.unique(result["fertility_level"], return_counts=True)
+    return {
+        "count": len(values),
+        "bucket_seconds": bucket_seconds,
+        "levels": {str(level): int(level_count) / len(values) for level, level_count in zip(levels, level_counts)},
+        "points": [
+            (start + bucket * bucket_seconds, int(count), float(low), float(total / count), float(high))
+            for bucket, count, low, total, high in zip(buckets, counts, minimums, sums, maximums)
+        ]
+    }
+
+
+def load_or_build(path: str = None) -> FertilitySurface:
+    """
+    Load the cached surface for the configured grid, or build and cache it
+    
+    Args:
+        path: Cache file (default FERTILITY_SURFACE_PATH, empty = build only)
+    
+    Returns:
+        FertilitySurface
+    """
+    path = config.FERTILITY_SURFACE_PATH if path is None else path
+    spec = (config.FERTILITY_SURFACE_TEMPERATURE_RANGE, config.FERTILITY_SURFACE_TEMPERATURE_STEP,
+            config.FERTILITY_SURFACE_HUMIDITY_STEP, config.FERTILITY_SURFACE_TOLERANCE)
+    surface = FertilitySurface.load(path, surface_fingerprint(*spec)) if path else None
+    if surface is None:
+        surface = FertilitySurface.build(*spec)
+        logger.info(f"Built fertility surface in {surface.build_seconds:.2f} s: {surface.stats()}")
+        if path:
+            try:
+                surface.save(path)
+            except OSError as e:
+                logger.warning(f"Could not cache fertility surface at {path}: {e}")
+    return surface
+
+
+# Global instance (singleton pattern)
+_fertility_surface = None
+_surface_lock = threading.Lock()
+
+
+def get_fertility_surface() -> FertilitySurface:
+    """
+    Get or create the fertility surface instance (Singleton)
+    
+    Returns:
+        FertilitySurface instance
+    """
+    global _fertility_surface
+    with _surface_lock:
+        if _fertility_surface is None:
+            _fertility_surface = load_or_build()
+    return _fertility_surface
+
+
+if __name__ == "__main__":
+    import tempfile
+    
+    # Build, scoring and load times (the error bound is checked in tests/test_fertility_surface.py)
+    spec = (config.FERTILITY_SURFACE_TEMPERATURE_RANGE, config.FERTILITY_SURFACE_TEMPERATURE_STEP,
+            config.FERTILITY_SURFACE_HUMIDITY_STEP, config.FERTILITY_SURFACE_TOLERANCE)
+    surface = FertilitySurface.build(*spec)
+    print(f"built in {surface.build_seconds:.2f} s: {surface.stats()}")
+    
+    engine = get_fuzzy_logic_service()
+    rng = np.random.default_rng(42)
+    count = 200000
+    densities = rng.choice(["LOW", "HIGH"], count)
+    temperatures = rng.uniform(-15, 55, count)
+    humidities = np.where(rng.random(count) < 0.2, np.nan, rng.uniform(0, 100, count))
+    started = time.perf_counter()
+    result = surface.score(densities, temperatures, humidities)
+    elapsed = time.perf_counter() - started
+    print(f"{count} readings in {elapsed * 1000:.0f} ms, {result['exact'].mean() * 100:.2f}% scored exactly")
+    started = time.perf_counter()
+    exact = engine.infer_batch(densities, temperatures, humidities)
+    print(f"exact engine: {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"max error {np.abs(result['fertility_score'] - exact['fertility_score']).max():.4f} points")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "surface.npz"
+        surface.save(path)
+        started = time.perf_counter()
+        FertilitySurface.load(path, surface.fingerprint)
+        print(f"cached file {path.stat().st_size / 1024:.0f} KB, loads in {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    # History summary: 3 days of 2 s samples in hourly buckets
+    timestamps = 1.7e9 + np.arange(0, 3 * 86400, 2.0)
+    samples = [(timestamp, "S1", 20 + 10 * math.sin(timestamp / 86400 * 2 * math.pi), 60.0) for timestamp in timestamps]
+    started = time.perf_counter()
+    history = fertility_history(surface, samples, "HIGH", timestamps[0], timestamps[-1] + 1, 72)
+    print(f"history of {len(samples)} samples scored in {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"levels {history['levels']}")
+
+
+# how to run
+# python fertility_surface.py
@@ -0,0 +1,336 @@
+"""
+Fuzzy Logic Service - Fertility Inference
+Vectorized port of the Mamdani fuzzy inference in the NestJS fuzzy-logic.service.ts:
+FDS/TCI fuzzification, 13 minimum (AND) rules and centroid defuzzification
+"""
+import math
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+# Feather Density Score of the classifier's density classes
+FDS_VALUES = {"LOW": 0.25, "HIGH": 0.75}
+
+# Membership function parameters (a, b, c[, d]) exactly as in fuzzy-logic.service.ts
+FEATHER_SETS = {"low": (0, 0, 0.25, 0.5), "medium": (0.2, 0.5, 0.7), "high": (0.5, 0.75, 1, 1)}
+TEMPERATURE_SETS = {"cold": (0, 0, 18, 24), "optimal": (16, 21, 27), "hot": (21, 30, 50, 50)}
+HUMIDITY_SETS = {"low": (0, 0, 40, 60), "optimal": (45, 60, 75), "high": (65, 85, 100, 100)}
+
+# Rules in evaluation order with the center and width of their output set
+RULES = [
+    ("rule1_high_feather_optimal_temp", 90, 10),
+    ("rule2_high_feather_cold_temp", 70, 15),
+    ("rule3_high_feather_hot_temp", 55, 15),
+    ("rule4_medium_feather_optimal_temp", 65, 15),
+    ("rule5_medium_feather_cold_temp", 50, 15),
+    ("rule6_medium_feather_hot_temp", 45, 15),
+    ("rule7_low_feather_cold_temp", 25, 15),
+    ("rule8_low_feather_optimal_temp", 40, 15),
+    ("rule9_low_feather_hot_temp", 20, 15),
+    ("rule10_perfect_conditions", 95, 5),
+    ("rule11_low_humidity_stress", 35, 10),
+    ("rule12_high_humidity_stress", 30, 10),
+    ("rule13_high_heat_stress", 20, 10)
+]
+RULE_NAMES = [name for name, _, _ in RULES]
+# TCI at or above which rule 13 fires with the TCI as its strength
+HIGH_HEAT_STRESS_TCI = 0.8
+# Output universe sampled by the centroid, 0..100 in steps of 1
+OUTPUT_UNIVERSE = np.arange(101, dtype=np.float64)
+# Tuples defuzzified per chunk, bounds the (chunk x rules x universe) working array to ~10 MB
+CENTROID_CHUNK = 1024
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def membership(x: ArrayLike, a: float, b: float, c: float, d: float = None) -> np.ndarray:
+    """
+    Triangular / trapezoidal membership, element-wise
+    
+    0 outside (a, d), 1 on [b, c], linear ramps on (a, b) and (c, d); d
+    defaults to c. Same edge handling as triangularMF in the NestJS service.
+    
+    Args:
+        x: Input value(s)
+        a, b, c, d: Set boundaries
+    
+    Returns:
+        Membership degree(s) as float64 array
+    """
+    d = c if d is None else d
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rising = (x - a) / (b - a)
+        falling = (d - x) / (d - c)
+    return np.select(
+        [(x <= a) | (x >= d), (x >= b) & (x <= c), x < b, x > c],
+        [0.0, 1.0, rising, falling],
+        0.0
+    )
+
+
+def temperature_stress(temperature: np.ndarray) -> np.ndarray:
+    """Temperature stress: 0.2 in 18-24 °C, rising towards 1 when colder or hotter"""
+    cold = np.minimum(1.0, 0.2 + (18 - temperature) / 18 * 0.6)
+    hot = np.minimum(1.0, 0.2 + (temperature - 24) / 16 * 0.8)
+    return np.where(temperature < 18, cold, np.where(temperature > 24, hot, 0.2))
+
+
+def humidity_stress(humidity: np.ndarray) -> np.ndarray:
+    """Humidity stress: 0.1 in 50-70 %, rising when drier or more humid"""
+    dry = np.minimum(1.0, 0.1 + (50 - humidity) / 50 * 0.4)
+    humid = np.minimum(1.0, 0.1 + (humidity - 70) / 30 * 0.5)
+    return np.where(humidity < 50, dry, np.where(humidity > 70, humid, 0.1))
+
+
+def thermal_comfort_index(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """TCI in [0, 1]: 70 % temperature + 30 % humidity stress, temperature stress alone where humidity is NaN"""
+    temp_stress = temperature_stress(temperature)
+    tci = np.where(np.isnan(humidity), temp_stress, temp_stress * 0.7 + humidity_stress(humidity) * 0.3)
+    return np.clip(tci, 0.0, 1.0)
+
+
+def fertility_levels(scores: ArrayLike) -> np.ndarray:
+    """LOW below 40, MEDIUM below 70, HIGH otherwise"""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.where(scores < 40, "LOW", np.where(scores < 70, "MEDIUM", "HIGH"))
+
+
+def map_class_to_density(class_name: str) -> str:
+    """
+    Map a classifier class name to a feather density (same mapping as the NestJS PredictService)
+    
+    Names containing "sparse"/"low" are LOW, "dense"/"high" HIGH; anything else defaults to HIGH.
+    """
+    lower_class = class_name.lower()
+    if "sparse" in lower_class or "low" in lower_class:
+        return "LOW"
+    return "HIGH"
+
+
+def round_half_up(value: float, digits: int = 2) -> float:
+    """Round like JavaScript Math.round(value * 10^digits) / 10^digits"""
+    factor = 10 ** digits
+    return math.floor(value * factor + 0.5) / factor
+
+
+def format_number(value: float) -> str:
+    """Format a number like a JavaScript template literal (22 -> "22", 22.5 -> "22.5")"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class FuzzyLogicService:
+    """
+    Mamdani fuzzy inference of fertility likelihood from feather density,
+    temperature and optional humidity
+    
+    infer_batch() evaluates any number of (density, temperature, humidity)
+    tuples as array operations; infer() returns the same result dict as
+    FuzzyLogicService.inferFertility in the NestJS server.
+    """
+    
+    def __init__(self):
+        # Output set of every rule sampled over the output universe, shape (rules, 101)
+        self.output_sets = np.stack([
+            membership(OUTPUT_UNIVERSE, center - width, center, center + width)
+            for _, center, width in RULES
+        ])
+    
+    def rule_strengths(self, fds: np.ndarray, temperature: np.ndarray, humidity: np.ndarray,
+                       tci: np.ndarray) -> np.ndarray:
+        """
+        Firing strength of every rule (minimum AND operator)
+        
+        Args:
+            fds: Feather Density Scores, shape (n,)
+            temperature: Temperatures in °C, shape (n,)
+            humidity: Relative humidity in %, NaN where unknown, shape (n,)
+            tci: Thermal Comfort Index, shape (n,)
+        
+        Returns:
+            Strengths of shape (n, 13) in RULES order
+        """
+        feather = {name: membership(fds, *params) for name, params in FEATHER_SETS.items()}
+        temp = {name: membership(temperature, *params) for name, params in TEMPERATURE_SETS.items()}
+        # NaN humidity is outside every set, so the humidity rules do not fire
+        hum = {name: membership(humidity, *params) for name, params in HUMIDITY_SETS.items()}
+        
+        return np.stack([
+            np.minimum(feather["high"], temp["optimal"]),
+            np.minimum(feather["high"], temp["cold"]),
+            np.minimum(feather["high"], temp["hot"]),
+            np.minimum(feather["medium"], temp["optimal"]),
+            np.minimum(feather["medium"], temp["cold"]),
+            np.minimum(feather["medium"], temp["hot"]),
+            np.minimum(feather["low"], temp["cold"]),
+            np.minimum(feather["low"], temp["optimal"]),
+            np.minimum(feather["low"], temp["hot"]),
+            np.minimum(np.minimum(feather["high"], temp["optimal"]), hum["optimal"]),
+            np.minimum(feather["high"], hum["low"]),
+            np.minimum(feather["high"], hum["high"]),
+            np.where(tci >= HIGH_HEAT_STRESS_TCI, tci, 0.0)
+        ], axis=1)
+    
+    def centroid(self, strengths: np.ndarray) -> np.ndarray:
+        """
+        Centroid defuzzification of clipped (min) and aggregated (max) rule outputs
+        
+        Args:
+            strengths: Rule strengths of shape (n, rules)
+        
+        Returns:
+            Fertility scores in [0, 100], 50 where no rule fired
+        """
+        scores = np.empty(len(strengths), dtype=np.float64)
+        for start in range(0, len(strengths), CENTROID_CHUNK):
+            chunk = strengths[start:start + CENTROID_CHUNK]
+            aggregated = np.minimum(chunk[:, :, None], self.output_sets[None, :, :]).max(axis=1)
+            denominator = aggregated.sum(axis=1)
+            numerator = aggregated @ OUTPUT_UNIVERSE
+            scores[start:start + len(chunk)] = np.where(
+                denominator > 0, numerator / np.where(denominator > 0, denominator, 1.0), 50.0
+            )
+        return np.clip(scores, 0.0, 100.0)
+    
+    def infer_batch(self, feather_density: Union[str, Sequence[str]], temperature: ArrayLike,
+                    humidity: Optional[ArrayLike] = None) -> Dict[str, np.ndarray]:
+        """
+        Infer fertility for many readings at once
+        
+        Args:
+            feather_density: "LOW"/"HIGH" per reading, or one value for all
+            temperature: Temperatures in °C
+            humidity: Relative humidity in % (None or NaN entries = unknown)
+        
+        Returns:
+            Dictionary of arrays: fds, tci, rule_strengths (n, 13),
+            fertility_score and fertility_level
+        """
+        temperature = np.atleast_1d(np.asarray(temperature, dtype=np.float64))
+        if humidity is None:
+            humidity = np.full(temperature.shape, np.nan)
+        else:
+            humidity = np.atleast_1d(np.asarray(humidity, dtype=np.float64))
+        density = np.atleast_1d(np.asarray(feather_density))
+        fds = np.where(density == "HIGH", FDS_VALUES["HIGH"], FDS_VALUES["LOW"])
+        fds, temperature, humidity = np.broadcast_arrays(fds, temperature, humidity)
+        if not np.all(np.isfinite(temperature)):
+            raise ValueError("Temperature must be a finite number")
+        
+        tci = thermal_comfort_index(temperature, humidity)
+        strengths = self.rule_strengths(fds, temperature, humidity, tci)
+        scores = self.centroid(strengths)
+        return {
+            "fds": fds,
+            "tci": tci,
+            "rule_strengths": strengths,
+            "fertility_score": scores,
+            "fertility_level": fertility_levels(scores)
+        }
+    
+    def infer(self, feather_density: str, temperature: float, humidity: float = None) -> Dict[str, Any]:
+        """
+        Infer fertility for one reading
+        
+        Args:
+            feather_density: "LOW" or "HIGH"
+            temperature: Temperature in °C
+            humidity: Relative humidity in % (optional)
+        
+        Returns:
+            Dictionary with fertilityScore, fertilityLevel, the non-zero
+            ruleStrengths, inputs and explanation (FuzzyLogicResult format)
+        """
+        result = self.infer_batch(feather_density, [temperature], None if humidity is None else [humidity])
+        score = float(result["fertility_score"][0])
+        level = str(result["fertility_level"][0])
+        strengths = result["rule_strengths"][0]
+        return {
+            "fertilityScore": round_half_up(score),
+            "fertilityLevel": level,
+            "ruleStrengths": {
+                name: float(strength) for name, strength in zip(RULE_NAMES, strengths) if strength > 0
+            },
+            "inputs": {
+                "featherDensity": feather_density,
+                "temperature": temperature,
+                "humidity": humidity
+            },
+            "explanation": self.explanation(
+                feather_density, temperature, humidity, level, score,
+                float(result["fds"][0]), float(result["tci"][0])
+            )
+        }
+    
+    def explanation(self, feather_density: str, temperature: float, humidity: Optional[float],
+                    fertility_level: str, fertility_score: float, fds: float, tci: float) -> str:
+        """Human-readable explanation of a result (same wording as the NestJS service)"""
+        explanation = f"Fertility prediction: {fertility_level} ({fertility_score:.1f}% likelihood). "
+        
+        explanation += f"Feather Density Score (FDS): {fds:.2f} ({feather_density} resilience). "
+        if fds >= 0.75:
+            explanation += "Excellent feather coverage provides superior thermal regulation. "
+        elif fds >= 0.4:
+            explanation += "Moderate feather coverage offers adequate insulation. "
+        else:
+            explanation += "Low feather coverage may compromise thermal comfort. "
+        
+        explanation += f"Thermal Comfort Index (TCI): {tci:.2f}. "
+        if tci >= 0.8:
+            explanation += "High heat stress detected - fertility may be compromised. "
+        elif tci >= 0.5:
+            explanation += "Moderate thermal stress present. "
+        else:
+            explanation += "Thermal conditions are favorable. "
+        
+        temp_text = format_number(temperature)
+        if temperature < 18:
+            explanation += f"Temperature ({temp_text}°C) below optimal range (18-24°C) - cold stress may reduce fertility. "
+        elif temperature > 24:
+            explanation += f"Temperature ({temp_text}°C) above optimal range (18-24°C) - heat stress may affect fertility. "
+        else:
+            explanation += f"Temperature ({temp_text}°C) within optimal range. "
+        
+        if humidity is not None:
+            humidity_text = format_number(humidity)
+            if humidity < 50:
+                explanation += f"Low humidity ({humidity_text}%) may cause respiratory stress and dehydration. "
+            elif humidity > 70:
+                explanation += f"High humidity ({humidity_text}%) may promote pathogen growth and reduce heat dissipation. "
+            else:
+                explanation += f"Humidity ({humidity_text}%) within optimal range (50-70%). "
+        
+        return explanation.strip()
+
+
+# Global instance (singleton pattern)
+_fuzzy_logic_service = None
+
+
+def get_fuzzy_logic_service() -> FuzzyLogicService:
+    """
+    Get or create fuzzy logic service instance (Singleton)
+    
+    Returns:
+        FuzzyLogicService instance
+    """
+    global _fuzzy_logic_service
+    if _fuzzy_logic_service is None:
+        _fuzzy_logic_service = FuzzyLogicService()
+    return _fuzzy_logic_service
+
+
+if __name__ == "__main__":
+    import time
+    
+    # Throughput (the README and reference parity checks are in tests/test_fuzzy_service.py)
+    rng = np.random.default_rng(0)
+    temperatures = rng.uniform(0, 45, 100000)
+    humidities = rng.uniform(20, 100, 100000)
+    start = time.perf_counter()
+    get_fuzzy_logic_service().infer_batch("HIGH", temperatures, humidities)
+    elapsed = time.perf_counter() - start
+    print(f"100000 readings in {elapsed * 1000:.0f} ms ({elapsed / 100000 * 1e6:.1f} us per reading)")
+
+
+# how to run
+# python fuzzy_service.py
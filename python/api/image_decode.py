@@ -0,0 +1,57 @@
+"""
+Image Decoding - Fast Decode Path
+Decodes encoded images straight to (roughly) the model input size
+"""
+import io
+from typing import BinaryIO, Tuple, Union
+import numpy as np
+from PIL import Image
+
+ImageSource = Union[bytes, bytearray, memoryview, BinaryIO]
+
+
+def decode_image(image_data: ImageSource, target_size: int = 0) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+    """
+    Decode an encoded image (JPEG, PNG, ...) to an RGB numpy array
+    
+    When target_size is set, JPEGs are decoded with libjpeg's DCT scaling
+    (PIL draft mode) at 1/2, 1/4 or 1/8 of their size, never going below
+    target_size on the shorter side, and the result is resized so its
+    shorter side equals target_size. This is the same shorter-side resize
+    the classifier applies itself, done before the full-size pixels exist.
+    
+    Args:
+        image_data: Encoded image bytes, or a binary file object positioned at the image
+        target_size: Shorter side of the returned image in pixels, 0 keeps the full size
+    
+    Returns:
+        Tuple of the image as numpy array and the (height, width, channels)
+        shape of the full-size source image
+    """
+    # BytesIO shares the buffer of immutable bytes instead of copying it,
+    # file objects (e.g. uploaded files) are read by PIL directly
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        image_data = io.BytesIO(image_data)
+    
+    # Convert to PIL Image (only the header is read here)
+    image = Image.open(image_data)
+    source_shape = (image.height, image.width, 3)
+    
+    if target_size and image.format == "JPEG":
+        # Must be configured before the pixel data is loaded
+        image.draft("RGB", (target_size, target_size))
+    
+    # Convert to RGB if necessary
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    if target_size and min(image.size) > target_size:
+        scale = target_size / min(image.size)
+        width, height = image.size
+        image = image.resize(
+            (max(target_size, round(width * scale)), max(target_size, round(height * scale))),
+            Image.BILINEAR
+        )
+    
+    # Convert to numpy array (wraps the decoded pixels without another copy)
+    return np.asarray(image), source_shape
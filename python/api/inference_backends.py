@@ -0,0 +1,333 @@
+"""
+Inference Backends - Pluggable Model Runtimes
+Runs the YOLOv8 classifier through torch, ONNX Runtime or OpenVINO
+"""
+import ast
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+from PIL import Image
+import config
+
+logger = logging.getLogger(__name__)
+
+# Channel order of the images backends get, part of every cached result's
+# model identity: results computed while RGB arrays reached ultralytics as
+# BGR (red and blue swapped) are not reused
+INPUT_CHANNELS = "rgb"
+
+
+def classify_preprocess(images: List[np.ndarray], size: int) -> np.ndarray:
+    """
+    Replicate ultralytics' classification preprocessing without torch
+    
+    ClassificationPredictor converts its (BGR) numpy inputs to RGB, resizes
+    the shorter side to size (bilinear), center-crops to size x size and
+    scales to [0, 1]. Backends get RGB arrays (see TorchBackend.infer), so
+    they are used as they are.
+    
+    Args:
+        images: List of HxWx3 uint8 RGB arrays
+        size: Model input size (imgsz)
+    
+    Returns:
+        float32 NCHW batch
+    """
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    for idx, image in enumerate(images):
+        pil_image = Image.fromarray(np.ascontiguousarray(image))
+        width, height = pil_image.size
+        # torchvision Resize(int): shorter side = size, longer side truncated
+        if width <= height:
+            new_width, new_height = size, int(size * height / width)
+        else:
+            new_width, new_height = int(size * width / height), size
+        if (new_width, new_height) != (width, height):
+            pil_image = pil_image.resize((new_width, new_height), Image.BILINEAR)
+        # torchvision CenterCrop
+        top = int(round((new_height - size) / 2.0))
+        left = int(round((new_width - size) / 2.0))
+        pil_image = pil_image.crop((left, top, left + size, top + size))
+        batch[idx] = np.asarray(pil_image, dtype=np.float32).transpose(2, 0, 1) / 255.0
+    return batch
+
+
+def export_model(model_path: str, fmt: str, imgsz: int = None) -> Path:
+    """
+    Export the torch weights once and reuse the artifact next to them
+    
+    Args:
+        model_path: Path to the .pt weights
+        fmt: "onnx" or "openvino"
+        imgsz: Export input size (defaults to the size stored in the model)
+    
+    Returns:
+        Path to the .onnx file or the OpenVINO model directory
+    """
+    weights = Path(model_path)
+    if fmt == "onnx":
+        artifact = weights.with_suffix(".onnx")
+    elif fmt == "openvino":
+        artifact = weights.parent / f"{weights.stem}_openvino_model"
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    if artifact.exists() and artifact.stat().st_mtime >= weights.stat().st_mtime:
+        return artifact
+    
+    from ultralytics import YOLO
+    
+    logger.info(f"Exporting {weights} to {fmt}, this only happens once per weights file")
+    model = YOLO(str(weights))
+    exported = model.export(format=fmt, imgsz=imgsz or model.overrides.get("imgsz"), dynamic=True)
+    return Path(exported)
+
+
+def quantized_model_path(model_path: str) -> Path:
+    """Path of the INT8 ONNX model quantize.py writes next to the weights"""
+    return Path(model_path).with_suffix(".int8.onnx")
+
+
+def _parse_metadata(metadata: Dict[str, Any]) -> tuple:
+    """Read class names and input size from ultralytics export metadata"""
+    names = metadata["names"]
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    imgsz = metadata.get("imgsz", 224)
+    if isinstance(imgsz, str):
+        imgsz = ast.literal_eval(imgsz)
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz)
+    return {int(idx): name for idx, name in names.items()}, int(imgsz)
+
+
+class TorchBackend:
+    """Runs the .pt weights through ultralytics + torch"""
+    
+    name = "torch"
+    
+    def __init__(self, model_path: str, threads: int = 0):
+        """
+        Load the YOLOv8 model
+        
+        Args:
+            model_path: Path to the .pt weights
+            threads: Torch intra-op threads, 0 keeps the torch default
+        """
+        import torch
+        from ultralytics import YOLO
+        
+        if threads > 0:
+            torch.set_num_threads(threads)
+        
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.input_size = self.model.overrides.get("imgsz")
+    
+    def infer(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """Run one forward pass over RGB images and return a probability vector per image"""
+        # ultralytics reads numpy inputs in cv2's BGR order, as from cv2.imread(path)
+        results = self.model([np.ascontiguousarray(image[..., ::-1]) for image in images], verbose=False)
+        return [result.probs.data.cpu().numpy() for result in results]
+
+
+class OnnxBackend:
+    """Runs an ONNX export of the classifier through onnxruntime"""
+    
+    name = "onnx"
+    
+    def __init__(self, model_path: str, threads: int = 0, onnx_path: str = None):
+        """
+        Export (if needed) and load the ONNX model
+        
+        Args:
+            model_path: Path to the .pt weights the export is derived from
+            threads: onnxruntime intra-op threads, 0 keeps the runtime default
+            onnx_path: Use this .onnx file instead of exporting model_path
+        """
+        import onnxruntime as ort
+        
+        self.model_file = Path(onnx_path) if onnx_path else export_model(model_path, "onnx")
+        
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(self.model_file), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names, self.input_size = _parse_metadata(metadata)
+    
+    def infer(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """Run one forward pass and return a probability vector per image"""
+        batch = classify_preprocess(images, self.input_size)
+        probs = self.session.run(None, {self.input_name: batch})[0]
+        return list(probs)
+
+
+class OpenVinoBackend:
+    """Runs an OpenVINO IR export of the classifier"""
+    
+    name = "openvino"
+    
+    def __init__(self, model_path: str, threads: int = 0):
+        """
+        Export (if needed) and compile the OpenVINO model for the CPU
+        
+        Args:
+            model_path: Path to the .pt weights the export is derived from
+            threads: OpenVINO inference threads, 0 keeps the runtime default
+        """
+        import openvino as ov
+        import yaml
+        
+        model_dir = export_model(model_path, "openvino")
+        self.model_file = next(model_dir.glob("*.xml"))
+        
+        core = ov.Core()
+        properties = {"INFERENCE_NUM_THREADS": threads} if threads > 0 else {}
+        self.compiled = core.compile_model(core.read_model(self.model_file), "CPU", properties)
+        
+        with open(model_dir / "metadata.yaml") as metadata_file:
+            self.names, self.input_size = _parse_metadata(yaml.safe_load(metadata_file))
+    
+    def infer(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """Run one forward pass and return a probability vector per image"""
+        batch = classify_preprocess(images, self.input_size)
+        probs = self.compiled(batch)[self.compiled.output(0)]
+        return list(probs)
+
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "openvino": OpenVinoBackend
+}
+
+
+def create_backend(model_path: str = None, name: str = None, threads: int = None, precision: str = None):
+    """
+    Create the configured inference backend
+    
+    Args:
+        model_path: Path to the .pt weights (defaults to config.MODEL_PATH)
+        name: "torch", "onnx" or "openvino" (defaults to config.INFERENCE_BACKEND)
+        threads: Compute threads (defaults to config.BACKEND_THREADS, 0 = runtime default)
+        precision: "fp32" or "int8" (defaults to config.MODEL_PRECISION), int8 needs the onnx backend
+    
+    Returns:
+        Backend instance with names, input_size and infer()
+    """
+    name = (name or config.INFERENCE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {', '.join(BACKENDS)}")
+    model_path = model_path or config.MODEL_PATH
+    threads = config.BACKEND_THREADS if threads is None else threads
+    precision = (precision or config.MODEL_PRECISION).lower()
+    
+    if precision == "int8":
+        if name != "onnx":
+            raise ValueError("MODEL_PRECISION=int8 requires INFERENCE_BACKEND=onnx")
+        int8_path = quantized_model_path(model_path)
+        if not int8_path.exists():
+            raise FileNotFoundError(f"{int8_path} not found, create it with 'python quantize.py quantize <folder>'")
+        return OnnxBackend(model_path, threads, onnx_path=str(int8_path))
+    if precision != "fp32":
+        raise ValueError(f"Unknown model precision '{precision}', expected fp32 or int8")
+    return BACKENDS[name](model_path, threads)
+
+
+def warmup_backend(backend, batch_sizes: List[int], iterations: int, image_size: int = 0) -> Dict[str, Any]:
+    """
+    Run synthetic inferences at every batch size that will be served
+    
+    The first forward pass of a runtime (and often of each new batch shape)
+    pays for lazy graph building, kernel selection and memory allocation.
+    
+    Args:
+        backend: Backend instance from create_backend()
+        batch_sizes: Batch sizes to run
+        iterations: Forward passes per batch size
+        image_size: Side of the synthetic images (defaults to the model input size)
+    
+    Returns:
+        Dict with the first and mean latency per batch size and the total time
+    """
+    size = int(image_size or backend.input_size or 224)
+    rng = np.random.default_rng(0)
+    timings = {}
+    start = time.perf_counter()
+    for batch_size in batch_sizes:
+        images = [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(batch_size)]
+        runs = []
+        for _ in range(max(1, iterations)):
+            run_start = time.perf_counter()
+            backend.infer(images)
+            runs.append((time.perf_counter() - run_start) * 1000)
+        timings[str(batch_size)] = {
+            "first_ms": round(runs[0], 2),
+            "mean_ms": round(sum(runs) / len(runs), 2)
+        }
+    return {
+        "batch_sizes": timings,
+        "total_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def parity(image_paths: List[str], backend_name: str = "onnx", tolerance: float = 1e-3) -> bool:
+    """
+    Compare a backend against the torch backend on real images
+    
+    Args:
+        image_paths: Images to classify with both backends
+        backend_name: Backend checked against torch
+        tolerance: Largest accepted absolute probability difference
+    
+    Returns:
+        True if every image gets the same top-1 class and probabilities
+        within tolerance
+    """
+    from image_decode import decode_image
+    
+    reference = create_backend(name="torch", precision="fp32")
+    candidate = create_backend(name=backend_name)
+    size = int(reference.input_size)
+    
+    passed = True
+    for image_path in image_paths:
+        with open(image_path, "rb") as image_file:
+            image, _ = decode_image(image_file.read(), size)
+        
+        start = time.perf_counter()
+        expected = reference.infer([image])[0]
+        torch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        actual = candidate.infer([image])[0]
+        candidate_ms = (time.perf_counter() - start) * 1000
+        
+        same_top1 = int(np.argmax(expected)) == int(np.argmax(actual))
+        max_diff = float(np.max(np.abs(expected - actual)))
+        ok = same_top1 and max_diff <= tolerance
+        passed = passed and ok
+        print(f"{'OK  ' if ok else 'FAIL'} {Path(image_path).name}: "
+              f"torch={reference.names[int(np.argmax(expected))]} ({torch_ms:.1f} ms) "
+              f"{backend_name}={candidate.names[int(np.argmax(actual))]} ({candidate_ms:.1f} ms) "
+              f"max|diff|={max_diff:.2e}")
+    return passed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "parity":
+        print("Usage: python inference_backends.py parity <onnx|openvino> <image_path> [<image_path> ...]")
+        sys.exit(1)
+    
+    sys.exit(0 if parity(sys.argv[3:], sys.argv[2]) else 1)
+
+
+# how to run
+# python inference_backends.py parity onnx "C:/Users/Admin/Documents/thesis/dataset/high/img_000001.jpg"
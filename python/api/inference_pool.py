@@ -0,0 +1,117 @@
+"""
+Inference Pool - Bounded Worker Pool
+Runs blocking decode and inference work off the asyncio event loop
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import config
+from telemetry import REGISTRY
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the inference pool has no free worker or queue slot"""
+
+
+class InferencePool:
+    """
+    Dedicated thread pool for blocking prediction work
+    
+    At most max_workers jobs run at once and at most max_queue more wait
+    for a worker. Anything beyond that is rejected immediately with
+    PoolSaturatedError instead of piling up behind the model.
+    """
+    
+    def __init__(self, max_workers: int = None, max_queue: int = None):
+        """
+        Initialize the worker pool
+        
+        Args:
+            max_workers: Number of worker threads (defaults to config.INFERENCE_WORKERS)
+            max_queue: Number of jobs allowed to wait for a worker (defaults to config.INFERENCE_QUEUE_DEPTH)
+        """
+        self.max_workers = max(1, max_workers or config.INFERENCE_WORKERS)
+        self.max_queue = config.INFERENCE_QUEUE_DEPTH if max_queue is None else max_queue
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+    
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking callable in the pool and await its result
+        
+        Args:
+            fn: Blocking callable to run
+            *args: Positional arguments passed to fn
+        
+        Returns:
+            Return value of fn
+        
+        Raises:
+            PoolSaturatedError: If every worker and queue slot is taken
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolSaturatedError("Prediction queue is full")
+        
+        with self._lock:
+            self._in_flight += 1
+        
+        def release(_future) -> None:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+        
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            release(None)
+            raise
+        # Runs once the job finished, or right away when a request that
+        # disconnected cancels a job still waiting for a worker. A job that
+        # already started cannot be cancelled, so a busy slot is never freed early.
+        future.add_done_callback(release)
+        
+        return await asyncio.wrap_future(future)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get pool configuration and load"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self._rejected
+        }
+    
+    def shutdown(self) -> None:
+        """Wait for running jobs and stop the worker threads"""
+        self._executor.shutdown(wait=True)
+
+
+# Global instance (singleton pattern)
+_inference_pool = None
+
+
+def get_inference_pool() -> InferencePool:
+    """
+    Get or create inference pool instance (Singleton)
+    
+    Returns:
+        InferencePool instance
+    """
+    global _inference_pool
+    if _inference_pool is None:
+        _inference_pool = InferencePool()
+        pool = _inference_pool
+        REGISTRY.collector("inference_pool", lambda: [
+            ("autofeather_inference_pool_in_flight", "Prediction jobs running or waiting for a worker",
+             "gauge", {}, pool._in_flight),
+            ("autofeather_inference_pool_rejected_total", "Prediction requests rejected with 503 (pool full)",
+             "counter", {}, pool._rejected)
+        ])
+    return _inference_pool
@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from predict_controller import router as predict_router
+from fastapi.responses import JSONResponse, PlainTextResponse
 # Uncomment the following line to include the sensor router
-from sensor_controller import router as sensor_router
-import uvicorn
+from sensor_controller import router as sensor_router, sensor_service
 import config
+import telemetry
+
+# The prediction router is only imported when enabled: sensor-only nodes never
+# load numpy, torch or ultralytics (the model itself loads in the startup hook)
+if config.PREDICTION_ENABLED:
+    import predict_controller
 
 app = FastAPI(
     title=config.API_TITLE,
@@ -20,7 +25,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(predict_router, prefix="/api", tags=["Prediction"])
+if config.PREDICTION_ENABLED:
+    app.include_router(predict_controller.router, prefix="/api", tags=["Prediction"])
 # Uncomment the following line to include the sensor router
 app.include_router(sensor_router, tags=["Sensor"])
 
@@ -34,6 +40,20 @@ async def startup_event():
     if model_info['model_size_mb']:
         print(f"Model Size: {model_info['model_size_mb']} MB")
     print("=" * 60)
+    # Sensor endpoints answer from the sample cached by this background sampler
+    sensor_service.start()
+    # Load and warm up in the background, /ready answers 503 until it is done
+    if config.PREDICTION_ENABLED and config.MODEL_PRELOAD:
+        predict_controller.start_prediction_service()
+    # Precomputed fertility scores, loaded from the cache file or built in the background
+    if config.PREDICTION_ENABLED and config.FERTILITY_SURFACE_ENABLED:
+        predict_controller.start_fertility_surface()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    sensor_service.stop()
+    if config.PREDICTION_ENABLED:
+        predict_controller.stop_prediction_service()
 
 @app.get("/")
 async def root():
@@ -59,7 +79,35 @@ async def health_check():
         }
     }
 
+@app.get("/ready")
+async def readiness_check():
+    if not config.PREDICTION_ENABLED:
+        return {
+            "status": "success",
+            "message": "Service is ready (prediction disabled)",
+            "data": {"ready": True, "model_loaded": False, "warmup": None, "error": None}
+        }
+    
+    readiness = predict_controller.prediction_readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={
+            "status": "failed",
+            "message": "Model failed to load" if readiness["error"] else "Model is loading",
+            "data": readiness
+        })
+    return {
+        "status": "success",
+        "message": "Service is ready",
+        "data": readiness
+    }
+
+if config.METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(telemetry.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host=config.HOST,
@@ -1,12 +1,463 @@
-from ultralytics import YOLO
+"""
+Model Metrics - Offline Evaluation
+Classifies a labelled validation split in batches and caches every image's
+class probabilities per model, so metrics, threshold changes and model
+comparisons are computed from the cache without running inference again
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import config
+from bulk_manifest import content_hash
+from image_decode import decode_image
+from inference_backends import create_backend
+from predict_service import PredictionService
+from prediction_cache import file_digest
 
-MODEL_PATH = "../model/final-version/weights/best.pt"
-DATA_PATH = r"C:\Users\Admin\Downloads\dataset-split"  # same dataset used for training
+SUPPORTED_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def labelled_images(folder: str, names: Dict[int, str], split: str = None) -> List[Tuple[str, int]]:
+    """
+    Images of a labelled split with their class index
+    
+    Args:
+        folder: Dataset root with train/val/test folders, or a split folder itself
+        names: Class names of the model, matched case-insensitively to folder names
+        split: Split folder used when folder is a dataset root (default config.EVAL_SPLIT)
+    
+    Returns:
+        Sorted list of (image path, class index)
+    """
+    split_folder = Path(folder) / (split or config.EVAL_SPLIT)
+    if split_folder.is_dir():
+        folder = split_folder
+    class_ids = {name.lower(): idx for idx, name in names.items()}
+    samples = []
+    for class_dir in sorted(Path(folder).iterdir()):
+        if class_dir.is_dir() and class_dir.name.lower() in class_ids:
+            samples += [
+                (str(path), class_ids[class_dir.name.lower()]) for path in sorted(class_dir.rglob("*"))
+                if path.suffix.lower() in SUPPORTED_EXTS
+            ]
+    if not samples:
+        raise FileNotFoundError(f"No labelled images found in '{folder}' (expected one folder per class)")
+    return samples
+
+
+def eval_fingerprint(model_path: str, input_size: Any) -> str:
+    """
+    Identity of a model as evaluated, the same the prediction service caches under
+    
+    Args:
+        model_path: Weights to evaluate
+        input_size: Input size stored in the model (see PredictionService.resolve_decode_size)
+    """
+    decode_size = PredictionService.resolve_decode_size(input_size)
+    return PredictionService.model_identity(model_path, config.INFERENCE_BACKEND, config.MODEL_PRECISION, decode_size)
+
+
+class EvalCache:
+    """
+    Per-image probabilities and timings of every evaluated model in SQLite
+    
+    Rows are keyed by model fingerprint + image content hash, so renamed or
+    copied images are still hits and a new model version only runs on the
+    images it has not seen.
+    """
+    
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the cache
+        
+        Args:
+            path: SQLite file (default config.EVAL_CACHE_PATH)
+        """
+        self.path = path or config.EVAL_CACHE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "model TEXT NOT NULL, image TEXT NOT NULL, names TEXT NOT NULL, probs BLOB NOT NULL, "
+            "decode_ms REAL NOT NULL, inference_ms REAL NOT NULL, batch_size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (model, image))"
+        )
+        # Model info per weights content and backend, the fingerprint needs the input size
+        self._db.execute("CREATE TABLE IF NOT EXISTS weights (weights TEXT PRIMARY KEY, info TEXT NOT NULL)")
+    
+    def get_many(self, model: str, images: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Cached rows of a model for the given image hashes
+        
+        Returns:
+            Dictionary of image hash to probs, decode_ms, inference_ms and batch_size
+        """
+        rows = {}
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(images), 500):
+            chunk = images[start:start + 500]
+            query = (
+                "SELECT image, probs, decode_ms, inference_ms, batch_size FROM predictions "
+                f"WHERE model = ? AND image IN ({','.join('?' * len(chunk))})"
+            )
+            for image, probs, decode_ms, inference_ms, batch_size in self._db.execute(query, [model, *chunk]):
+                rows[image] = {
+                    "probs": np.frombuffer(probs, dtype=np.float32),
+                    "decode_ms": decode_ms,
+                    "inference_ms": inference_ms,
+                    "batch_size": batch_size
+                }
+        return rows
+    
+    def put_many(self, model: str, names: Dict[int, str], rows: List[Tuple[str, np.ndarray, float, float, int]]) -> None:
+        """
+        Store (image hash, probs, decode_ms, inference_ms, batch_size) rows of a model in one transaction
+        """
+        encoded_names = json.dumps({str(idx): name for idx, name in names.items()})
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (model, image, encoded_names, np.asarray(probs, dtype=np.float32).tobytes(),
+                     decode_ms, inference_ms, batch_size, now)
+                    for image, probs, decode_ms, inference_ms, batch_size in rows
+                ]
+            )
+    
+    def model_info(self, weights: str) -> Optional[Dict[str, Any]]:
+        """Info stored for a weights key (content digest + backend), None when unknown"""
+        row = self._db.execute("SELECT info FROM weights WHERE weights = ?", (weights,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put_model_info(self, weights: str, info: Dict[str, Any]) -> None:
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO weights VALUES (?, ?)", (weights, json.dumps(info)))
+    
+    def names(self, model: str) -> Optional[Dict[int, str]]:
+        """Class names stored with a model's rows, None when nothing is cached for it"""
+        row = self._db.execute("SELECT names FROM predictions WHERE model = ? LIMIT 1", (model,)).fetchone()
+        return {int(idx): name for idx, name in json.loads(row[0]).items()} if row else None
+    
+    def models(self) -> Dict[str, int]:
+        """Number of cached images per model fingerprint"""
+        return dict(self._db.execute("SELECT model, COUNT(*) FROM predictions GROUP BY model"))
+    
+    def close(self) -> None:
+        self._db.close()
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as image_file:
+        return content_hash(image_file.read())
+
+
+def _decode(path: str, size: int) -> Tuple[Optional[np.ndarray], float]:
+    """Read and decode one image, timing the decode (None for unreadable images)"""
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    start = time.perf_counter()
+    try:
+        image, _ = decode_image(data, size)
+    except Exception:
+        image = None
+    return image, (time.perf_counter() - start) * 1000
+
+
+def evaluate(folder: str, model_path: str = None, split: str = None, batch_size: int = None,
+             cache: EvalCache = None) -> Dict[str, Any]:
+    """
+    Probabilities of every image of a labelled split, from the cache or by running the model
+    
+    The model is only loaded for weights not evaluated before or when some
+    image is not cached for it. Missing images are decoded by a thread pool
+    and classified in batches; their decode time and their share of the
+    batch's inference time are cached with the probabilities.
+    
+    Args:
+        folder: Dataset root or split folder (see labelled_images)
+        model_path: Weights to evaluate (default config.MODEL_PATH)
+        split: Split used when folder is a dataset root (default config.EVAL_SPLIT)
+        batch_size: Images per forward pass (default config.EVAL_BATCH_SIZE)
+        cache: Cache to use (default: EvalCache() at config.EVAL_CACHE_PATH)
+    
+    Returns:
+        Dictionary with model fingerprint, names, paths, labels, probs matrix,
+        decode_ms / inference_ms arrays, and cached / inferred / errors counts
+    """
+    model_path = model_path or config.MODEL_PATH
+    batch_size = batch_size or config.EVAL_BATCH_SIZE
+    own_cache = cache is None
+    cache = cache or EvalCache()
+    
+    # Input size of weights seen before, so the fingerprint is known without loading them
+    backend = None
+    weights = f"{file_digest(model_path)}:{config.INFERENCE_BACKEND}"
+    info = cache.model_info(weights)
+    if info is None:
+        backend = create_backend(model_path)
+        info = {"input_size": backend.input_size}
+        cache.put_model_info(weights, info)
+    decode_size = PredictionService.resolve_decode_size(info["input_size"])
+    fingerprint = eval_fingerprint(model_path, info["input_size"])
+    
+    # Class names of the cached rows, or of the model when nothing is cached yet
+    names = cache.names(fingerprint)
+    if names is None:
+        backend = backend or create_backend(model_path)
+        names = backend.names
+    samples = labelled_images(folder, names, split)
+    
+    paths = [path for path, _ in samples]
+    workers = config.BULK_DECODE_WORKERS or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(_hash_file, paths))
+        rows = cache.get_many(fingerprint, hashes)
+        missing = [idx for idx, digest in enumerate(hashes) if digest not in rows]
+        
+        if missing:
+            backend = backend or create_backend(model_path)
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                decoded = list(pool.map(lambda idx: _decode(paths[idx], decode_size), batch))
+                ok = [(idx, image, decode_ms) for idx, (image, decode_ms) in zip(batch, decoded) if image is not None]
+                # Unreadable images are cached with empty probabilities, so reruns skip them too
+                new_rows = [
+                    (hashes[idx], np.empty(0, dtype=np.float32), decode_ms, 0.0, 0)
+                    for idx, (image, decode_ms) in zip(batch, decoded) if image is None
+                ]
+                if ok:
+                    infer_start = time.perf_counter()
+                    probs = backend.infer([image for _, image, _ in ok])
+                    share_ms = (time.perf_counter() - infer_start) * 1000 / len(ok)
+                    new_rows += [
+                        (hashes[idx], output, decode_ms, share_ms, len(ok))
+                        for (idx, _, decode_ms), output in zip(ok, probs)
+                    ]
+                cache.put_many(fingerprint, names, new_rows)
+                for digest, output, decode_ms, inference_ms, size in new_rows:
+                    rows[digest] = {"probs": np.asarray(output, dtype=np.float32), "decode_ms": decode_ms,
+                                    "inference_ms": inference_ms, "batch_size": size}
+    if own_cache:
+        cache.close()
+    
+    # Unreadable images are left out of the metrics
+    keep = [idx for idx, digest in enumerate(hashes) if rows[digest]["probs"].size]
+    return {
+        "model": fingerprint,
+        "model_path": str(model_path),
+        "names": names,
+        "paths": [paths[idx] for idx in keep],
+        "labels": np.array([samples[idx][1] for idx in keep], dtype=np.int64),
+        "probs": np.stack([rows[hashes[idx]]["probs"] for idx in keep]) if keep else np.empty((0, len(names))),
+        "decode_ms": np.array([rows[hashes[idx]]["decode_ms"] for idx in keep]),
+        "inference_ms": np.array([rows[hashes[idx]]["inference_ms"] for idx in keep]),
+        "cached": len(paths) - len(missing),
+        "inferred": len(missing),
+        "errors": len(paths) - len(keep)
+    }
+
+
+def latency_summary(timings: np.ndarray) -> Dict[str, float]:
+    """Mean / p50 / p95 / p99 of latencies in ms"""
+    if not len(timings):
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        "mean": round(float(np.mean(timings)), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3)
+    }
+
+
+def score(run: Dict[str, Any], threshold: float = 0.0, bins: int = None) -> Dict[str, Any]:
+    """
+    Metrics of an evaluated run, no inference involved
+    
+    Args:
+        run: Result of evaluate()
+        threshold: Minimum top-1 confidence, images below it count as
+            abstained (coverage) and are left out of confusion and precision/recall
+        bins: Equal-width confidence bins for calibration (default config.EVAL_CALIBRATION_BINS)
+    
+    Returns:
+        Dictionary with accuracy, coverage, confusion matrix, per-class
+        precision/recall/f1, calibration (ECE, MCE, Brier, reliability bins)
+        and latency percentiles
+    """
+    bins = bins or config.EVAL_CALIBRATION_BINS
+    names = run["names"]
+    labels = run["labels"]
+    probs = run["probs"]
+    predicted = np.argmax(probs, axis=1)
+    confidence = probs[np.arange(len(probs)), predicted]
+    correct = predicted == labels
+    accepted = confidence >= threshold
+    num_classes = len(names)
+    
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(confusion, (labels[accepted], predicted[accepted]), 1)
+    per_class = {}
+    for idx, name in sorted(names.items()):
+        true_positive = int(confusion[idx, idx])
+        predicted_count = int(confusion[:, idx].sum())
+        support = int(confusion[idx].sum())
+        precision = true_positive / predicted_count if predicted_count else 0.0
+        recall = true_positive / support if support else 0.0
+        per_class[name] = {
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+            "support": support
+        }
+    
+    # Reliability of the top-1 confidence over all images
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bin_ids = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    reliability = []
+    ece = mce = 0.0
+    for idx in range(bins):
+        members = bin_ids == idx
+        count = int(members.sum())
+        if not count:
+            continue
+        mean_confidence = float(confidence[members].mean())
+        accuracy = float(correct[members].mean())
+        gap = abs(accuracy - mean_confidence)
+        ece += gap * count / len(labels)
+        mce = max(mce, gap)
+        reliability.append({
+            "range": [round(float(edges[idx]), 3), round(float(edges[idx + 1]), 3)],
+            "images": count,
+            "confidence": round(mean_confidence, 4),
+            "accuracy": round(accuracy, 4)
+        })
+    one_hot = np.eye(num_classes)[labels]
+    
+    return {
+        "model": run["model"],
+        "model_path": run["model_path"],
+        "images": int(len(labels)),
+        "cached": run["cached"],
+        "inferred": run["inferred"],
+        "errors": run["errors"],
+        "threshold": threshold,
+        "coverage": round(float(accepted.mean()), 4) if len(labels) else 0.0,
+        "accuracy": round(float(correct[accepted].mean()), 4) if accepted.any() else 0.0,
+        "accuracy_all": round(float(correct.mean()), 4) if len(labels) else 0.0,
+        "classes": [names[idx] for idx in sorted(names)],
+        "confusion_matrix": confusion.tolist(),
+        "per_class": per_class,
+        "calibration": {
+            "ece": round(ece, 4),
+            "mce": round(mce, 4),
+            "brier": round(float(np.mean(np.sum((probs - one_hot) ** 2, axis=1))), 4) if len(labels) else 0.0,
+            "bins": reliability
+        },
+        "latency_ms": {
+            "decode": latency_summary(run["decode_ms"]),
+            "inference": latency_summary(run["inference_ms"]),
+            "total": latency_summary(run["decode_ms"] + run["inference_ms"])
+        }
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Human readable summary of a score() report"""
+    print(f"Model {report['model_path']} ({report['model']}): {report['images']} image(s), "
+          f"{report['cached']} cached, {report['inferred']} inferred, {report['errors']} unreadable")
+    print(f"  accuracy {report['accuracy']:.4f} at coverage {report['coverage']:.4f} "
+          f"(threshold {report['threshold']}), {report['accuracy_all']:.4f} overall")
+    width = max(len(name) for name in report["classes"]) + 2
+    print("  confusion (rows true, columns predicted)")
+    print("  " + " " * width + "".join(f"{name:>{width}}" for name in report["classes"]))
+    for name, row in zip(report["classes"], report["confusion_matrix"]):
+        print(f"  {name:>{width}}" + "".join(f"{count:>{width}}" for count in row))
+    for name, stats in report["per_class"].items():
+        print(f"  {name:>{width}}  precision {stats['precision']:.4f}  recall {stats['recall']:.4f}  "
+              f"f1 {stats['f1']:.4f}  support {stats['support']}")
+    calibration = report["calibration"]
+    print(f"  calibration ECE {calibration['ece']:.4f}  MCE {calibration['mce']:.4f}  Brier {calibration['brier']:.4f}")
+    for stage, summary in report["latency_ms"].items():
+        print(f"  {stage:>9} ms  p50 {summary['p50']:.2f}  p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f}")
+
+
+def metrics(folder: str, model_path: str = None, threshold: float = 0.0) -> Dict[str, Any]:
+    """
+    Evaluate one model on a labelled split and write eval_report.json next to its weights
+    
+    Returns:
+        The score() report
+    """
+    report = score(evaluate(folder, model_path), threshold)
+    print_report(report)
+    report_path = Path(model_path or config.MODEL_PATH).parent / "eval_report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report written to {report_path}")
+    return report
+
+
+def compare(folder: str, model_a: str, model_b: str, threshold: float = 0.0) -> Dict[str, Any]:
+    """
+    Compare two model versions on the same labelled split
+    
+    Images are matched by content; each model only runs on images it has no
+    cached probabilities for.
+    
+    Returns:
+        Dictionary with both reports, top-1 agreement and the images whose
+        correctness changed from model_a to model_b
+    """
+    cache = EvalCache()
+    runs = [evaluate(folder, model_path, cache=cache) for model_path in (model_a, model_b)]
+    cache.close()
+    reports = [score(run, threshold) for run in runs]
+    for report in reports:
+        print_report(report)
+    
+    # Both runs list the same images unless one model failed to decode some
+    common = sorted(set(runs[0]["paths"]) & set(runs[1]["paths"]))
+    index = [{path: idx for idx, path in enumerate(run["paths"])} for run in runs]
+    predicted = [np.argmax(run["probs"][[index[side][path] for path in common]], axis=1) for side, run in enumerate(runs)]
+    labels = runs[0]["labels"][[index[0][path] for path in common]]
+    fixed = [path for path, a, b, label in zip(common, *predicted, labels) if a != label and b == label]
+    broken = [path for path, a, b, label in zip(common, *predicted, labels) if a == label and b != label]
+    agreement = float(np.mean(predicted[0] == predicted[1])) if common else 0.0
+    print(f"top-1 agreement {agreement:.4f} on {len(common)} image(s): "
+          f"{len(fixed)} fixed, {len(broken)} broken by {model_b}")
+    return {"a": reports[0], "b": reports[1], "agreement": round(agreement, 4), "fixed": fixed, "broken": broken}
 
-def metrics():
-    model = YOLO(MODEL_PATH)
-    results = model.val(data=DATA_PATH)
-    print(results)
 
 if __name__ == "__main__":
-    metrics()
+    if len(sys.argv) < 3:
+        print("Usage: python metrics.py eval <dataset_folder> [threshold]")
+        print("       python metrics.py compare <dataset_folder> <model_a.pt> <model_b.pt> [threshold]")
+        sys.exit(1)
+    
+    command = sys.argv[1]
+    folder_path = sys.argv[2]
+    
+    if command.lower() == "eval":
+        metrics(folder_path, threshold=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0)
+    elif command.lower() == "compare" and len(sys.argv) >= 5:
+        compare(folder_path, sys.argv[3], sys.argv[4], float(sys.argv[5]) if len(sys.argv) > 5 else 0.0)
+    else:
+        print(f"Unknown command: {command}")
+
+
+# how to run
+# python metrics.py eval "C:/Users/Admin/Downloads/dataset-split"          (uses the val split)
+# python metrics.py eval "C:/Users/Admin/Downloads/dataset-split" 0.8      (re-score, no inference)
+# python metrics.py compare "C:/Users/Admin/Downloads/dataset-split" old/best.pt new/best.pt
@@ -0,0 +1,386 @@
+"""
+Model Server - Multi-Process Inference
+Runs YOLOv8 models in dedicated worker processes fed through shared memory
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+import numpy as np
+import config
+from telemetry import Histogram
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME_PREFIX = "model-worker"
+# Seconds between liveness checks of the worker processes
+WORKER_CHECK_INTERVAL = 1.0
+
+
+def in_model_worker() -> bool:
+    """
+    Check whether the current process is a model worker
+    
+    ModelWorkerPool uses this to refuse to start when it is created inside
+    a worker, e.g. by a launching script that spawned workers re-import.
+    """
+    return multiprocessing.current_process().name.startswith(WORKER_NAME_PREFIX)
+
+
+def default_worker_threads(num_workers: int) -> int:
+    """Split the available cores evenly between the model workers"""
+    return max(1, (os.cpu_count() or 1) // max(1, num_workers))
+
+
+def _worker_cpus(worker_id: int, threads: int) -> Optional[set]:
+    """Cores a worker is pinned to, or None when pinning is not possible"""
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    start = (worker_id * threads) % len(cores)
+    return {cores[(start + offset) % len(cores)] for offset in range(threads)}
+
+
+def _worker_main(worker_id: int, model_path: str, backend_name: str, threads: int, pin_cpus: bool,
+                 max_batch_size: int, warmup_batch_sizes: List[int], task_queue, result_queue) -> None:
+    """
+    Entry point of a model worker process
+    
+    Thread counts are fixed before the inference runtime is imported so
+    that N workers together never run more compute threads than there are
+    cores. The worker warms up before reporting ready.
+    """
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    
+    if pin_cpus:
+        cpus = _worker_cpus(worker_id, threads)
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+    
+    from inference_backends import create_backend, warmup_backend
+    
+    if backend_name == "torch":
+        import torch
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only allowed before any parallel work has started
+            pass
+    
+    backend = create_backend(model_path, backend_name, threads)
+    warmup = None
+    if warmup_batch_sizes:
+        warmup = warmup_backend(backend, warmup_batch_sizes, config.WARMUP_ITERATIONS)
+    result_queue.put(("ready", worker_id, {
+        "names": dict(backend.names),
+        "input_size": backend.input_size,
+        "warmup": warmup
+    }))
+    
+    running = True
+    while running:
+        task = task_queue.get()
+        if task is None:
+            break
+        
+        # Greedily take whatever else is already queued, up to the batch size
+        batch = [task]
+        while len(batch) < max_batch_size:
+            try:
+                task = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                running = False
+                break
+            batch.append(task)
+        
+        job_ids = [job_id for job_id, _, _, _, _ in batch]
+        result_queue.put(("started", worker_id, job_ids))
+        
+        segments = []
+        images = []
+        jobs = []
+        started = time.time()
+        try:
+            for job_id, name, shape, dtype, enqueued in batch:
+                try:
+                    segment = shared_memory.SharedMemory(name=name)
+                except FileNotFoundError:
+                    # Timed out and released by the pool before a worker got to it
+                    continue
+                segments.append(segment)
+                jobs.append((job_id, enqueued))
+                images.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf))
+            
+            inference_start = time.perf_counter()
+            outputs = backend.infer(images) if images else []
+            inference_time = (time.perf_counter() - inference_start) * 1000
+            
+            outputs = list(outputs)
+            for job_id, _ in jobs[len(outputs):]:
+                result_queue.put(("error", job_id, f"Model returned {len(outputs)} output(s) "
+                                                   f"for a batch of {len(jobs)} image(s)"))
+            for (job_id, enqueued), probs in zip(jobs, outputs):
+                result_queue.put(("result", job_id, {
+                    "probs": probs,
+                    "inference_ms": inference_time,
+                    "queue_wait_ms": max(0.0, (started - enqueued) * 1000),
+                    "batch_size": len(jobs)
+                }))
+        except Exception as e:
+            for job_id in job_ids:
+                result_queue.put(("error", job_id, str(e)))
+        finally:
+            images.clear()
+            for segment in segments:
+                segment.close()
+    
+    result_queue.put(("stopped", worker_id, None))
+
+
+class ModelWorkerPool:
+    """
+    Pool of worker processes, each holding its own loaded model backend
+    
+    Decoded images are copied once into a shared memory segment and only
+    the segment name, shape and dtype travel through the task queue. The
+    workers pull tasks from one shared queue and batch whatever is waiting,
+    so the pool both batches and runs batches in parallel. submit() has the
+    same contract as InferenceBatcher.submit().
+    """
+    
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+    QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+    
+    def __init__(self, model_path: str = None, backend: str = None, num_workers: int = None,
+                 threads_per_worker: int = None, max_batch_size: int = None,
+                 pin_cpus: bool = None, start_timeout: float = 300, job_timeout: float = None):
+        """
+        Start the worker processes and wait until every model is loaded
+        
+        Args:
+            model_path: Path to the YOLOv8 model file (defaults to config.MODEL_PATH)
+            backend: Inference backend the workers run (defaults to config.INFERENCE_BACKEND)
+            num_workers: Number of worker processes (defaults to config.MODEL_WORKERS)
+            threads_per_worker: Compute threads per worker (defaults to config.MODEL_WORKER_THREADS,
+                0 splits the cores evenly)
+            max_batch_size: Largest batch a worker runs (defaults to config.BATCH_MAX_SIZE)
+            pin_cpus: Pin each worker to its own cores (defaults to config.MODEL_WORKER_PIN_CPUS)
+            start_timeout: Seconds to wait for the workers to load their models
+            job_timeout: Seconds until an image no worker answered fails (defaults to
+                config.MODEL_WORKER_JOB_TIMEOUT)
+        """
+        if in_model_worker():
+            raise RuntimeError("Model workers cannot start their own model workers")
+        
+        self.model_path = model_path or config.MODEL_PATH
+        self.backend = (backend or config.INFERENCE_BACKEND).lower()
+        self.num_workers = max(1, num_workers or config.MODEL_WORKERS)
+        self.threads_per_worker = (threads_per_worker or config.MODEL_WORKER_THREADS
+                                   or default_worker_threads(self.num_workers))
+        self.max_batch_size = max(1, max_batch_size or config.BATCH_MAX_SIZE)
+        self.pin_cpus = config.MODEL_WORKER_PIN_CPUS if pin_cpus is None else pin_cpus
+        self.job_timeout = job_timeout or config.MODEL_WORKER_JOB_TIMEOUT
+        self.names: Dict[int, str] = {}
+        self.input_size = None
+        # Warm-up timings reported by each worker, keyed by worker id
+        self.warmup: Dict[int, Optional[Dict[str, Any]]] = {}
+        
+        self.batch_size_histogram = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+        
+        # spawn gives every worker a clean interpreter, safe to combine with torch
+        self._context = multiprocessing.get_context("spawn")
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        # Job id -> (future, segment, deadline), from submit() until a worker answers
+        self._pending: Dict[int, tuple] = {}
+        self._running_jobs: Dict[int, List[int]] = {}
+        self._closing = False
+        self._restarts = 0
+        
+        self._processes = [self._start_worker(worker_id) for worker_id in range(self.num_workers)]
+        self._wait_until_ready(start_timeout)
+        
+        self._collector = threading.Thread(target=self._collect, name="model-worker-results", daemon=True)
+        self._collector.start()
+    
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        Hand an image to the worker processes
+        
+        Args:
+            image: Decoded image as numpy array
+        
+        Returns:
+            Future resolved with a dict holding "probs", "inference_ms",
+            "queue_wait_ms" and "batch_size"
+        """
+        future = Future()
+        image = np.ascontiguousarray(image)
+        segment = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        np.ndarray(image.shape, dtype=image.dtype, buffer=segment.buf)[...] = image
+        
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._pending[job_id] = (future, segment, time.monotonic() + self.job_timeout)
+        self._task_queue.put((job_id, segment.name, image.shape, image.dtype.str, time.time()))
+        return future
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get worker pool configuration and histograms"""
+        return {
+            "mode": "process",
+            "backend": self.backend,
+            "workers": self.num_workers,
+            "workers_alive": sum(process.is_alive() for process in self._processes),
+            "worker_restarts": self._restarts,
+            "threads_per_worker": self.threads_per_worker,
+            "pinned_cpus": self.pin_cpus,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": len(self._pending),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_histogram.snapshot()
+        }
+    
+    def close(self, timeout: float = 10) -> None:
+        """Stop the workers and release every outstanding shared memory segment"""
+        self._closing = True
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        
+        with self._lock:
+            pending = list(self._pending.items())
+            self._pending.clear()
+        for job_id, (future, segment, _) in pending:
+            self._release(segment)
+            if not future.done():
+                future.set_exception(RuntimeError("Model worker pool closed"))
+    
+    def _start_worker(self, worker_id: int):
+        """Spawn one worker process"""
+        process = self._context.Process(
+            target=_worker_main,
+            name=f"{WORKER_NAME_PREFIX}-{worker_id}",
+            args=(worker_id, self.model_path, self.backend, self.threads_per_worker, self.pin_cpus,
+                  self.max_batch_size, self._warmup_batch_sizes(), self._task_queue, self._result_queue),
+            daemon=True
+        )
+        process.start()
+        return process
+    
+    def _warmup_batch_sizes(self) -> List[int]:
+        """Configured warm-up batch sizes a worker can actually run"""
+        if not config.WARMUP_ENABLED:
+            return []
+        return [size for size in config.WARMUP_BATCH_SIZES if size <= self.max_batch_size]
+    
+    def _wait_until_ready(self, timeout: float) -> None:
+        """Block until every worker reported its loaded and warmed up model"""
+        deadline = time.monotonic() + timeout
+        ready = set()
+        while len(ready) < self.num_workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise RuntimeError("Timed out waiting for model workers to load")
+            try:
+                kind, worker_id, payload = self._result_queue.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    self.close()
+                    raise RuntimeError("A model worker exited while loading the model")
+                continue
+            if kind == "ready":
+                ready.add(worker_id)
+                self.names = {int(idx): name for idx, name in payload["names"].items()}
+                self.input_size = payload["input_size"]
+                self.warmup[worker_id] = payload["warmup"]
+                if payload["warmup"]:
+                    logger.info(f"Model worker {worker_id} warmed up in {payload['warmup']['total_ms']} ms")
+        logger.info(f"{self.num_workers} model worker(s) ready, {self.threads_per_worker} thread(s) each")
+    
+    def _collect(self) -> None:
+        """Resolve futures from worker messages and replace crashed workers"""
+        next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        while not self._closing:
+            # Checked on a timer: under steady load from the other workers the
+            # queue is never idle, and a crashed worker's jobs would hang
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+            try:
+                kind, key, payload = self._result_queue.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            if kind == "started":
+                self._running_jobs[key] = payload
+                self.batch_size_histogram.observe(len(payload))
+            elif kind in ("result", "error"):
+                with self._lock:
+                    entry = self._pending.pop(key, None)
+                if entry is None:
+                    continue
+                future, segment, _ = entry
+                self._release(segment)
+                if kind == "result":
+                    self.queue_wait_histogram.observe(payload["queue_wait_ms"])
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+    
+    def _check_workers(self) -> None:
+        """
+        Fail the jobs of dead workers, start replacements and fail timed out jobs
+        
+        A worker only reports jobs as running once it took them off the
+        queue; jobs of a worker that died in between are failed by their
+        deadline.
+        """
+        for worker_id, process in enumerate(self._processes):
+            if process.is_alive() or self._closing:
+                continue
+            logger.error(f"Model worker {worker_id} exited with code {process.exitcode}, restarting")
+            for job_id in self._running_jobs.pop(worker_id, []):
+                with self._lock:
+                    entry = self._pending.pop(job_id, None)
+                if entry is not None:
+                    future, segment, _ = entry
+                    self._release(segment)
+                    future.set_exception(RuntimeError("Model worker crashed during inference"))
+            self._processes[worker_id] = self._start_worker(worker_id)
+            self._restarts += 1
+        
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, (_, _, deadline) in self._pending.items() if deadline <= now]
+            entries = [self._pending.pop(job_id) for job_id in expired]
+        for future, segment, _ in entries:
+            self._release(segment)
+            future.set_exception(TimeoutError(f"No model worker answered within {self.job_timeout:g} s"))
+    
+    @staticmethod
+    def _release(segment: shared_memory.SharedMemory) -> None:
+        """Close and unlink a shared memory segment"""
+        try:
+            segment.close()
+            segment.unlink()
+        except FileNotFoundError:
+            pass
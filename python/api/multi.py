@@ -1,55 +1,458 @@
-import sys
+"""
+Bulk Classification - Pipelined Folder Classifier
+Walks a folder tree and classifies every image through bounded stages:
+walk -> decode workers -> batched inference -> JSONL/CSV writer
+Completed images go to a manifest, reruns only classify new or changed files
+"""
+import csv
+import json
 import os
-from ultralytics import YOLO
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+import config
+from bulk_manifest import BulkManifest, content_hash, manifest_path_for
+from classify_daemon import DaemonBackend, connect_daemon
+from image_decode import decode_image
+from inference_backends import create_backend
+from predict_service import PredictionService
+
+SUPPORTED_EXTS = (".jpg", ".jpeg", ".png")
+CSV_FIELDS = ["path", "class", "confidence", "error", "cached"]
+# Seconds a blocked stage waits before checking whether another stage failed
+STAGE_POLL_SECONDS = 0.1
 
-MODEL_PATH = "../model/final-version/weights/best.pt"
 
-def classify(image_path, model):
-    if not os.path.exists(image_path):
-        print(f"Error: file '{image_path}' does not exist")
+def iter_images(root: str, onerror: Callable[[OSError], None] = None) -> Iterator[str]:
+    """
+    Yield every supported image below root, depth-first in name order
+    
+    Directories are read one at a time, so only the entries of the current
+    path are held in memory however large the tree is.
+    
+    Args:
+        root: Folder to walk, or a single image file
+        onerror: Called with the OSError of a directory that cannot be read,
+            which is then skipped (as os.walk); by default the error is raised
+    """
+    if os.path.isfile(root):
+        yield root
         return
+    try:
+        with os.scandir(root) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+    except OSError as e:
+        if onerror is None:
+            raise
+        onerror(e)
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_images(entry.path, onerror)
+        elif entry.name.lower().endswith(SUPPORTED_EXTS):
+            yield entry.path
 
-    # Run prediction
-    results = model.predict(image_path, imgsz=640)
 
-    for result in results:
-        class_id = result.probs.top1
-        confidence = result.probs.top1conf.item()
-        class_name = model.names[class_id]
-        print(f"{os.path.basename(image_path)} -> Class: {class_name}, Confidence: {confidence:.4f}")
+class PipelineAborted(Exception):
+    """Raised inside a stage when another stage failed and the run is stopping"""
 
-def classify_folder(folder_path):
-    if not os.path.exists(folder_path):
-        print(f"Error: folder '{folder_path}' does not exist")
-        return
 
-    # Load model once
-    model = YOLO(MODEL_PATH)
+def stage_put(target: queue.Queue, item: Any, abort: threading.Event) -> None:
+    """Put on a bounded stage queue, giving up once the run is aborted"""
+    while True:
+        try:
+            target.put(item, timeout=STAGE_POLL_SECONDS)
+            return
+        except queue.Full:
+            if abort.is_set():
+                raise PipelineAborted()
 
-    # Get all image files (jpg, jpeg, png)
-    supported_exts = (".jpg", ".jpeg", ".png")
-    images = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(supported_exts)]
 
-    if not images:
-        print(f"No images found in '{folder_path}'")
-        return
+def stage_get(source: queue.Queue, abort: threading.Event) -> Any:
+    """Get from a stage queue, giving up once the run is aborted"""
+    while True:
+        try:
+            return source.get(timeout=STAGE_POLL_SECONDS)
+        except queue.Empty:
+            if abort.is_set():
+                raise PipelineAborted()
+
 
-    for image_path in images:
-        classify(image_path, model)
+class StageStats:
+    """Items handled and busy time of one pipeline stage (shared by its workers)"""
+    
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, items: int, seconds: float) -> None:
+        """Add items processed in seconds of work"""
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+    
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        """
+        Throughput of the stage
+        
+        capacity_per_s is what the stage could sustain with all its workers
+        busy; the stage with the lowest capacity bounds the whole run.
+        """
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy, 2),
+            "capacity_per_s": round(self.items * self.workers / self.busy, 1) if self.busy else None,
+            "utilization": round(self.busy / (self.workers * wall_seconds), 3) if wall_seconds else None
+        }
+
+
+class FolderClassifier:
+    """
+    Classifies folder trees with decoding and inference overlapped
+    
+    Paths, decoded images and results flow through bounded queues, so memory
+    stays flat on folders of any size: a stage that falls behind blocks the
+    one in front of it instead of letting work pile up.
+    """
+    
+    def __init__(self, backend=None, decode_workers: int = None, batch_size: int = None,
+                 queue_depth: int = None):
+        """
+        Args:
+            backend: Inference backend (default: the running classification daemon,
+                else create_backend() from config)
+            decode_workers: Decode threads (default config.BULK_DECODE_WORKERS, 0 = one per core)
+            batch_size: Images per forward pass (default config.BULK_BATCH_SIZE)
+            queue_depth: Capacity of each stage queue (default config.BULK_QUEUE_DEPTH)
+        """
+        if backend is None:
+            # A running classify_daemon.py already has the model loaded
+            client = connect_daemon()
+            try:
+                backend = DaemonBackend(client) if client is not None else None
+            except OSError:
+                # Daemon went away between connect and info
+                client.close()
+            backend = backend or create_backend()
+        self.backend = backend
+        self.names = self.backend.names
+        if isinstance(self.backend, DaemonBackend):
+            # Decode size and model identity of the daemon's service
+            self.decode_size = self.backend.decode_size
+            self.fingerprint = self.backend.fingerprint
+        else:
+            self.decode_size = PredictionService.resolve_decode_size(self.backend.input_size)
+            # Same identity as the prediction cache: manifests of another model are not reused
+            self.fingerprint = PredictionService.model_identity(
+                config.MODEL_PATH, self.backend.name, config.MODEL_PRECISION, self.decode_size
+            )
+        decode_workers = config.BULK_DECODE_WORKERS if decode_workers is None else decode_workers
+        self.decode_workers = decode_workers or os.cpu_count() or 1
+        self.batch_size = batch_size or config.BULK_BATCH_SIZE
+        self.queue_depth = max(queue_depth or config.BULK_QUEUE_DEPTH, self.batch_size)
+    
+    @staticmethod
+    def cached_record(image_path: str, entry: tuple) -> Dict[str, Any]:
+        """Output record of an image answered from the manifest"""
+        return {"path": image_path, "class": entry[3], "confidence": entry[4], "error": None, "cached": True}
+    
+    @staticmethod
+    def error_record(image_path: str, error: str) -> Dict[str, Any]:
+        """Output record of an image (or unreadable folder) that could not be classified"""
+        return {"path": image_path, "class": None, "confidence": None, "error": error, "cached": False}
+    
+    def walk(self, root: str, paths: queue.Queue, results: queue.Queue, stats: StageStats,
+             manifest: Optional[BulkManifest], abort: threading.Event) -> None:
+        """
+        Walk stage: feed image paths, then one end marker per decode worker
+        
+        Images whose size and modification time match the manifest go
+        straight to the writer without being read. Folders and files that
+        cannot be read (permissions, broken links) become error records.
+        """
+        def unreadable(error: OSError) -> None:
+            stage_put(results, (self.error_record(error.filename or root, f"Failed to read folder: {error}"), None), abort)
+        
+        try:
+            images = iter_images(root, unreadable)
+            while True:
+                started = time.perf_counter()
+                image_path = next(images, None)
+                if image_path is None:
+                    break
+                name = os.path.relpath(image_path, root) if image_path != root else os.path.basename(root)
+                try:
+                    stat = os.stat(image_path)
+                except OSError as e:
+                    stage_put(results, (self.error_record(image_path, f"Failed to read image: {e}"), None), abort)
+                    continue
+                entry = manifest.lookup(name, stat.st_size, stat.st_mtime_ns) if manifest else None
+                stats.record(1, time.perf_counter() - started)
+                if entry is not None:
+                    stage_put(results, (self.cached_record(image_path, entry), None), abort)
+                else:
+                    stage_put(paths, (image_path, name, stat.st_size, stat.st_mtime_ns), abort)
+        finally:
+            # Also after a failure, so the decode workers never wait for paths that will not come
+            if not abort.is_set():
+                for _ in range(self.decode_workers):
+                    stage_put(paths, None, abort)
+    
+    def decode(self, paths: queue.Queue, decoded: queue.Queue, results: queue.Queue, stats: StageStats,
+               manifest: Optional[BulkManifest], abort: threading.Event) -> None:
+        """
+        Decode stage: read and decode images to the model input size
+        
+        A file whose content hash matches the manifest (touched or copied
+        back, but unchanged) is answered from it instead of being decoded.
+        """
+        while True:
+            item = stage_get(paths, abort)
+            if item is None:
+                stage_put(decoded, None, abort)
+                return
+            image_path, name, size, mtime_ns = item
+            started = time.perf_counter()
+            entry = None
+            try:
+                with open(image_path, "rb") as image_file:
+                    data = image_file.read()
+                digest = content_hash(data) if manifest else None
+                entry = manifest.lookup_content(name, digest) if manifest else None
+                if entry is None:
+                    image, _ = decode_image(data, self.decode_size)
+                    item = (image_path, image, None, (name, size, mtime_ns, digest))
+            except Exception as e:
+                item = (image_path, None, f"Failed to decode image: {e}", None)
+            stats.record(1, time.perf_counter() - started)
+            if entry is not None:
+                stage_put(results, (self.cached_record(image_path, entry), (name, (size, mtime_ns, *entry[2:]))), abort)
+            else:
+                stage_put(decoded, item, abort)
+    
+    def infer_images(self, images: List[np.ndarray]) -> list:
+        """
+        Run images through the backend
+        
+        If the daemon dies or times out mid-run, the model is loaded in this
+        process and the rest of the run continues on it.
+        """
+        try:
+            return self.backend.infer(images)
+        except OSError as e:
+            if not isinstance(self.backend, DaemonBackend):
+                raise
+            print(f"Classification daemon unavailable ({e}), loading the model")
+            self.backend.client.close()
+            self.backend = create_backend()
+            return self.backend.infer(images)
+    
+    def infer(self, batch: List[tuple], results: queue.Queue, stats: StageStats, abort: threading.Event) -> None:
+        """Run one forward pass over a batch of decoded images and queue their results"""
+        started = time.perf_counter()
+        try:
+            probs = self.infer_images([image for _, image, _, _ in batch])
+            records = []
+            for (image_path, _, _, meta), prob in zip(batch, probs):
+                class_name, confidence = self.names[int(np.argmax(prob))], round(float(np.max(prob)), 4)
+                name, size, mtime_ns, digest = meta
+                records.append((
+                    {"path": image_path, "class": class_name, "confidence": confidence, "error": None, "cached": False},
+                    (name, (size, mtime_ns, digest, class_name, confidence)) if digest else None
+                ))
+        except Exception as e:
+            records = [(self.error_record(image_path, f"Inference failed: {e}"), None) for image_path, _, _, _ in batch]
+        stats.record(len(batch), time.perf_counter() - started)
+        for record in records:
+            stage_put(results, record, abort)
+    
+    def write(self, results: queue.Queue, output_path: Optional[str], stats: StageStats,
+              manifest: Optional[BulkManifest], counts: Dict[str, Any], abort: threading.Event) -> None:
+        """Writer stage: JSONL (default) or CSV file, or one line per image on stdout, plus the manifest"""
+        output = open(output_path, "w", newline="", encoding="utf-8") if output_path else None
+        writer = csv.DictWriter(output, CSV_FIELDS) if output_path and output_path.lower().endswith(".csv") else None
+        if writer is not None:
+            writer.writeheader()
+        try:
+            while True:
+                item = stage_get(results, abort)
+                if item is None:
+                    return
+                record, manifest_entry = item
+                started = time.perf_counter()
+                if manifest_entry is not None and manifest is not None:
+                    manifest.add(*manifest_entry)
+                if record["cached"]:
+                    # Unchanged by size + mtime, or by content hash (then with an updated entry)
+                    counts["rehashed" if manifest_entry else "skipped"] += 1
+                if record["error"]:
+                    counts["errors"] += 1
+                else:
+                    counts["classes"][record["class"]] = counts["classes"].get(record["class"], 0) + 1
+                if writer is not None:
+                    writer.writerow(record)
+                elif output is not None:
+                    output.write(json.dumps(record) + "\n")
+                elif record["error"]:
+                    print(f"{os.path.basename(record['path'])} -> Error: {record['error']}")
+                else:
+                    print(f"{os.path.basename(record['path'])} -> Class: {record['class']}, "
+                          f"Confidence: {record['confidence']:.4f}{' (cached)' if record['cached'] else ''}")
+                stats.record(1, time.perf_counter() - started)
+        finally:
+            if output is not None:
+                output.close()
+    
+    def run(self, root: str, output_path: str = None, manifest_path: str = None) -> Dict[str, Any]:
+        """
+        Classify every image below root
+        
+        Args:
+            root: Folder (searched recursively) or single image
+            output_path: .jsonl or .csv file for the results, None prints them
+            manifest_path: Manifest of completed images (default: one per folder in
+                BULK_MANIFEST_DIR if BULK_MANIFEST_ENABLED, "" = none)
+        
+        Returns:
+            Run summary: image, skipped and error counts, class counts, wall
+            time, overall throughput and per-stage throughput
+        """
+        if manifest_path is None:
+            manifest_path = str(manifest_path_for(root)) if config.BULK_MANIFEST_ENABLED else ""
+        manifest = BulkManifest(manifest_path, self.fingerprint) if manifest_path else None
+        paths = queue.Queue(self.queue_depth)
+        decoded = queue.Queue(self.queue_depth)
+        results = queue.Queue(self.queue_depth)
+        stages = {
+            "walk": StageStats("walk"),
+            "decode": StageStats("decode", self.decode_workers),
+            "inference": StageStats("inference"),
+            "write": StageStats("write")
+        }
+        counts = {"errors": 0, "skipped": 0, "rehashed": 0, "classes": {}}
+        started = time.perf_counter()
+        
+        # A stage that fails sets abort: the others stop instead of blocking on its queues
+        abort = threading.Event()
+        failures = []
+        
+        def stage(name: str, target: Callable[..., None], *args: Any) -> threading.Thread:
+            def body() -> None:
+                try:
+                    target(*args, abort)
+                except PipelineAborted:
+                    pass
+                except BaseException as e:
+                    failures.append((name, e))
+                    abort.set()
+            return threading.Thread(target=body, name=f"bulk-{name}", daemon=True)
+        
+        threads = [stage("walk", self.walk, root, paths, results, stages["walk"], manifest)]
+        threads += [
+            stage(f"decode-{idx}", self.decode, paths, decoded, results, stages["decode"], manifest)
+            for idx in range(self.decode_workers)
+        ]
+        threads.append(stage("write", self.write, results, output_path, stages["write"], manifest, counts))
+        for thread in threads:
+            thread.start()
+        
+        try:
+            try:
+                # Inference stage on this thread: full batches, decode errors go straight to the writer
+                batch, finished = [], 0
+                while finished < self.decode_workers:
+                    item = stage_get(decoded, abort)
+                    if item is None:
+                        finished += 1
+                    elif item[2] is not None:
+                        stage_put(results, (self.error_record(item[0], item[2]), None), abort)
+                    else:
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            self.infer(batch, results, stages["inference"], abort)
+                            batch = []
+                if batch:
+                    self.infer(batch, results, stages["inference"], abort)
+                stage_put(results, None, abort)
+            except PipelineAborted:
+                pass
+            except BaseException:
+                abort.set()
+                raise
+            finally:
+                for thread in threads:
+                    thread.join()
+        finally:
+            # Also on Ctrl+C or a failed stage: everything the writer got so far is kept for the next run
+            if manifest is not None:
+                manifest.close()
+        if failures:
+            name, error = failures[0]
+            raise RuntimeError(f"Bulk classification stopped, {name} stage failed: {error}") from error
+        
+        wall = time.perf_counter() - started
+        images = stages["write"].items
+        return {
+            "images": images,
+            "classified": images - counts["skipped"] - counts["rehashed"] - counts["errors"],
+            "skipped": counts["skipped"] + counts["rehashed"],
+            "errors": counts["errors"],
+            "classes": counts["classes"],
+            "wall_s": round(wall, 2),
+            "images_per_s": round(images / wall, 1) if wall else None,
+            "batch_size": self.batch_size,
+            "manifest": manifest.stats() if manifest is not None else None,
+            "stages": {name: stats.summary(wall) for name, stats in stages.items()}
+        }
+
+
+def classify_folder(folder_path, output_path=None):
+    if not os.path.exists(folder_path):
+        print(f"Error: folder '{folder_path}' does not exist")
+        return
+    
+    try:
+        summary = FolderClassifier().run(folder_path, output_path)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+    
+    if not summary["images"]:
+        print(f"No images found in '{folder_path}'")
+        return summary
+    
+    print(f"Classified {summary['images']} image(s) in {summary['wall_s']} s "
+          f"({summary['images_per_s']} images/s, {summary['errors']} error(s)): {summary['classes']}")
+    if summary["manifest"]:
+        print(f"  {summary['skipped']} unchanged image(s) answered from {summary['manifest']['path']}, "
+              f"{summary['classified']} classified")
+    for name, stage in summary["stages"].items():
+        print(f"  {name:<10} {stage['workers']:>2} worker(s) {stage['items']:>8} items "
+              f"busy {stage['busy_s']:>8.2f} s  capacity {stage['capacity_per_s']} /s  "
+              f"utilization {stage['utilization']}")
+    return summary
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python multi.py cls <folder_path>")
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python multi.py cls <folder_path> [results.jsonl|results.csv]")
         sys.exit(1)
 
     command = sys.argv[1]
     folder_path = sys.argv[2]
 
     if command.lower() == "cls":
-        classify_folder(folder_path)
+        classify_folder(folder_path, sys.argv[3] if len(sys.argv) > 3 else None)
     else:
         print(f"Unknown command: {command}")
 
 
 # how to run
 # python multi.py cls "C:/Users/Admin/Documents/thesis/dataset/high/"
+# python multi.py cls "C:/Users/Admin/Documents/thesis/dataset/" results.jsonl
@@ -2,11 +2,18 @@
 Prediction Controller - API Routes
 Handles HTTP requests for image classification
 """
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status, File, UploadFile, Request
+from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
-from predict_service import get_prediction_service
+from typing import Callable, List, Literal, Optional, Dict, Any, Union
+from inference_pool import get_inference_pool, PoolSaturatedError
+from datetime import datetime
+import asyncio
 import logging
+import queue
+import threading
+import time
+import config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,12 +22,252 @@ logger = logging.getLogger(__name__)
 # Initialize router
 router = APIRouter()
 
-# Initialize prediction service
-try:
-    prediction_service = get_prediction_service()
-except Exception as e:
-    logger.error(f"Failed to initialize prediction service: {e}")
-    prediction_service = None
+# Prediction service, built by the startup hook or on first use so that importing
+# this module never pulls in numpy/torch/ultralytics or loads the model
+prediction_service = None
+prediction_service_error: Optional[str] = None
+_service_lock = threading.Lock()
+
+
+def load_prediction_service(warmup: bool = True):
+    """
+    Build the prediction service once (imports the ML stack and loads the model)
+    
+    Args:
+        warmup: Run the warm-up inferences after loading
+    
+    Returns:
+        PredictionService instance, or None if it failed to load
+    """
+    global prediction_service, prediction_service_error
+    with _service_lock:
+        if prediction_service is None and prediction_service_error is None:
+            try:
+                from predict_service import get_prediction_service
+                service = get_prediction_service()
+                if warmup:
+                    service.warmup()
+                prediction_service = service
+            except Exception as e:
+                logger.error(f"Failed to initialize prediction service: {e}")
+                prediction_service_error = str(e)
+    return prediction_service
+
+
+def start_prediction_service() -> threading.Thread:
+    """Load and warm up the model in a background thread (used by the startup hook)"""
+    thread = threading.Thread(target=load_prediction_service, name="model-startup", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_prediction_service() -> None:
+    """
+    Wait for running prediction jobs, then stop the batcher or model worker
+    processes (used by the shutdown hook)
+    """
+    inference_pool.shutdown()
+    with _service_lock:
+        if prediction_service is not None:
+            prediction_service.close()
+
+
+def prediction_readiness() -> Dict[str, Any]:
+    """
+    Get readiness of the prediction service
+    
+    Returns:
+        Dictionary with the ready flag, whether the model is loaded, warm-up
+        timings and load/warm-up error
+    """
+    if prediction_service is not None:
+        return {**prediction_service.readiness(), "model_loaded": True}
+    if prediction_service_error is not None:
+        return {"ready": False, "model_loaded": False, "warmup": None, "error": prediction_service_error}
+    # Still loading at startup, or (MODEL_PRELOAD off) loaded by the first request
+    return {"ready": not config.MODEL_PRELOAD, "model_loaded": False, "warmup": None, "error": None}
+
+
+def load_fertility_surface():
+    """
+    Load or build the precomputed fertility surface once (imports numpy)
+    
+    Returns:
+        FertilitySurface instance, or None if the surface is disabled
+    """
+    if not config.FERTILITY_SURFACE_ENABLED:
+        return None
+    from fertility_surface import get_fertility_surface
+    return get_fertility_surface()
+
+
+def start_fertility_surface() -> threading.Thread:
+    """Load or build the fertility surface in a background thread (used by the startup hook)"""
+    thread = threading.Thread(target=load_fertility_surface, name="fertility-surface", daemon=True)
+    thread.start()
+    return thread
+
+
+async def require_prediction_service():
+    """
+    Get the prediction service for a request, loading it off the event loop on first use
+    
+    Raises:
+        HTTPException: 503 if the service failed to load
+    """
+    service = prediction_service or await asyncio.to_thread(load_prediction_service)
+    if service is None:
+        logger.error("Prediction service not initialized")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prediction service is not available"
+        )
+    return service
+
+
+# Blocking decode/inference work runs here, never on the event loop
+inference_pool = get_inference_pool()
+
+
+def profiled(http_request: Request, fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """
+    fn itself, or fn running under the request profiler when this request is profiled
+    
+    With PROFILING_ENABLED off this is a single flag check, the profiler is never imported.
+    """
+    if not config.PROFILING_ENABLED:
+        return fn
+    from request_profiler import get_request_profiler
+    profiler = get_request_profiler()
+    if not profiler.should_profile(http_request.headers.get(config.PROFILING_HEADER)):
+        return fn
+    return profiler.wrap(fn, http_request.url.path)
+
+
+def batch_prediction_response(result: Dict[str, Any]) -> "PredictionResponse":
+    """
+    Build the response of a batch prediction
+    
+    Raises:
+        HTTPException: 400 if every image of the batch failed
+    """
+    # Check if all predictions failed - RETURN 400 BAD REQUEST
+    if result["successful_predictions"] == 0:
+        logger.error("All predictions failed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "failed",
+                "message": "All image predictions failed",
+                "data": result
+            }
+        )
+    
+    # Partial or full success
+    if result["failed_predictions"] > 0:
+        message = f"Images classified with {result['failed_predictions']} error(s)"
+        logger.warning(message)
+    else:
+        message = "Images classified successfully"
+        logger.info(message)
+    
+    return PredictionResponse(
+        status="success",
+        message=message,
+        data=result
+    )
+
+
+def pool_saturated_exception() -> HTTPException:
+    """Build the 503 response returned when the inference pool is full"""
+    logger.warning("Inference pool saturated, rejecting request")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Prediction queue is full, retry later",
+        headers={"Retry-After": str(config.INFERENCE_RETRY_AFTER)}
+    )
+
+
+class UploadPartReader:
+    """
+    Incremental multipart/form-data parser for streamed batch uploads
+    
+    Fed the request body chunk by chunk; every file part of the expected
+    field is put on a queue as soon as its last byte arrived, so the images
+    received so far can be decoded and classified while the rest is still
+    being uploaded. None is queued once the body ends.
+    """
+    
+    def __init__(self, content_type: str, field_name: str = "files"):
+        """
+        Args:
+            content_type: Content-Type header of the request (carries the boundary)
+            field_name: Form field holding the image files
+        
+        Raises:
+            ValueError: If the request is not multipart/form-data
+        """
+        from multipart.multipart import MultipartParser, parse_options_header
+        
+        self._parse_options_header = parse_options_header
+        mime_type, params = parse_options_header(content_type)
+        if mime_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise ValueError("Expected a multipart/form-data body")
+        
+        self.field_name = field_name.encode()
+        self.parts: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.received = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._wanted = False
+        self._chunks: List[bytes] = []
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+    
+    def write(self, chunk: bytes) -> None:
+        """Parse the next chunk of the body"""
+        self._parser.write(chunk)
+    
+    def close(self) -> None:
+        """Mark the end of the parts (also after a failed or aborted upload)"""
+        self.parts.put(None)
+    
+    def __iter__(self):
+        """Yield the received parts until the body ended (blocks between parts)"""
+        return iter(self.parts.get, None)
+    
+    def _on_part_begin(self) -> None:
+        self._wanted = False
+        self._chunks = []
+    
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+    
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+    
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            _, options = self._parse_options_header(self._header_value)
+            self._wanted = options.get(b"name") == self.field_name
+        self._header_field = b""
+        self._header_value = b""
+    
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._wanted:
+            self._chunks.append(data[start:end])
+    
+    def _on_part_end(self) -> None:
+        if self._wanted:
+            self.parts.put(b"".join(self._chunks))
+            self.received += 1
+        self._chunks = []
 
 
 class SingleImageRequest(BaseModel):
@@ -68,7 +315,7 @@ class PredictionData(BaseModel):
     """Model for single prediction data"""
     class_name: str = Field(..., alias="class")
     confidence: float
-    speed: Dict[str, float]
+    speed: Dict[str, Union[float, int, bool]]  # stage timings in ms, batch_size and cache_hit
     image_info: Dict[str, Any]
     top5_predictions: List[Dict[str, Any]]
     all_classes_count: int
@@ -85,6 +332,38 @@ class PredictionResponse(BaseModel):
     data: Dict[str, Any]
 
 
+class FertilityRequest(SingleImageRequest):
+    """Model for combined classification + fertility inference request"""
+    temperature: float = Field(..., description="Temperature in °C", example=22)
+    humidity: Optional[float] = Field(None, ge=0, le=100, description="Relative humidity in %", example=60)
+
+
+class FertilityBatchRequest(BaseModel):
+    """Model for fuzzy fertility inference over many readings (columnar)"""
+    featherDensity: Union[Literal["LOW", "HIGH"], List[Literal["LOW", "HIGH"]]] = Field(
+        ...,
+        description="Feather density per reading, or one value for all readings",
+        example="HIGH"
+    )
+    temperature: List[float] = Field(..., min_items=1, description="Temperatures in °C", example=[18, 22, 31])
+    humidity: Optional[List[Optional[float]]] = Field(
+        None,
+        description="Relative humidity in % per reading (null = unknown)",
+        example=[55, None, 80]
+    )
+    exact: bool = Field(
+        False,
+        description="Run the fuzzy inference for every reading instead of interpolating the precomputed surface"
+    )
+    
+    @validator('featherDensity')
+    def validate_feather_density(cls, v):
+        """Validate that a density list is not empty"""
+        if isinstance(v, list) and not v:
+            raise ValueError("featherDensity list cannot be empty")
+        return v
+
+
 # API Endpoints
 @router.post(
     "/predict",
@@ -106,50 +385,411 @@ async def predict(request: ImageRequest) -> PredictionResponse:
     Raises:
         HTTPException: If prediction service is not initialized or prediction fails
     """
-    # Check if service is initialized
-    if prediction_service is None:
-        logger.error("Prediction service not initialized")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Prediction service is not available"
-        )
+    service = await require_prediction_service()
     
     try:
         logger.info(f"Received prediction request for {len(request.images)} image(s)")
         
         # Predict batch
-        result = prediction_service.predict_batch(request.images)
+        result = await inference_pool.run(service.predict_batch, request.images)
+        
+        return batch_prediction_response(result)
+        
+    except HTTPException:
+        # Re-raise HTTPExceptions (like the 400 above)
+        raise
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
+    except ValueError as ve:
+        logger.error(f"Validation error: {ve}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+
+@router.post(
+    "/predict/single",
+    response_model=PredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Predict single image classification",
+    description="Classify a single image using YOLOv8 model"
+)
+async def predict_single(request: SingleImageRequest, http_request: Request) -> PredictionResponse:
+    """
+    Predict classification for a single image
+    
+    Args:
+        request: SingleImageRequest containing base64 encoded image string
+        http_request: Incoming request (its profiling header is honoured)
+        
+    Returns:
+        PredictionResponse with classification result
+    """
+    service = await require_prediction_service()
+    
+    try:
+        logger.info("Received single image prediction request")
+        
+        # Predict single image
+        result = await inference_pool.run(profiled(http_request, service.predict_single_image), request.image)
+        
+        return PredictionResponse(
+            status="success",
+            message="Image classified successfully",
+            data=result
+        )
+        
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
+    except ValueError as ve:
+        logger.error(f"Validation error: {ve}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+
+@router.post(
+    "/predict/fertility",
+    response_model=PredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Predict fertility from an image",
+    description="Classify feather density and run the fuzzy fertility inference in one request"
+)
+async def predict_fertility(request: FertilityRequest) -> PredictionResponse:
+    """
+    Classify a single image and infer fertility from its feather density
+    
+    Args:
+        request: FertilityRequest with base64 image, temperature and optional humidity
+        
+    Returns:
+        PredictionResponse with classification and fuzzyResult (same shape as the
+        NestJS /predict/fertility response)
+    """
+    service = await require_prediction_service()
+    
+    try:
+        logger.info("Received fertility prediction request")
+        
+        result = await inference_pool.run(service.predict_single_image, request.image)
         
-        # Check if all predictions failed - RETURN 400 BAD REQUEST
-        if result["successful_predictions"] == 0:
-            logger.error("All predictions failed")
+        from fuzzy_service import get_fuzzy_logic_service, map_class_to_density
+        feather_density = map_class_to_density(result["class"])
+        fuzzy_result = get_fuzzy_logic_service().infer(feather_density, request.temperature, request.humidity)
+        
+        return PredictionResponse(
+            status="success",
+            message="Fertility predicted successfully",
+            data={
+                "classification": {
+                    "modelVersion": "YOLOv8-custom",
+                    "featherDensity": feather_density,
+                    "confidence": result["confidence"],
+                    "inferenceTimeMs": result["speed"]["total_ms"],
+                    "raw": result
+                },
+                "fuzzyResult": fuzzy_result
+            }
+        )
+        
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
+    except ValueError as ve:
+        logger.error(f"Validation error: {ve}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+
+@router.post(
+    "/fertility/infer",
+    response_model=PredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Infer fertility for many readings",
+    description="Run the fuzzy fertility inference over arrays of feather density, temperature and humidity"
+)
+async def infer_fertility(request: FertilityBatchRequest) -> PredictionResponse:
+    """
+    Infer fertility for many (density, temperature, humidity) readings at once
+    
+    Args:
+        request: FertilityBatchRequest with one value per reading in each array
+        
+    Returns:
+        PredictionResponse with per-reading fertilityScore, fertilityLevel and tci
+    """
+    count = len(request.temperature)
+    for name, values in (("featherDensity", request.featherDensity), ("humidity", request.humidity)):
+        if isinstance(values, list) and len(values) != count:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "status": "failed",
-                    "message": "All image predictions failed",
-                    "data": result
-                }
+                detail=f"{name} must have one value per temperature ({len(values)} != {count})"
             )
-        
-        # Partial or full success
-        if result["failed_predictions"] > 0:
-            message = f"Images classified with {result['failed_predictions']} error(s)"
-            logger.warning(message)
+    
+    from fuzzy_service import get_fuzzy_logic_service, thermal_comfort_index
+    import numpy as np
+    humidity = None
+    if request.humidity is not None:
+        humidity = [float("nan") if value is None else value for value in request.humidity]
+    
+    surface = None if request.exact else await asyncio.to_thread(load_fertility_surface)
+    try:
+        if surface is not None:
+            result = await asyncio.to_thread(surface.score, request.featherDensity, request.temperature, humidity)
         else:
-            message = "Images classified successfully"
-            logger.info(message)
+            result = await asyncio.to_thread(
+                get_fuzzy_logic_service().infer_batch, request.featherDensity, request.temperature, humidity
+            )
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    
+    if "tci" not in result:
+        temperature = np.asarray(request.temperature, dtype=np.float64)
+        result["tci"] = thermal_comfort_index(
+            temperature, np.full(count, np.nan) if humidity is None else np.asarray(humidity, dtype=np.float64)
+        )
+    return PredictionResponse(
+        status="success",
+        message=f"Fertility inferred for {count} reading(s)",
+        data={
+            "count": count,
+            "method": "exact" if surface is None else "surface",
+            "fertilityScore": [round(float(score), 2) for score in result["fertility_score"]],
+            "fertilityLevel": result["fertility_level"].tolist(),
+            "tci": [round(float(tci), 4) for tci in result["tci"]]
+        }
+    )
+
+
+@router.get(
+    "/fertility/history",
+    summary="Fertility over the sensor history",
+    description="Score every stored temperature/humidity sample of a time range for one feather density"
+)
+async def get_fertility_history(
+    featherDensity: Literal["LOW", "HIGH"],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(config.SENSOR_HISTORY_POINTS, ge=2, le=config.SENSOR_HISTORY_MAX_POINTS),
+    sensorId: Optional[str] = None
+):
+    """
+    Fertility score min/mean/max per time bucket and the share of samples per level
+    
+    Defaults to the last 24 hours. Every raw sample is scored through the
+    precomputed fertility surface, `points` only limits the buckets returned.
+    """
+    from sensor_controller import check_sensor, sensor_service
+    check_sensor(sensorId)
+    surface = await asyncio.to_thread(load_fertility_surface)
+    if sensor_service.store is None or surface is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sensor history or the fertility surface is disabled"
+        )
+    end_ts = end.timestamp() if end else time.time()
+    start_ts = start.timestamp() if start else end_ts - 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    
+    from fertility_surface import fertility_history
+    history = await asyncio.to_thread(
+        fertility_history, surface, sensor_service.store.query(start_ts, end_ts, sensorId),
+        featherDensity, start_ts, end_ts, points
+    )
+    return {
+        "status": "success",
+        "data": {
+            "sensorId": sensorId,
+            "featherDensity": featherDensity,
+            "start": datetime.fromtimestamp(start_ts).isoformat(),
+            "end": datetime.fromtimestamp(end_ts).isoformat(),
+            "count": history["count"],
+            "bucketSeconds": history["bucket_seconds"],
+            "levels": {level: round(share, 4) for level, share in history["levels"].items()},
+            "points": [
+                {
+                    "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+                    "count": count,
+                    "fertilityScore": {"min": round(low, 2), "mean": round(mean, 2), "max": round(high, 2)}
+                }
+                for timestamp, count, low, mean, high in history["points"]
+            ]
+        }
+    }
+
+
+@router.get(
+    "/fertility/surface",
+    summary="Get fertility surface statistics",
+    description="Get grid size, exact-fallback share and measured interpolation error of the fertility surface"
+)
+async def get_fertility_surface_stats():
+    """Get statistics about the precomputed fertility surface"""
+    surface = await asyncio.to_thread(load_fertility_surface)
+    if surface is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Fertility surface is disabled"
+        )
+    
+    return {
+        "status": "success",
+        "message": "Fertility surface statistics retrieved",
+        "data": surface.stats()
+    }
+
+
+@router.post(
+    "/predict/upload",
+    response_model=PredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Predict uploaded image classification",
+    description="Classify a single image uploaded as multipart/form-data (no base64 needed)"
+)
+async def predict_upload(http_request: Request,
+                         file: UploadFile = File(..., description="Image file (JPG, PNG, ...)")) -> PredictionResponse:
+    """
+    Predict classification for an image uploaded as a multipart file
+    
+    Args:
+        http_request: Incoming request (its profiling header is honoured)
+        file: Uploaded image file
+        
+    Returns:
+        PredictionResponse with classification result
+    """
+    service = await require_prediction_service()
+    
+    try:
+        logger.info(f"Received uploaded image prediction request: {file.filename}")
+        
+        # PIL reads straight from the spooled upload, no intermediate bytes copy
+        result = await inference_pool.run(profiled(http_request, service.predict_image_bytes), file.file)
         
         return PredictionResponse(
             status="success",
-            message=message,
+            message="Image classified successfully",
             data=result
         )
         
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
+    except ValueError as ve:
+        logger.error(f"Validation error: {ve}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+    finally:
+        await file.close()
+
+
+@router.post(
+    "/predict/upload/batch",
+    response_model=PredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Predict uploaded images classification",
+    description="Classify several images uploaded as multipart/form-data files (field \"files\"); "
+                "images are classified while the rest of the upload is still arriving",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {"schema": {
+                    "type": "object",
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                    "required": ["files"]
+                }}
+            }
+        }
+    }
+)
+async def predict_upload_batch(http_request: Request) -> PredictionResponse:
+    """
+    Predict classifications for several uploaded image files
+    
+    The multipart body is parsed while it streams in instead of being
+    spooled completely first: one inference pool job starts with the first
+    complete file and decodes and queues every further file for inference
+    as soon as it arrived, so decoding and inference overlap the upload.
+    
+    Args:
+        http_request: Incoming multipart/form-data request
+        
+    Returns:
+        PredictionResponse with classification results
+    """
+    service = await require_prediction_service()
+    
+    try:
+        reader = UploadPartReader(http_request.headers.get("content-type", ""))
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    
+    job = None
+    try:
+        try:
+            async for chunk in http_request.stream():
+                reader.write(chunk)
+                if job is None and reader.received:
+                    job = asyncio.ensure_future(inference_pool.run(service.predict_batch_bytes, reader))
+                elif job is not None and job.done():
+                    # Rejected (pool full) or failed, no point reading the rest
+                    break
+        finally:
+            reader.close()
+        
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No image files in the \"files\" field"
+            )
+        
+        result = await job
+        logger.info(f"Classified {result['total_images']} streamed upload image(s)")
+        
+        return batch_prediction_response(result)
+        
     except HTTPException:
-        # Re-raise HTTPExceptions (like the 400 above)
         raise
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
     except ValueError as ve:
+        # Malformed multipart body
         logger.error(f"Validation error: {ve}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -164,34 +804,45 @@ async def predict(request: ImageRequest) -> PredictionResponse:
 
 
 @router.post(
-    "/predict/single",
+    "/predict/raw",
     response_model=PredictionResponse,
     status_code=status.HTTP_200_OK,
-    summary="Predict single image classification",
-    description="Classify a single image using YOLOv8 model"
+    summary="Predict raw image classification",
+    description="Classify a single image sent as the raw request body (application/octet-stream or image/*)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                "image/jpeg": {"schema": {"type": "string", "format": "binary"}},
+                "image/png": {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
 )
-async def predict_single(request: SingleImageRequest) -> PredictionResponse:
+async def predict_raw(request: Request) -> PredictionResponse:
     """
-    Predict classification for a single image
+    Predict classification for an image sent as the raw request body
     
     Args:
-        request: SingleImageRequest containing base64 encoded image string
+        request: Incoming request whose body is the encoded image
         
     Returns:
         PredictionResponse with classification result
     """
-    # Check if service is initialized
-    if prediction_service is None:
+    service = await require_prediction_service()
+    
+    image_bytes = await request.body()
+    if not image_bytes:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Prediction service is not available"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body cannot be empty"
         )
     
     try:
-        logger.info("Received single image prediction request")
+        logger.info(f"Received raw image prediction request ({len(image_bytes)} bytes)")
         
-        # Predict single image
-        result = prediction_service.predict_single_image(request.image)
+        result = await inference_pool.run(profiled(request, service.predict_image_bytes), image_bytes)
         
         return PredictionResponse(
             status="success",
@@ -199,6 +850,8 @@ async def predict_single(request: SingleImageRequest) -> PredictionResponse:
             data=result
         )
         
+    except PoolSaturatedError:
+        raise pool_saturated_exception()
     except ValueError as ve:
         logger.error(f"Validation error: {ve}")
         raise HTTPException(
@@ -220,14 +873,10 @@ async def predict_single(request: SingleImageRequest) -> PredictionResponse:
 )
 async def get_model_info():
     """Get information about the loaded model"""
-    if prediction_service is None:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Prediction service is not available"
-        )
+    service = await require_prediction_service()
     
     try:
-        model = prediction_service.model
+        model = service.model
         
         return {
             "status": "success",
@@ -235,8 +884,11 @@ async def get_model_info():
             "data": {
                 "model_type": "YOLOv8 Classification",
                 "task": "classify",
-                "classes_count": len(model.names) if hasattr(model, 'names') else None,
-                "model_name": model.model_name if hasattr(model, 'model_name') else "Unknown"
+                "classes_count": len(service.names),
+                "model_name": model.model_name if hasattr(model, 'model_name') else "Unknown",
+                "inference_mode": config.INFERENCE_MODE,
+                "inference_backend": service.backend_name,
+                "model_precision": service.precision
             }
         }
     except Exception as e:
@@ -244,4 +896,76 @@ async def get_model_info():
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get model information: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/predict/batching",
+    summary="Get inference batching statistics",
+    description="Get batch size and queue wait histograms of the inference batcher"
+)
+async def get_batching_stats():
+    """Get statistics about merged inference batches"""
+    service = await require_prediction_service()
+    
+    return {
+        "status": "success",
+        "message": "Batching statistics retrieved",
+        "data": {
+            **service.batching_stats(),
+            "worker_pool": inference_pool.stats()
+        }
+    }
+
+
+@router.get(
+    "/predict/cache",
+    summary="Get prediction cache statistics",
+    description="Get size and hit/miss/eviction counters of the prediction result cache"
+)
+async def get_cache_stats():
+    """Get statistics about the content-addressed prediction cache"""
+    service = await require_prediction_service()
+    
+    return {
+        "status": "success",
+        "message": "Cache statistics retrieved",
+        "data": service.cache_stats()
+    }
+
+
+@router.get(
+    "/profiles",
+    summary="List request profiles",
+    description="Summaries of the stored prediction traces, newest first (PROFILING_ENABLED)"
+)
+async def list_profiles():
+    """List the traces in the profiling ring"""
+    if not config.PROFILING_ENABLED:
+        return {"status": "success", "message": "Profiling is disabled", "data": {"traces": []}}
+    from request_profiler import get_request_profiler
+    traces = await asyncio.to_thread(get_request_profiler().list)
+    return {
+        "status": "success",
+        "message": f"{len(traces)} profile(s) stored",
+        "data": {"traces": traces}
+    }
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Download a request profile",
+    description="Collapsed stacks of one trace (flamegraph.pl / speedscope input)"
+)
+async def download_profile(profile_id: str):
+    """Download one trace as a collapsed-stack text file"""
+    path = None
+    if config.PROFILING_ENABLED:
+        from request_profiler import get_request_profiler
+        path = get_request_profiler().trace_path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile '{profile_id}' not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
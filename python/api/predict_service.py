@@ -3,14 +3,170 @@ Prediction Service - Business Logic
 Handles YOLOv8 image classification predictions
 """
 import base64
-import io
+import logging
+import queue
+import threading
 import time
+from concurrent.futures import Future
 import numpy as np
-from PIL import Image
-from ultralytics import YOLO
-from typing import List, Dict, Any
-import cv2
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 import config
+from image_decode import decode_image, ImageSource
+from inference_backends import INPUT_CHANNELS, create_backend, quantized_model_path, warmup_backend
+from model_server import ModelWorkerPool
+from prediction_cache import PredictionCache, model_fingerprint
+from telemetry import REGISTRY, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics (/metrics), children looked up once so recording is a plain update
+LATENCY_BUCKETS_S = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+STAGE_SECONDS = REGISTRY.histogram(
+    "autofeather_prediction_stage_seconds", "Per-image time spent in each prediction stage",
+    LATENCY_BUCKETS_S, ["stage"]
+)
+DECODE_SECONDS = STAGE_SECONDS.labels("decode")
+QUEUE_WAIT_SECONDS = STAGE_SECONDS.labels("queue_wait")
+INFERENCE_SECONDS = STAGE_SECONDS.labels("inference")
+POSTPROCESS_SECONDS = STAGE_SECONDS.labels("postprocess")
+TOTAL_SECONDS = STAGE_SECONDS.labels("total")
+PREDICTIONS = REGISTRY.counter("autofeather_predictions_total", "Images classified, by outcome", ["outcome"])
+PREDICTIONS_OK = PREDICTIONS.labels("success")
+PREDICTIONS_CACHED = PREDICTIONS.labels("cached")
+PREDICTIONS_FAILED = PREDICTIONS.labels("failed")
+DECODE_BYTES = REGISTRY.histogram(
+    "autofeather_decode_input_bytes", "Size of the encoded images decoded",
+    [16384, 65536, 262144, 1048576, 4194304, 16777216]
+)
+DECODE_PIXELS = REGISTRY.histogram(
+    "autofeather_decode_source_pixels", "Pixel count of the full-size source images decoded",
+    [100000, 300000, 1000000, 2000000, 5000000, 12000000, 25000000]
+)
+MODEL_LOAD_SECONDS = REGISTRY.gauge("autofeather_model_load_seconds", "Time the served model took to load")
+
+
+def missing_output_error(outputs: int, images: int) -> RuntimeError:
+    """Error for the images of a batch the model returned no output for"""
+    return RuntimeError(f"Model returned {outputs} output(s) for a batch of {images} image(s)")
+
+
+class InferenceBatcher:
+    """
+    Merges images submitted by concurrent requests into a single YOLO batch
+    
+    A background thread takes the first queued image, then keeps collecting
+    images until either max_batch_size is reached or max_wait_ms has passed
+    since that first image, and runs one forward pass for the whole batch.
+    Every caller gets a Future resolved with its own model output.
+    """
+    
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+    QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+    
+    def __init__(self, infer_fn: Callable[[List[np.ndarray]], List[np.ndarray]],
+                 max_batch_size: int = None, max_wait_ms: float = None):
+        """
+        Initialize and start the batching worker thread
+        
+        Args:
+            infer_fn: Callable running one forward pass over a list of images
+            max_batch_size: Largest batch sent to the model (defaults to config.BATCH_MAX_SIZE)
+            max_wait_ms: Longest time the first image waits for others (defaults to config.BATCH_MAX_WAIT_MS)
+        """
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, max_batch_size or config.BATCH_MAX_SIZE)
+        self.max_wait_ms = config.BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        
+        self.batch_size_histogram = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+        
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        Queue an image for the next batch
+        
+        Args:
+            image: Decoded image as numpy array
+        
+        Returns:
+            Future resolved with a dict holding "probs", "inference_ms",
+            "queue_wait_ms" and "batch_size"
+        """
+        future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        return future
+    
+    def close(self) -> None:
+        """Stop the worker thread once the queued images are processed"""
+        self._queue.put(None)
+        self._thread.join()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get batching configuration and histograms"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_histogram.snapshot()
+        }
+    
+    def _run(self) -> None:
+        """Worker loop collecting queued images into batches"""
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            
+            self._process(batch)
+    
+    def _process(self, batch: List[tuple]) -> None:
+        """Run one forward pass and resolve the futures of the batch"""
+        started = time.perf_counter()
+        self.batch_size_histogram.observe(len(batch))
+        
+        try:
+            outputs = self.infer_fn([image for image, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        
+        inference_time = (time.perf_counter() - started) * 1000
+        
+        # A backend returning fewer outputs than images must not leave callers waiting
+        outputs = list(outputs)
+        for _, future, _ in batch[len(outputs):]:
+            future.set_exception(missing_output_error(len(outputs), len(batch)))
+        for (_, future, enqueued), probs in zip(batch, outputs):
+            queue_wait = (started - enqueued) * 1000
+            self.queue_wait_histogram.observe(queue_wait)
+            future.set_result({
+                "probs": probs,
+                "inference_ms": inference_time,
+                "queue_wait_ms": queue_wait,
+                "batch_size": len(batch)
+            })
 
 
 class PredictionService:
@@ -25,14 +181,92 @@ class PredictionService:
         """
         if model_path is None:
             model_path = config.MODEL_PATH
+        
+        self.model_path = model_path
+        self.backend_name = config.INFERENCE_BACKEND
+        self.precision = config.MODEL_PRECISION
+        load_start = time.perf_counter()
+        
+        if config.INFERENCE_MODE == "process":
+            # Models live in the worker processes, this process only decodes
+            self.backend = None
+            self.model = None
+            self.scheduler = ModelWorkerPool(model_path, self.backend_name)
+            self.names = self.scheduler.names
+            self.decode_size = self.resolve_decode_size(self.scheduler.input_size)
+            print(f"✓ Model loaded in {self.scheduler.num_workers} worker process(es): {model_path}")
+        else:
+            try:
+                self.backend = create_backend(model_path, self.backend_name)
+                # The ultralytics model itself, only present on the torch backend
+                self.model = getattr(self.backend, "model", None)
+                self.names = self.backend.names
+                self.decode_size = self.resolve_decode_size(self.backend.input_size)
+                print(f"✓ Model loaded successfully ({self.backend_name} backend, {self.precision}): {model_path}")
+            except Exception as e:
+                print(f"✗ Error loading model: {e}")
+                raise
             
-        try:
-            self.model = YOLO(model_path)
-            self.model_path = model_path
-            print(f"✓ Model loaded successfully: {model_path}")
-        except Exception as e:
-            print(f"✗ Error loading model: {e}")
-            raise
+            self.scheduler = InferenceBatcher(self.infer) if config.BATCH_ENABLED else None
+        
+        self.fingerprint = self.model_identity(model_path, self.backend_name, self.precision, self.decode_size)
+        self.cache = PredictionCache(self.fingerprint) if config.CACHE_ENABLED else None
+        
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - load_start)
+        if self.scheduler is not None:
+            REGISTRY.register("autofeather_batch_size", "Images per forward pass",
+                              self.scheduler.batch_size_histogram)
+            REGISTRY.register("autofeather_batch_queue_wait_ms", "Time images waited for their batch in ms",
+                              self.scheduler.queue_wait_histogram)
+            REGISTRY.collector("inference_queue", lambda: [(
+                "autofeather_inference_queue_depth", "Images waiting for the model", "gauge", {},
+                self.scheduler.stats()["queue_depth"]
+            )])
+        
+        # Set once warm-up finished, /ready reports ready only after that
+        self.ready = threading.Event()
+        self.warmup_report: Optional[Dict[str, Any]] = None
+        self.warmup_error: Optional[str] = None
+    
+    @staticmethod
+    def resolve_decode_size(model_imgsz: Any) -> int:
+        """
+        Get the shorter side images are decoded to
+        
+        Args:
+            model_imgsz: Input size stored in the model (int or [h, w])
+            
+        Returns:
+            Target size in pixels, 0 when images are decoded at full size
+        """
+        if not config.DECODE_DOWNSCALE:
+            return 0
+        if config.MODEL_INPUT_SIZE > 0:
+            return config.MODEL_INPUT_SIZE
+        if isinstance(model_imgsz, (list, tuple)):
+            model_imgsz = max(model_imgsz)
+        return int(model_imgsz) if model_imgsz else 0
+    
+    @staticmethod
+    def model_identity(model_path: str, backend_name: str, precision: str, decode_size: int) -> str:
+        """
+        Get the fingerprint results of a model are cached under
+        
+        Shared by the prediction cache, bulk manifests and the eval cache, so
+        all three agree on which results belong to which model.
+        
+        Args:
+            model_path: Weights the service was started with (the int8 model is hashed for int8)
+            backend_name: Inference backend
+            precision: "fp32" or "int8"
+            decode_size: Resolved decode size (see resolve_decode_size)
+            
+        Returns:
+            Fingerprint of the served weights, backend, precision, decode size and input channel order
+        """
+        # All of them change the probabilities an image gets
+        served_path = quantized_model_path(model_path) if precision == "int8" else model_path
+        return model_fingerprint(served_path, backend_name, precision, decode_size, INPUT_CHANNELS)
     
     def decode_base64_image(self, base64_string: str) -> np.ndarray:
         """
@@ -44,29 +278,91 @@ class PredictionService:
         Returns:
             numpy array of the image
         """
+        return self.open_base64_image(base64_string)[0]
+    
+    def decode_image_bytes(self, image_data: ImageSource) -> np.ndarray:
+        """
+        Decode raw encoded image data (JPEG, PNG, ...) to numpy array
+        
+        Args:
+            image_data: Encoded image bytes, or a binary file object positioned at the image
+        
+        Returns:
+            numpy array of the image
+        """
+        return self.open_image_bytes(image_data)[0]
+    
+    def open_base64_image(self, base64_string: str) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+        """
+        Decode base64 string to numpy array, keeping the source image shape
+        
+        Args:
+            base64_string: Base64 encoded image string
+        
+        Returns:
+            Tuple of the numpy image and the shape of the full-size source image
+        """
+        return self.open_image_bytes(self.base64_to_bytes(base64_string))
+    
+    def base64_to_bytes(self, base64_string: str) -> bytes:
+        """
+        Decode a base64 image string (optionally a data URL) to the encoded image bytes
+        
+        Args:
+            base64_string: Base64 encoded image string
+        
+        Returns:
+            Encoded image bytes
+        """
         try:
             # Remove data URL prefix if present (e.g., "data:image/jpeg;base64,")
             if "," in base64_string:
                 base64_string = base64_string.split(",")[1]
             
             # Decode base64 string - FIXED: use b64decode
-            image_bytes = base64.b64decode(base64_string)
-            
-            # Convert to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert to numpy array
-            image_array = np.array(image)
-            
-            return image_array
-            
+            return base64.b64decode(base64_string)
         except Exception as e:
             raise ValueError(f"Failed to decode base64 image: {str(e)}")
     
+    def read_image_data(self, image_data: ImageSource) -> ImageSource:
+        """
+        Prepare raw image data for decoding
+        
+        File objects are only read into memory when the cache needs their
+        bytes for hashing, otherwise PIL reads them directly.
+        
+        Args:
+            image_data: Encoded image bytes or binary file object
+        
+        Returns:
+            Encoded image bytes or the untouched file object
+        """
+        if self.cache is not None and hasattr(image_data, "read"):
+            return image_data.read()
+        return image_data
+    
+    def open_image_bytes(self, image_data: ImageSource) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+        """
+        Decode raw encoded image data to numpy array, keeping the source image shape
+        
+        Images are decoded straight to the model input size when
+        config.DECODE_DOWNSCALE is enabled (see image_decode.decode_image).
+        
+        Args:
+            image_data: Encoded image bytes, or a binary file object positioned at the image
+        
+        Returns:
+            Tuple of the numpy image and the shape of the full-size source image
+        """
+        try:
+            image, source_shape = decode_image(image_data, self.decode_size)
+        except Exception as e:
+            raise ValueError(f"Failed to decode image: {str(e)}")
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            DECODE_BYTES.observe(len(image_data))
+        DECODE_PIXELS.observe(source_shape[0] * source_shape[1])
+        return image, source_shape
+    
     def preprocess_image(self, image: np.ndarray) -> Dict[str, Any]:
         """
         Preprocess image for YOLOv8 inference
@@ -89,6 +385,167 @@ class PredictionService:
             "preprocess_time_ms": round(preprocess_time, 2)
         }
     
+    def infer(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Run a single forward pass over a batch of images
+        
+        Args:
+            images: List of decoded images as numpy arrays
+        
+        Returns:
+            List of class probability vectors, one per image
+        """
+        if self.backend is None:
+            futures = [self.scheduler.submit(image) for image in images]
+            return [future.result()["probs"] for future in futures]
+        
+        return self.backend.infer(images)
+    
+    def submit_images(self, images: List[np.ndarray]) -> List[Future]:
+        """
+        Schedule decoded images for inference
+        
+        Images go through the shared batcher (or the model worker processes)
+        when enabled, otherwise they are classified right away as one batch.
+        
+        Args:
+            images: List of decoded images as numpy arrays
+        
+        Returns:
+            List of futures resolved with the model output of each image
+        """
+        if self.scheduler is not None:
+            return [self.scheduler.submit(image) for image in images]
+        
+        futures = [Future() for _ in images]
+        if not images:
+            return futures
+        
+        started = time.perf_counter()
+        try:
+            outputs = self.infer(images)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return futures
+        inference_time = (time.perf_counter() - started) * 1000
+        
+        outputs = list(outputs)
+        for future in futures[len(outputs):]:
+            future.set_exception(missing_output_error(len(outputs), len(images)))
+        for future, probs in zip(futures, outputs):
+            future.set_result({
+                "probs": probs,
+                "inference_ms": inference_time,
+                "queue_wait_ms": 0.0,
+                "batch_size": len(images)
+            })
+        return futures
+    
+    def build_prediction(self, image: np.ndarray, output: Dict[str, Any],
+                         preprocess_time: float, source_shape: Tuple[int, ...] = None) -> Dict[str, Any]:
+        """
+        Convert a model output into the prediction response format
+        
+        Args:
+            image: Decoded image the output belongs to
+            output: Model output as resolved by submit_images
+            preprocess_time: Time spent preprocessing the image in ms
+            source_shape: Shape of the full-size source image (defaults to image.shape)
+        
+        Returns:
+            Dictionary containing prediction results
+        """
+        postprocess_start = time.time()
+        probs = output["probs"]
+        
+        # Get top 5 predictions (highest confidence first)
+        top5_indices = np.argsort(probs)[::-1][:5]
+        top_class_idx = int(top5_indices[0])
+        top_confidence = float(probs[top_class_idx])
+        class_name = self.names[top_class_idx]
+        
+        top5_predictions = [
+            {
+                "class": self.names[int(idx)],
+                "confidence": float(probs[idx])
+            }
+            for idx in top5_indices
+        ]
+        
+        postprocess_time = (time.time() - postprocess_start) * 1000
+        
+        inference_time = output["inference_ms"]
+        queue_wait_time = output["queue_wait_ms"]
+        
+        # Total speed
+        total_time = preprocess_time + queue_wait_time + inference_time + postprocess_time
+        
+        DECODE_SECONDS.observe(preprocess_time / 1000)
+        QUEUE_WAIT_SECONDS.observe(queue_wait_time / 1000)
+        INFERENCE_SECONDS.observe(inference_time / 1000)
+        POSTPROCESS_SECONDS.observe(postprocess_time / 1000)
+        TOTAL_SECONDS.observe(total_time / 1000)
+        PREDICTIONS_OK.inc()
+        
+        return {
+            "class": class_name,
+            "confidence": round(top_confidence, 4),
+            "speed": {
+                "preprocess_ms": round(preprocess_time, 2),
+                "queue_wait_ms": round(queue_wait_time, 2),
+                "inference_ms": round(inference_time, 2),
+                "postprocess_ms": round(postprocess_time, 2),
+                "total_ms": round(total_time, 2),
+                "batch_size": output["batch_size"],
+                "cache_hit": False
+            },
+            "image_info": {
+                "original_shape": list(source_shape or image.shape),
+                "model_input_shape": list(image.shape[:2])
+            },
+            "top5_predictions": top5_predictions,
+            "all_classes_count": len(self.names)
+        }
+    
+    def lookup_cache(self, image_data: ImageSource) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a cached prediction for encoded image data
+        
+        Args:
+            image_data: Encoded image bytes (file objects are never cached)
+        
+        Returns:
+            Tuple of the cache key (None when caching does not apply) and the
+            cached prediction marked as a cache hit (None on a miss)
+        """
+        if self.cache is None or not isinstance(image_data, (bytes, bytearray, memoryview)):
+            return None, None
+        
+        lookup_start = time.time()
+        key = self.cache.key(image_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached["speed"] = {
+                "preprocess_ms": 0.0,
+                "queue_wait_ms": 0.0,
+                "inference_ms": 0.0,
+                "postprocess_ms": 0.0,
+                "total_ms": round((time.time() - lookup_start) * 1000, 2),
+                "batch_size": 0,
+                "cache_hit": True
+            }
+            PREDICTIONS_CACHED.inc()
+        return key, cached
+    
+    def store_cache(self, key: Optional[str], prediction: Dict[str, Any]) -> None:
+        """Cache a prediction without its per-request fields"""
+        if key is not None:
+            self.cache.put(key, {
+                field: value for field, value in prediction.items()
+                if field not in ("speed", "image_index")
+            })
+    
     def predict_single_image(self, base64_image: str) -> Dict[str, Any]:
         """
         Predict classification for a single image
@@ -96,78 +553,102 @@ class PredictionService:
         Args:
             base64_image: Base64 encoded image string
             
+        Returns:
+            Dictionary containing prediction results
+        """
+        return self.predict_source(self.base64_to_bytes, base64_image)
+    
+    def predict_image_bytes(self, image_data: ImageSource) -> Dict[str, Any]:
+        """
+        Predict classification for a single raw encoded image
+        
+        Args:
+            image_data: Encoded image bytes or binary file object
+            
+        Returns:
+            Dictionary containing prediction results
+        """
+        return self.predict_source(self.read_image_data, image_data)
+    
+    def predict_source(self, load: Callable[[Any], ImageSource], source: Any) -> Dict[str, Any]:
+        """
+        Classify a single encoded image, answering from the cache when possible
+        
+        Args:
+            load: Function turning source into encoded image data
+            source: Encoded image as accepted by load
+            
         Returns:
             Dictionary containing prediction results
         """
         try:
-            # Decode image
-            image = self.decode_base64_image(base64_image)
+            image_data = load(source)
+            cache_key, cached = self.lookup_cache(image_data)
+            if cached is not None:
+                return cached
             
-            # Preprocess
+            # Decode and preprocess (timed together, as in predict_many)
             preprocess_start = time.time()
-            preprocess_info = self.preprocess_image(image)
+            image, source_shape = self.open_image_bytes(image_data)
+            self.preprocess_image(image)
             preprocess_time = (time.time() - preprocess_start) * 1000
             
-            # Inference
-            inference_start = time.time()
-            results = self.model(image, verbose=False)
-            inference_time = (time.time() - inference_start) * 1000
-            
-            # Postprocess
-            postprocess_start = time.time()
-            result = results[0]
-            
-            # Get top prediction
-            probs = result.probs
-            top_class_idx = probs.top1
-            top_confidence = float(probs.top1conf)
-            class_name = result.names[top_class_idx]
-            
-            # Get top 5 predictions
-            top5_indices = probs.top5
-            top5_conf = probs.top5conf
-            top5_predictions = [
-                {
-                    "class": result.names[idx],
-                    "confidence": float(conf)
-                }
-                for idx, conf in zip(top5_indices, top5_conf)
-            ]
-            
-            postprocess_time = (time.time() - postprocess_start) * 1000
-            
-            # Total speed
-            total_time = preprocess_time + inference_time + postprocess_time
-            
-            return {
-                "class": class_name,
-                "confidence": round(top_confidence, 4),
-                "speed": {
-                    "preprocess_ms": round(preprocess_time, 2),
-                    "inference_ms": round(inference_time, 2),
-                    "postprocess_ms": round(postprocess_time, 2),
-                    "total_ms": round(total_time, 2)
-                },
-                "image_info": {
-                    "original_shape": preprocess_info["original_shape"],
-                    "model_input_shape": list(result.orig_shape) if hasattr(result, 'orig_shape') else None
-                },
-                "top5_predictions": top5_predictions,
-                "all_classes_count": len(result.names)
-            }
+            # Inference (possibly batched with other requests)
+            output = self.submit_images([image])[0].result()
+            
+            prediction = self.build_prediction(image, output, preprocess_time, source_shape)
+            self.store_cache(cache_key, prediction)
+            return prediction
             
         except ValueError as ve:
+            PREDICTIONS_FAILED.inc()
             raise ve
         except Exception as e:
+            PREDICTIONS_FAILED.inc()
             raise Exception(f"Prediction failed: {str(e)}")
     
     def predict_batch(self, base64_images: List[str]) -> Dict[str, Any]:
         """
         Predict classifications for multiple images
         
+        All images of the request are decoded first and then submitted
+        together, so they share forward passes instead of running one by one.
+        
         Args:
             base64_images: List of base64 encoded image strings
             
+        Returns:
+            Dictionary containing batch prediction results
+        """
+        return self.predict_many(self.base64_to_bytes, base64_images)
+    
+    def predict_batch_bytes(self, images: Iterable[ImageSource]) -> Dict[str, Any]:
+        """
+        Predict classifications for multiple raw encoded images
+        
+        Each image is submitted for inference as soon as it is decoded, so
+        inference of earlier images overlaps decoding of later ones.
+        
+        Args:
+            images: Encoded image bytes or binary file objects; any iterable,
+                e.g. one yielding multipart parts while they are received
+            
+        Returns:
+            Dictionary containing batch prediction results
+        """
+        return self.predict_many(self.read_image_data, images, stream=True)
+    
+    def predict_many(self, load: Callable[[Any], ImageSource], sources: Iterable[Any],
+                     stream: bool = False) -> Dict[str, Any]:
+        """
+        Classify several encoded images, answering from the cache when possible
+        
+        Args:
+            load: Function turning a source into encoded image data
+            sources: Encoded images as accepted by load
+            stream: Submit every image right after decoding instead of after
+                the whole list is decoded
+            
         Returns:
             Dictionary containing batch prediction results
         """
@@ -175,28 +656,134 @@ class PredictionService:
         predictions = []
         failed_images = []
         
-        for idx, base64_image in enumerate(base64_images):
+        decoded = []
+        futures = []
+        total_images = 0
+        for idx, source in enumerate(sources):
+            total_images += 1
+            try:
+                image_data = load(source)
+                cache_key, cached = self.lookup_cache(image_data)
+                if cached is not None:
+                    cached["image_index"] = idx
+                    predictions.append(cached)
+                    continue
+                
+                preprocess_start = time.time()
+                image, source_shape = self.open_image_bytes(image_data)
+                self.preprocess_image(image)
+                preprocess_time = (time.time() - preprocess_start) * 1000
+                decoded.append((idx, image, source_shape, preprocess_time, cache_key))
+                if stream:
+                    futures.extend(self.submit_images([image]))
+            except Exception as e:
+                failed_images.append({
+                    "image_index": idx,
+                    "error": str(e)
+                })
+        
+        if not stream:
+            futures = self.submit_images([image for _, image, _, _, _ in decoded])
+        
+        for (idx, image, source_shape, preprocess_time, cache_key), future in zip(decoded, futures):
             try:
-                prediction = self.predict_single_image(base64_image)
+                prediction = self.build_prediction(image, future.result(), preprocess_time, source_shape)
+                self.store_cache(cache_key, prediction)
                 prediction["image_index"] = idx
                 predictions.append(prediction)
             except Exception as e:
                 failed_images.append({
                     "image_index": idx,
-                    "error": str(e)
+                    "error": f"Prediction failed: {str(e)}"
                 })
         
+        PREDICTIONS_FAILED.inc(len(failed_images))
+        predictions.sort(key=lambda prediction: prediction["image_index"])
+        failed_images.sort(key=lambda failure: failure["image_index"])
         total_time = (time.time() - total_start) * 1000
         
         return {
-            "total_images": len(base64_images),
+            "total_images": total_images,
             "successful_predictions": len(predictions),
             "failed_predictions": len(failed_images),
             "total_processing_time_ms": round(total_time, 2),
-            "average_time_per_image_ms": round(total_time / len(base64_images), 2) if base64_images else 0,
+            "average_time_per_image_ms": round(total_time / total_images, 2) if total_images else 0,
             "predictions": predictions,
             "errors": failed_images if failed_images else None
         }
+    
+    def warmup(self) -> Optional[Dict[str, Any]]:
+        """
+        Run synthetic inferences at every served batch size, then mark the service ready
+        
+        Runs straight on the backend, before readiness lets traffic in. In
+        process mode the workers already warmed up before reporting ready,
+        so their timings are collected instead.
+        
+        Returns:
+            Warm-up timings, None when warm-up is disabled or failed
+        """
+        try:
+            if self.backend is None:
+                self.warmup_report = {
+                    "workers": {str(worker_id): report for worker_id, report in self.scheduler.warmup.items()}
+                } if config.WARMUP_ENABLED else None
+            elif config.WARMUP_ENABLED:
+                self.warmup_report = warmup_backend(
+                    self.backend, config.WARMUP_BATCH_SIZES, config.WARMUP_ITERATIONS, self.decode_size
+                )
+                for batch_size, timing in self.warmup_report["batch_sizes"].items():
+                    logger.info(f"Warm-up batch size {batch_size}: first {timing['first_ms']} ms, "
+                                f"mean {timing['mean_ms']} ms")
+                logger.info(f"Warm-up finished in {self.warmup_report['total_ms']} ms")
+        except Exception as e:
+            # The model cannot serve requests, so the service never becomes ready
+            self.warmup_error = str(e)
+            logger.error(f"Warm-up failed: {e}")
+            return None
+        
+        self.ready.set()
+        return self.warmup_report
+    
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Get readiness state
+        
+        Returns:
+            Dictionary with the ready flag, warm-up timings and warm-up error
+        """
+        return {
+            "ready": self.ready.is_set(),
+            "warmup": self.warmup_report,
+            "error": self.warmup_error
+        }
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get prediction cache statistics
+        
+        Returns:
+            Dictionary with cache size and hit/miss/eviction counters
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def batching_stats(self) -> Dict[str, Any]:
+        """
+        Get inference batching statistics
+        
+        Returns:
+            Dictionary with batching configuration and histograms
+        """
+        if self.scheduler is None:
+            return {"enabled": False, "mode": config.INFERENCE_MODE}
+        return {"enabled": True, "mode": config.INFERENCE_MODE, **self.scheduler.stats()}
+    
+    def close(self) -> None:
+        """Stop the batcher thread or the model worker processes"""
+        if self.scheduler is not None:
+            self.scheduler.close()
 
 
 # Global instance (singleton pattern)
@@ -216,4 +803,4 @@ def get_prediction_service(model_path: str = None) -> PredictionService:
     global _prediction_service
     if _prediction_service is None:
         _prediction_service = PredictionService(model_path)
-    return _prediction_service
\ No newline at end of file
+    return _prediction_service
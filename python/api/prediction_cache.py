@@ -0,0 +1,259 @@
+"""
+Prediction Cache - Content-Addressed Results
+Caches predictions by image content hash and model identity
+"""
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import config
+
+
+# Content digests of model files by (path, mtime, size), each version is read once
+_file_digests: Dict[tuple, str] = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    Content hash of a (model) file, read once per file version
+    
+    Args:
+        path: File to hash
+    
+    Returns:
+        Hex blake2b digest of the contents, the resolved path when the file is missing
+    """
+    path = Path(path).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        return str(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _file_digests_lock:
+        digest = _file_digests.get(key)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as model_file:
+            for chunk in iter(lambda: model_file.read(1 << 20), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with _file_digests_lock:
+            _file_digests[key] = digest
+    return digest
+
+
+def model_fingerprint(model_path: str, *extra: Any) -> str:
+    """
+    Identify a model by its weights, wherever they are stored
+    
+    Moving, copying or touching the weights keeps the fingerprint, new
+    weights change it.
+    
+    Args:
+        model_path: Path to the model weights
+        *extra: Further settings that change predictions (e.g. decode size)
+    
+    Returns:
+        Short hex fingerprint of the weights content and extras
+    """
+    identity = file_digest(model_path) + "".join(f":{value}" for value in extra)
+    return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of prediction results keyed by image content
+    
+    Entries live in memory up to max_entries / max_bytes (least recently
+    used evicted first) and expire ttl_seconds after being stored. With a
+    disk_path the cache is written through to SQLite, so results survive
+    restarts; memory misses fall back to the disk store.
+    """
+    
+    # Purge expired rows from the disk store every this many writes
+    DISK_PURGE_INTERVAL = 256
+    
+    def __init__(self, fingerprint: str, max_entries: int = None, max_bytes: int = None,
+                 ttl_seconds: float = None, disk_path: str = None, disk_max_entries: int = None):
+        """
+        Initialize the cache
+        
+        Args:
+            fingerprint: Model fingerprint mixed into every key
+            max_entries: Most entries kept in memory (defaults to config.CACHE_MAX_ENTRIES)
+            max_bytes: Approximate memory budget (defaults to config.CACHE_MAX_MB)
+            ttl_seconds: Entry lifetime (defaults to config.CACHE_TTL_SECONDS)
+            disk_path: SQLite file for the persistent store (defaults to config.CACHE_DISK_PATH,
+                empty disables it)
+            disk_max_entries: Most rows kept in the disk store (defaults to config.CACHE_DISK_MAX_ENTRIES)
+        """
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries or config.CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or int(config.CACHE_MAX_MB * 1024 * 1024)
+        self.ttl_seconds = config.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.disk_path = config.CACHE_DISK_PATH if disk_path is None else disk_path
+        self.disk_max_entries = disk_max_entries or config.CACHE_DISK_MAX_ENTRIES
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+        
+        self._disk = None
+        self._disk_writes = 0
+        if self.disk_path:
+            self._open_disk()
+    
+    def key(self, image_bytes: bytes) -> str:
+        """
+        Compute the cache key of an encoded image
+        
+        Args:
+            image_bytes: Raw encoded image bytes
+        
+        Returns:
+            Hex key combining the model fingerprint and the image content
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(self.fingerprint.encode())
+        hasher.update(image_bytes)
+        return hasher.hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached prediction
+        
+        Args:
+            key: Key from key()
+        
+        Returns:
+            Copy of the cached prediction, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return copy.deepcopy(value)
+                self._remove(key)
+                self._counters["expirations"] += 1
+        
+        row = self._disk_get(key, now)
+        with self._lock:
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            value, expires_at = row
+            self._counters["disk_hits"] += 1
+            # Keep the expiry of the original put, a disk hit does not extend the lifetime
+            self._store(key, value, expires_at)
+        return copy.deepcopy(value)
+    
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store a prediction
+        
+        Args:
+            key: Key from key()
+            value: JSON serializable prediction
+        """
+        now = time.time()
+        with self._lock:
+            self._store(key, copy.deepcopy(value), now + self.ttl_seconds)
+        self._disk_put(key, value, now)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache configuration, size and counters"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self.disk_path or None,
+                **self._counters,
+                "hit_rate": round((self._counters["hits"] + self._counters["disk_hits"]) / lookups, 4)
+                if lookups else 0
+            }
+    
+    def _store(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        """Insert into the memory LRU and evict down to the budgets (lock held)"""
+        if key in self._entries:
+            self._remove(key)
+        size = len(json.dumps(value, default=str))
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+    
+    def _remove(self, key: str) -> None:
+        """Drop an entry from the memory LRU (lock held)"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def _open_disk(self) -> None:
+        """Open (or create) the SQLite store and drop expired rows"""
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(self.disk_path, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute("PRAGMA synchronous=NORMAL")
+        self._disk.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._disk_lock = threading.Lock()
+        self._disk_purge(time.time())
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Read a non-expired entry and its expiry time from the disk store"""
+        if self._disk is None:
+            return None
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT value, expires_at FROM predictions WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+    
+    def _disk_put(self, key: str, value: Dict[str, Any], now: float) -> None:
+        """Write an entry through to the disk store"""
+        if self._disk is None:
+            return
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), now + self.ttl_seconds)
+            )
+            self._disk_writes += 1
+            if self._disk_writes % self.DISK_PURGE_INTERVAL == 0:
+                self._disk_purge(now)
+    
+    def _disk_purge(self, now: float) -> None:
+        """Delete expired rows and cap the store at disk_max_entries rows"""
+        self._disk.execute("DELETE FROM predictions WHERE expires_at <= ?", (now,))
+        self._disk.execute(
+            "DELETE FROM predictions WHERE key IN ("
+            "SELECT key FROM predictions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
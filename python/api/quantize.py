@@ -0,0 +1,227 @@
+"""
+INT8 Quantization - Post-Training Static Quantization
+Calibrates the ONNX export of the classifier on sample images, writes an
+INT8 model next to the weights and compares it against fp32
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import config
+from image_decode import decode_image
+from inference_backends import OnnxBackend, classify_preprocess, export_model, quantized_model_path
+
+SUPPORTED_EXTS = (".jpg", ".jpeg", ".png")
+MAX_CALIBRATION_IMAGES = 300
+
+
+def list_images(folder_path):
+    """All supported images below folder_path, sorted for reproducible runs"""
+    return sorted(
+        str(path) for path in Path(folder_path).rglob("*")
+        if path.suffix.lower() in SUPPORTED_EXTS
+    )
+
+
+def load_image(image_path, size):
+    """Decode an image exactly like the API does before inference"""
+    with open(image_path, "rb") as image_file:
+        image, _ = decode_image(image_file.read(), size)
+    return image
+
+
+def percentile_summary(timings):
+    """Mean / p50 / p95 of a list of latencies in ms"""
+    return {
+        "mean": round(float(np.mean(timings)), 2),
+        "p50": round(float(np.percentile(timings, 50)), 2),
+        "p95": round(float(np.percentile(timings, 95)), 2)
+    }
+
+
+def quantize(calibration_folder, max_images=MAX_CALIBRATION_IMAGES):
+    """
+    Produce the INT8 model from a folder of representative images
+    
+    Args:
+        calibration_folder: Folder with sample images (searched recursively)
+        max_images: Most images used for calibration
+    
+    Returns:
+        Path to the INT8 model
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    fp32_path = export_model(config.MODEL_PATH, "onnx")
+    int8_path = quantized_model_path(config.MODEL_PATH)
+    fp32_model = onnx.load(str(fp32_path))
+    input_name = fp32_model.graph.input[0].name
+    metadata = {prop.key: prop.value for prop in fp32_model.metadata_props}
+    size = int(OnnxBackend(config.MODEL_PATH, onnx_path=str(fp32_path)).input_size)
+    
+    images = list_images(calibration_folder)[:max_images]
+    if not images:
+        raise FileNotFoundError(f"No images found in '{calibration_folder}'")
+    
+    class FolderReader(CalibrationDataReader):
+        """Feeds calibration images one at a time, preprocessed like the API"""
+        
+        def __init__(self):
+            self.paths = iter(images)
+        
+        def get_next(self):
+            image_path = next(self.paths, None)
+            if image_path is None:
+                return None
+            return {input_name: classify_preprocess([load_image(image_path, size)], size)}
+    
+    # Shape inference + graph optimization first, as onnxruntime recommends for static quantization
+    prepared_path = fp32_path.with_suffix(".prep.onnx")
+    quant_pre_process(str(fp32_path), str(prepared_path))
+    
+    print(f"Calibrating on {len(images)} image(s) from '{calibration_folder}'")
+    start = time.perf_counter()
+    quantize_static(
+        str(prepared_path),
+        str(int8_path),
+        FolderReader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    prepared_path.unlink()
+    
+    # Keep the ultralytics metadata (class names, imgsz) the backend reads
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    for key, value in metadata.items():
+        prop = int8_model.metadata_props.add()
+        prop.key, prop.value = key, value
+    onnx.save(int8_model, str(int8_path))
+    
+    print(f"INT8 model written to {int8_path} in {time.perf_counter() - start:.1f} s")
+    return int8_path
+
+
+def compare(val_folder):
+    """
+    Compare fp32 and INT8 accuracy and latency on a labelled folder
+    
+    val_folder holds one sub folder per class (the dataset-split/val layout
+    used for training). Both models see the same decoded images, one image
+    per forward pass, which is how the Pi serves single requests.
+    
+    Args:
+        val_folder: Folder with <class name>/<image> files
+    
+    Returns:
+        The report dict, also written as quantization_report.json next to the weights
+    """
+    fp32 = OnnxBackend(config.MODEL_PATH, config.BACKEND_THREADS)
+    int8_path = quantized_model_path(config.MODEL_PATH)
+    if not int8_path.exists():
+        raise FileNotFoundError(f"{int8_path} not found, run 'python quantize.py quantize <calibration_folder>' first")
+    int8 = OnnxBackend(config.MODEL_PATH, config.BACKEND_THREADS, onnx_path=str(int8_path))
+    
+    class_ids = {name.lower(): idx for idx, name in fp32.names.items()}
+    samples = []
+    for class_dir in sorted(Path(val_folder).iterdir()):
+        if class_dir.is_dir() and class_dir.name.lower() in class_ids:
+            samples += [(path, class_ids[class_dir.name.lower()]) for path in list_images(class_dir)]
+    if not samples:
+        raise FileNotFoundError(f"No labelled images found in '{val_folder}' (expected one folder per class)")
+    
+    correct = {"fp32": 0, "int8": 0}
+    per_class = {name: {"images": 0, "fp32_correct": 0, "int8_correct": 0} for name in fp32.names.values()}
+    timings = {"fp32": [], "int8": []}
+    agreement = 0
+    prob_diffs = []
+    
+    for image_path, label in samples:
+        image = load_image(image_path, fp32.input_size)
+        outputs = {}
+        for name, backend in (("fp32", fp32), ("int8", int8)):
+            start = time.perf_counter()
+            outputs[name] = backend.infer([image])[0]
+            timings[name].append((time.perf_counter() - start) * 1000)
+        
+        class_stats = per_class[fp32.names[label]]
+        class_stats["images"] += 1
+        for name, probs in outputs.items():
+            if int(np.argmax(probs)) == label:
+                correct[name] += 1
+                class_stats[f"{name}_correct"] += 1
+        agreement += int(np.argmax(outputs["fp32"])) == int(np.argmax(outputs["int8"]))
+        prob_diffs.append(float(np.max(np.abs(outputs["fp32"] - outputs["int8"]))))
+    
+    total = len(samples)
+    latency = {name: percentile_summary(values) for name, values in timings.items()}
+    report = {
+        "images": total,
+        "threads": config.BACKEND_THREADS,
+        "models": {
+            "fp32": {"path": str(fp32.model_file), "size_mb": round(os.path.getsize(fp32.model_file) / 2**20, 2)},
+            "int8": {"path": str(int8.model_file), "size_mb": round(os.path.getsize(int8.model_file) / 2**20, 2)}
+        },
+        "accuracy": {
+            "fp32": round(correct["fp32"] / total, 4),
+            "int8": round(correct["int8"] / total, 4),
+            "delta": round((correct["int8"] - correct["fp32"]) / total, 4)
+        },
+        "per_class_accuracy": {
+            name: {
+                "images": stats["images"],
+                "fp32": round(stats["fp32_correct"] / stats["images"], 4) if stats["images"] else None,
+                "int8": round(stats["int8_correct"] / stats["images"], 4) if stats["images"] else None
+            }
+            for name, stats in per_class.items()
+        },
+        "top1_agreement": round(agreement / total, 4),
+        "max_prob_diff": {"mean": round(float(np.mean(prob_diffs)), 4), "max": round(float(np.max(prob_diffs)), 4)},
+        "latency_ms": latency,
+        "speedup_p50": round(latency["fp32"]["p50"] / latency["int8"]["p50"], 2) if latency["int8"]["p50"] else None
+    }
+    
+    report_path = int8_path.parent / "quantization_report.json"
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    
+    print(f"{'':>8} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} {'size MB':>8}")
+    for name in ("fp32", "int8"):
+        print(f"{name:>8} {report['accuracy'][name]:>9.4f} {latency[name]['p50']:>8.2f} "
+              f"{latency[name]['p95']:>8.2f} {report['models'][name]['size_mb']:>8.2f}")
+    print(f"accuracy delta {report['accuracy']['delta']:+.4f}, top-1 agreement {report['top1_agreement']:.4f}, "
+          f"p50 speedup {report['speedup_p50']}x on {total} image(s)")
+    print(f"Report written to {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python quantize.py quantize <calibration_folder> [max_images]")
+        print("       python quantize.py compare <val_folder>")
+        sys.exit(1)
+    
+    command = sys.argv[1]
+    folder_path = sys.argv[2]
+    
+    if command.lower() == "quantize":
+        quantize(folder_path, int(sys.argv[3]) if len(sys.argv) > 3 else MAX_CALIBRATION_IMAGES)
+    elif command.lower() == "compare":
+        compare(folder_path)
+    else:
+        print(f"Unknown command: {command}")
+
+
+# how to run
+# python quantize.py quantize "C:/Users/Admin/Downloads/dataset-split/train/"
+# python quantize.py compare "C:/Users/Admin/Downloads/dataset-split/val/"
+# then serve it with INFERENCE_BACKEND=onnx MODEL_PRECISION=int8
@@ -0,0 +1,219 @@
+"""
+Request Profiler - Sampled Prediction Traces
+Captures stack samples of individual prediction requests (decode, the
+waiting request thread and the batcher's forward pass) into a bounded
+on-disk ring of flame graph traces
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import config
+
+# Threads sampled next to the request thread: the batcher runs the forward pass
+WATCHED_THREAD_NAMES = ("inference-batcher",)
+TRACE_ID = re.compile(r"[0-9a-f]{20}")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({'/'.join(Path(code.co_filename).parts[-2:])}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of a few threads at a fixed interval
+    
+    Stacks are counted in collapsed form ("thread;outer;...;inner"), the
+    input format of flamegraph.pl and speedscope. The sampler needs the GIL
+    to take a sample, so while a thread holds it in pure Python code the
+    effective interval can stretch to the interpreter's switch interval;
+    time in C code that releases the GIL (JPEG decode, torch kernels) is
+    sampled at the configured rate.
+    """
+    
+    def __init__(self, threads: Dict[int, str], interval: float):
+        """
+        Args:
+            threads: Thread ident -> name used as the root frame
+            interval: Seconds between samples
+        """
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop sampling; one final sample covers requests shorter than the interval"""
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        for ident, name in self.threads.items():
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[name + ";" + ";".join(reversed(stack))] += 1
+        self.samples += 1
+
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled and keeps their traces
+    
+    A request is profiled when it carries the profiling header or is picked
+    by the sample rate. Each trace is a collapsed-stack file plus a small
+    JSON summary; only the newest max_traces are kept.
+    """
+    
+    def __init__(self, directory: str = None, max_traces: int = None, sample_rate: float = None,
+                 interval_ms: float = None):
+        """
+        Args:
+            directory: Where traces are stored (default config.PROFILING_DIR)
+            max_traces: Traces kept, oldest removed first (default config.PROFILING_MAX_TRACES)
+            sample_rate: Fraction of requests profiled without the header (default config.PROFILING_SAMPLE_RATE)
+            interval_ms: Stack sampling interval (default config.PROFILING_INTERVAL_MS)
+        """
+        self.directory = Path(directory or config.PROFILING_DIR)
+        self.max_traces = max_traces or config.PROFILING_MAX_TRACES
+        self.sample_rate = config.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.interval = (interval_ms or config.PROFILING_INTERVAL_MS) / 1000
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        """Profile when the header is set to a true value, or by sample rate"""
+        if header_value is not None:
+            return header_value.strip().lower() in ("1", "true", "yes", "on")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def wrap(self, fn: Callable[..., Dict[str, Any]], route: str) -> Callable[..., Dict[str, Any]]:
+        """
+        fn wrapped to run under the stack sampler
+        
+        The trace id is added to the result dict as "profile_id" (also when
+        fn fails, the trace is kept and the error re-raised).
+        """
+        def profiled(*args: Any) -> Dict[str, Any]:
+            threads = {threading.get_ident(): "request"}
+            threads.update({
+                thread.ident: thread.name for thread in threading.enumerate()
+                if thread.name in WATCHED_THREAD_NAMES and thread.ident is not None
+            })
+            sampler = StackSampler(threads, self.interval)
+            error = None
+            started = time.time()
+            start = time.perf_counter()
+            sampler.start()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                sampler.stop()
+                trace_id = self.save(sampler, route, started, (time.perf_counter() - start) * 1000,
+                                     str(error) if error else None)
+            result["profile_id"] = trace_id
+            return result
+        return profiled
+    
+    def save(self, sampler: StackSampler, route: str, started: float, duration_ms: float,
+             error: Optional[str] = None) -> str:
+        """Write one trace and drop the oldest ones beyond max_traces"""
+        # Start time in ns first, so ids sort by age
+        trace_id = f"{int(started * 1e9):016x}{uuid.uuid4().hex[:4]}"
+        # Innermost frames (where the samples were taken) per thread
+        leaves = Counter()
+        for stack, count in sampler.stacks.items():
+            frames = stack.split(";")
+            leaves[f"{frames[0]}: {frames[-1]}"] += count
+        summary = {
+            "id": trace_id,
+            "route": route,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "duration_ms": round(duration_ms, 2),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": sampler.samples,
+            "threads": sorted(set(sampler.threads.values())),
+            "error": error,
+            "top_frames": [
+                {"frame": frame, "samples": count} for frame, count in leaves.most_common(10)
+            ]
+        }
+        with self._lock:
+            with open(self.directory / f"{trace_id}.folded", "w", encoding="utf-8") as trace_file:
+                trace_file.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+            with open(self.directory / f"{trace_id}.json", "w", encoding="utf-8") as summary_file:
+                json.dump(summary, summary_file)
+            for old in self._summaries()[self.max_traces:]:
+                for suffix in (".json", ".folded"):
+                    try:
+                        os.remove(old.with_suffix(suffix))
+                    except FileNotFoundError:
+                        pass
+        return trace_id
+    
+    def _summaries(self) -> List[Path]:
+        """Summary files, newest first"""
+        return sorted(self.directory.glob("*.json"), reverse=True)
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored traces, newest first"""
+        traces = []
+        for path in self._summaries():
+            try:
+                with open(path, encoding="utf-8") as summary_file:
+                    traces.append(json.load(summary_file))
+            except (OSError, ValueError):
+                continue
+        return traces
+    
+    def trace_path(self, trace_id: str) -> Optional[Path]:
+        """Collapsed-stack file of a trace, None for unknown (or malformed) ids"""
+        # The whole id must match, "^...$" would let a trailing newline through
+        if not TRACE_ID.fullmatch(trace_id):
+            return None
+        path = self.directory / f"{trace_id}.folded"
+        return path if path.exists() else None
+
+
+# Global instance (singleton pattern)
+_request_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_request_profiler() -> RequestProfiler:
+    """
+    Get or create request profiler instance (Singleton)
+    
+    Returns:
+        RequestProfiler instance
+    """
+    global _request_profiler
+    with _profiler_lock:
+        if _request_profiler is None:
+            _request_profiler = RequestProfiler()
+    return _request_profiler
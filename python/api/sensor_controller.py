@@ -1,13 +1,159 @@
-from fastapi import APIRouter
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sensor_service import SensorService
+from sensor_stream import SubscriberLimitError, sse_event
+import config
 
 router = APIRouter()
 sensor_service = SensorService()
 
+def check_sensor(sensor_id: Optional[str]) -> None:
+    """Raise 404 for a sensorId that is not configured"""
+    if sensor_id is not None and sensor_id not in sensor_service.sensors:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown sensor '{sensor_id}'")
+
 @router.get("/sensor/temp")
-async def get_temperature():
-    return sensor_service.get_temperature()
+async def get_temperature(sensorId: Optional[str] = None):
+    check_sensor(sensorId)
+    return sensor_service.get_temperature(sensorId)
 
 @router.get("/sensor/hum")
-async def get_humidity():
-    return sensor_service.get_humidity()
\ No newline at end of file
+async def get_humidity(sensorId: Optional[str] = None):
+    check_sensor(sensorId)
+    return sensor_service.get_humidity(sensorId)
+
+@router.get("/sensor/readings")
+async def get_readings(sensorId: Optional[str] = None):
+    """Latest temperature and humidity of every configured sensor (or only sensorId)"""
+    check_sensor(sensorId)
+    return sensor_service.get_readings(sensorId)
+
+@router.get("/sensor/history")
+async def get_history(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(config.SENSOR_HISTORY_POINTS, ge=2, le=config.SENSOR_HISTORY_MAX_POINTS),
+    sensorId: Optional[str] = None
+):
+    """
+    Temperature/humidity history with min/mean/max per point
+    
+    Defaults to the last 24 hours. The resolution (raw, 1m, 15m or 1h
+    rollups) is the finest one that fits the range into `points`, so the
+    cost of a query does not grow with the number of stored samples.
+    Times without a UTC offset are local time, like sample timestamps.
+    """
+    check_sensor(sensorId)
+    if sensor_service.rollups is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Sensor history is disabled")
+    end_ts = end.timestamp() if end else time.time()
+    start_ts = start.timestamp() if start else end_ts - 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    return await asyncio.to_thread(sensor_service.get_history, start_ts, end_ts, points, sensorId)
+
+def latest_frames(sensor_id: Optional[str]) -> list:
+    """Latest frame of every sensor (or only sensor_id) sent when a stream opens"""
+    frames = []
+    for current_id in ([sensor_id] if sensor_id else sensor_service.sensors):
+        latest = sensor_service.get_latest(current_id)
+        if latest is not None:
+            frames.append({**sensor_service.stream_frame(latest), "dropped": 0})
+    return frames
+
+@router.get("/sensor/stream")
+async def stream_sensor(request: Request, sensorId: Optional[str] = None):
+    """
+    Server-Sent Events stream of combined temperature/humidity samples
+    
+    Sends the latest sample of each sensor right away, then every new
+    sample as the samplers produce them (only sensorId's when given), and
+    a keep-alive comment when nothing happened for SENSOR_STREAM_KEEPALIVE
+    seconds. Clients that fall behind skip frames ("dropped" counts them)
+    instead of buffering.
+    """
+    check_sensor(sensorId)
+    if sensor_service.broadcaster.full():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"Sensor stream is limited to {sensor_service.broadcaster.max_subscribers} subscribers")
+    
+    async def events():
+        # Subscribed only once the body is streamed: a client gone before that never
+        # starts the generator, so its finally would not give the slot back
+        try:
+            subscription = sensor_service.broadcaster.subscribe()
+        except SubscriberLimitError as e:
+            # Lost the last slot to a concurrent stream after the check above
+            yield sse_event({"error": str(e)}, "error")
+            return
+        try:
+            yield "retry: 3000\n\n"
+            for frame in latest_frames(sensorId):
+                yield sse_event(frame)
+            while not await request.is_disconnected():
+                frame = await subscription.get(config.SENSOR_STREAM_KEEPALIVE)
+                if frame is None:
+                    yield ": keep-alive\n\n"
+                elif sensorId is None or frame["sensorId"] == sensorId:
+                    yield sse_event(frame)
+        finally:
+            sensor_service.broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/sensor/ws")
+async def sensor_websocket(websocket: WebSocket, sensorId: Optional[str] = None):
+    """WebSocket stream of the same frames as /sensor/stream"""
+    await websocket.accept()
+    if sensorId is not None and sensorId not in sensor_service.sensors:
+        await websocket.close(code=1008, reason=f"Unknown sensor '{sensorId}'")
+        return
+    try:
+        subscription = sensor_service.broadcaster.subscribe()
+    except SubscriberLimitError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    
+    # Notice disconnects even while no sample arrives (the client never sends anything)
+    receiver = asyncio.ensure_future(websocket.receive())
+    try:
+        for frame in latest_frames(sensorId):
+            await websocket.send_json(frame)
+        while True:
+            getter = asyncio.ensure_future(subscription.get(config.SENSOR_STREAM_KEEPALIVE))
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                message = receiver.result()
+                if message["type"] == "websocket.disconnect":
+                    break
+                receiver = asyncio.ensure_future(websocket.receive())
+                continue
+            frame = getter.result()
+            if frame is not None and (sensorId is None or frame["sensorId"] == sensorId):
+                await websocket.send_json(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        sensor_service.broadcaster.unsubscribe(subscription)
+
+@router.get("/sensor/stats")
+async def get_sensor_stats():
+    """Read counts, failures and error rate per sensor"""
+    return sensor_service.get_stats()
+
+@router.get("/sensor/stream/stats")
+async def get_stream_stats():
+    return {
+        "status": "success",
+        "data": sensor_service.broadcaster.stats()
+    }
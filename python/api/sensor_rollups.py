@@ -0,0 +1,319 @@
+"""
+Sensor Rollups - Downsampled Sensor History
+Keeps 1 minute, 15 minute and hourly min/mean/max of temperature and humidity
+next to the raw samples, so range queries read a bounded number of records
+"""
+import math
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import config
+from sensor_store import SegmentLog, SensorStore
+
+# Tier name -> bucket length in seconds, finest first
+TIERS = {"1m": 60, "15m": 900, "1h": 3600}
+# bucket start (epoch s), sensor index, sample count, temperature min/mean/max, humidity min/mean/max
+ROLLUP_FORMAT = "<dHHffffff"
+# Most raw history replayed on start to rebuild the buckets that were open at shutdown
+RESTORE_WINDOW = 86400
+
+# (timestamp, sample count, temperature min, mean, max, humidity min, mean, max)
+Point = Tuple[float, int, float, float, float, float, float, float]
+
+
+class Bucket:
+    """Running min / sum / max of the samples in one time bucket"""
+    __slots__ = ("start", "count", "tmin", "tsum", "tmax", "hmin", "hsum", "hmax")
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.tmin = self.hmin = math.inf
+        self.tmax = self.hmax = -math.inf
+        self.tsum = self.hsum = 0.0
+    
+    def add(self, temperature: float, humidity: float) -> None:
+        """Fold one sample into the bucket"""
+        self.count += 1
+        self.tmin, self.tmax = min(self.tmin, temperature), max(self.tmax, temperature)
+        self.hmin, self.hmax = min(self.hmin, humidity), max(self.hmax, humidity)
+        self.tsum += temperature
+        self.hsum += humidity
+    
+    def merge(self, point: Point) -> None:
+        """Fold an already aggregated point into the bucket"""
+        _, count, tmin, tmean, tmax, hmin, hmean, hmax = point
+        self.count += count
+        self.tmin, self.tmax = min(self.tmin, tmin), max(self.tmax, tmax)
+        self.hmin, self.hmax = min(self.hmin, hmin), max(self.hmax, hmax)
+        self.tsum += tmean * count
+        self.hsum += hmean * count
+    
+    def point(self) -> Point:
+        """The bucket as (start, count, min/mean/max temperature, min/mean/max humidity)"""
+        return (self.start, self.count, self.tmin, self.tsum / self.count, self.tmax,
+                self.hmin, self.hsum / self.count, self.hmax)
+
+
+def combine(points: Iterable[Point], bucket_seconds: float) -> List[Point]:
+    """
+    Merge time-ordered points into buckets of bucket_seconds
+    
+    Used to fold several sensors into one series and to coarsen the
+    hourly tier when a range holds more hours than the point budget.
+    """
+    combined: List[Point] = []
+    bucket: Optional[Bucket] = None
+    for point in points:
+        start = point[0] - point[0] % bucket_seconds
+        if bucket is None or start != bucket.start:
+            if bucket is not None:
+                combined.append(bucket.point())
+            bucket = Bucket(start)
+        bucket.merge(point)
+    if bucket is not None:
+        combined.append(bucket.point())
+    return combined
+
+
+def sample_interval(sensor_id: str) -> float:
+    """Configured seconds between samples of a sensor (the default for sensors no longer configured)"""
+    for sensor in config.SENSORS:
+        if sensor["id"] == sensor_id:
+            return sensor["interval"]
+    return config.SENSOR_SAMPLE_INTERVAL
+
+
+class SensorRollups:
+    """
+    Incrementally maintained min/mean/max tiers over the raw sensor history
+    
+    Every sample is folded into the open bucket of each tier; when a
+    sensor's sample falls into a new bucket, the finished buckets of that
+    tier are appended to the tier's SegmentLog (one segment per UTC month,
+    40 bytes per bucket and sensor). Open buckets live in memory, are
+    included in queries, and are rebuilt from the raw store on start.
+    
+    history() answers from the finest tier whose bucket count for the range
+    fits the point budget (raw samples for short ranges), so query cost
+    depends on the budget, not on how many raw samples the range holds.
+    """
+    
+    def __init__(self, store: SensorStore, path: str = None, retention_days: Dict[str, float] = None):
+        """
+        Open (or create) the rollup tiers
+        
+        Args:
+            store: Raw sample store the rollups summarize (also maps sensor ids)
+            path: Directory of the tier logs (defaults to <store path>/rollups)
+            retention_days: Days kept per tier (defaults to config.SENSOR_ROLLUP_RETENTION_DAYS)
+        """
+        self.store = store
+        self.path = store.path / "rollups" if path is None else path
+        retention_days = retention_days or config.SENSOR_ROLLUP_RETENTION_DAYS
+        self.logs = {
+            tier: SegmentLog(
+                self.path / tier, ROLLUP_FORMAT, "%Y%m",
+                retention_days=retention_days.get(tier, config.SENSOR_STORE_RETENTION_DAYS),
+                flush_interval=store.log.flush_interval, flush_records=store.log.flush_records
+            )
+            for tier in TIERS
+        }
+        self._lock = threading.Lock()
+        # tier -> sensor index -> open bucket
+        self._open: Dict[str, Dict[int, Bucket]] = {tier: {} for tier in TIERS}
+        # Newest bucket already on disk per tier, never emitted twice
+        self._persisted = {
+            tier: log.last_record[0] if log.last_record else -math.inf for tier, log in self.logs.items()
+        }
+    
+    def add(self, sensor_id: str, temperature: float, humidity: float, timestamp: float) -> None:
+        """
+        Fold one sample into every tier
+        
+        Args:
+            sensor_id: Sensor identifier
+            temperature: Temperature in °C
+            humidity: Relative humidity in %
+            timestamp: Epoch seconds of the sample (as stored in the raw store)
+        """
+        if temperature is None or humidity is None:
+            return
+        sensor_index = self.store.sensor_index(sensor_id)
+        with self._lock:
+            for tier, seconds in TIERS.items():
+                start = timestamp - timestamp % seconds
+                if start <= self._persisted[tier]:
+                    continue
+                buckets = self._open[tier]
+                bucket = buckets.get(sensor_index)
+                if bucket is None or start > bucket.start:
+                    # Close every older bucket of the tier, keeping the log in time order
+                    self._emit(tier, [index for index, open_bucket in buckets.items() if open_bucket.start < start])
+                    bucket = buckets[sensor_index] = Bucket(start)
+                bucket.add(temperature, humidity)
+    
+    def restore(self, now: float = None) -> int:
+        """
+        Rebuild the open buckets from raw samples newer than the persisted rollups
+        
+        Call before new samples arrive. Replays at most RESTORE_WINDOW seconds;
+        run 'python sensor_rollups.py rebuild' to backfill older history.
+        
+        Returns:
+            Number of raw samples replayed
+        """
+        now = time.time() if now is None else now
+        since = min(self._persisted[tier] + seconds for tier, seconds in TIERS.items())
+        replayed = 0
+        for timestamp, sensor_id, temperature, humidity in self.store.query(max(since, now - RESTORE_WINDOW), now):
+            self.add(sensor_id, temperature, humidity, timestamp)
+            replayed += 1
+        return replayed
+    
+    def choose_tier(self, start: float, end: float, max_points: int,
+                    intervals: List[float] = None) -> Tuple[str, float]:
+        """
+        Pick the finest resolution whose point count for [start, end] fits max_points
+        
+        Args:
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+            max_points: Point budget (at least 2)
+            intervals: Sampling interval of each sensor whose raw samples would be
+                returned side by side (default: one sensor at SENSOR_SAMPLE_INTERVAL)
+        
+        Returns:
+            Tuple of tier name ("raw", "1m", "15m" or "1h") and bucket length in
+            seconds (0 for raw, a multiple of 3600 when hours must be merged)
+        """
+        span = max(0.0, end - start)
+        intervals = intervals or [config.SENSOR_SAMPLE_INTERVAL]
+        # Each sensor at its own rate: a fast sensor fills the budget on its own
+        if sum(span / max(interval, 1e-3) + 1 for interval in intervals) <= max_points:
+            return "raw", 0
+        for tier, seconds in TIERS.items():
+            # Worst case: partial buckets at both ends of the range
+            if math.ceil(span / seconds) + 1 <= max_points:
+                return tier, seconds
+        return "1h", TIERS["1h"] * math.ceil(span / (TIERS["1h"] * (max_points - 1)))
+    
+    def history(self, start: float, end: float, max_points: int, sensor_id: str = None) -> Dict[str, object]:
+        """
+        Downsampled history of [start, end]
+        
+        Args:
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+            max_points: Most points returned (at least 2)
+            sensor_id: Only this sensor (default: all sensors merged per bucket)
+        
+        Returns:
+            Dict with the tier used, its bucket length in seconds and the points,
+            plus the sensor of each point ("sensor_ids") for the raw tier
+        """
+        sensor_ids = self.store.sensor_ids()
+        if sensor_id is not None and sensor_id not in sensor_ids:
+            return {"tier": "raw", "bucket_seconds": 0, "points": [], "sensor_ids": []}
+        wanted = None if sensor_id is None else sensor_ids.index(sensor_id)
+        queried = sensor_ids if sensor_id is None else [sensor_id]
+        tier, bucket_seconds = self.choose_tier(start, end, max_points, [sample_interval(queried_id) for queried_id in queried])
+        
+        if tier == "raw":
+            samples = list(self.store.query(start, end, sensor_id))
+            points = [
+                (timestamp, 1, temperature, temperature, temperature, humidity, humidity, humidity)
+                for timestamp, _, temperature, humidity in samples
+            ]
+            # Raw samples of different sensors are interleaved, not merged, so each keeps its sensor
+            return {"tier": tier, "bucket_seconds": 0, "points": points,
+                    "sensor_ids": [sample_sensor for _, sample_sensor, _, _ in samples]}
+        
+        seconds = TIERS[tier]
+        first = start - start % seconds
+        # Held while reading so no bucket moves from memory to the log halfway through
+        with self._lock:
+            points = [
+                (record[0], *record[2:]) for record in self.logs[tier].scan(first, end)
+                if wanted is None or record[1] == wanted
+            ]
+            points += [
+                bucket.point() for index, bucket in sorted(self._open[tier].items())
+                if (wanted is None or index == wanted) and first <= bucket.start <= end
+            ]
+        return {"tier": tier, "bucket_seconds": bucket_seconds, "points": combine(points, bucket_seconds)}
+    
+    def stats(self) -> Dict[str, object]:
+        """Per tier disk usage and open bucket count"""
+        with self._lock:
+            open_buckets = {tier: len(buckets) for tier, buckets in self._open.items()}
+        return {
+            tier: {"bucket_seconds": TIERS[tier], "open_buckets": open_buckets[tier], **log.stats()}
+            for tier, log in self.logs.items()
+        }
+    
+    def close(self) -> None:
+        """Flush the finished buckets (open ones are rebuilt by restore())"""
+        for log in self.logs.values():
+            log.close()
+    
+    def _emit(self, tier: str, sensor_indexes: List[int]) -> None:
+        """Append finished buckets of a tier to its log (lock held)"""
+        buckets = self._open[tier]
+        for index in sorted(sensor_indexes, key=lambda index: buckets[index].start):
+            bucket = buckets.pop(index)
+            start, count, *values = bucket.point()
+            self.logs[tier].append(start, index, min(count, 0xFFFF), *values)
+            self._persisted[tier] = max(self._persisted[tier], start)
+
+
+def rebuild(store: SensorStore) -> SensorRollups:
+    """Drop the rollups and recompute them from the whole raw history"""
+    shutil.rmtree(store.path / "rollups", ignore_errors=True)
+    rollups = SensorRollups(store)
+    for timestamp, sensor_id, temperature, humidity in store.query(0, time.time()):
+        rollups.add(sensor_id, temperature, humidity, timestamp)
+    return rollups
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    from datetime import datetime, timezone
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        store = SensorStore(sys.argv[2] if len(sys.argv) > 2 else None)
+        start = time.perf_counter()
+        rollups = rebuild(store)
+        rollups.close()
+        print(f"rebuilt rollups in {time.perf_counter() - start:.1f} s: {rollups.stats()}")
+        sys.exit(0)
+    
+    # Ingest and query timings for 3 days of 2 s samples (tier accuracy, restore and
+    # retention are checked in tests/test_sensor_rollups.py)
+    directory = tempfile.mkdtemp(prefix="sensor-rollups-")
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    store = SensorStore(directory, retention_days=3650, flush_interval=3600, flush_records=1024)
+    rollups = SensorRollups(store, retention_days={tier: 3650 for tier in TIERS})
+    started = time.perf_counter()
+    for step in range(3 * 43200):
+        timestamp = store.append("DHT22_SENSOR_01", 20 + step % 10, 50 + step % 7, base + step * 2)
+        rollups.add("DHT22_SENSOR_01", 20 + step % 10, 50 + step % 7, timestamp)
+    print(f"ingested {3 * 43200} samples in {time.perf_counter() - started:.1f} s")
+    end = base + (3 * 43200 - 1) * 2
+    
+    for span, budget in ((600, 500), (3 * 3600, 500), (86400, 500), (3 * 86400, 200), (3 * 86400, 24)):
+        started = time.perf_counter()
+        result = rollups.history(end - span, end, budget)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"{span / 3600:>5.1f} h / {budget:>3} points -> {result['tier']:>3} x {result['bucket_seconds']:>5} s: "
+              f"{len(result['points'])} points in {elapsed_ms:.1f} ms")
+    print(rollups.stats()["1m"])
+    rollups.close()
+    store.close()
+
+
+# how to run
+# python sensor_rollups.py                      (timings in a temporary directory)
+# python sensor_rollups.py rebuild [store_path] (recompute rollups from the raw history)
@@ -1,12 +1,22 @@
 import random
+import threading
+import time
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import config
+from telemetry import REGISTRY
+from sensor_rollups import SensorRollups
+from sensor_store import SensorStore
+from sensor_stream import SensorBroadcaster
 
 # Mock Adafruit_DHT for development on unsupported platforms
 class MockDHT:
     DHT22 = "DHT22"
+    DHT11 = "DHT11"
+    AM2302 = "AM2302"
 
     @staticmethod
-    def read_retry(sensor, pin):
+    def read_retry(sensor, pin, **retry_policy):
         """
         Returns random values for temperature and humidity within optimal ranges:
         Temperature: 18°C - 24°C
@@ -15,34 +25,309 @@ class MockDHT:
         temperature = random.uniform(18, 24)
         humidity = random.uniform(45, 65)
         return humidity, temperature
+    
+    @staticmethod
+    def get_stats(sensor=None, pin=None):
+        """The mock never fails, so it keeps no read statistics"""
+        return {}
 
 # Use the mock instead of the real library
 Adafruit_DHT = MockDHT()
-DHT_SENSOR = Adafruit_DHT.DHT22
-DHT_PIN = 4
+# The DHT22 returns stale or failed reads when polled faster than every 2 seconds
+MIN_SAMPLE_INTERVAL = 2.0
+# Prometheus metrics (/metrics)
+SENSOR_READ_SECONDS = REGISTRY.histogram(
+    "autofeather_sensor_read_seconds", "Duration of one sensor read including its retries",
+    [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20], ["sensor"]
+)
+SENSOR_READ_FAILURES = REGISTRY.counter(
+    "autofeather_sensor_read_failures_total", "Sensor reads that gave no value after retrying", ["sensor"]
+)
+# Driver constant and shortest safe polling interval per configured sensor type
+SENSOR_TYPES = {
+    "DHT22": (Adafruit_DHT.DHT22, MIN_SAMPLE_INTERVAL),
+    "AM2302": (Adafruit_DHT.AM2302, MIN_SAMPLE_INTERVAL),
+    "DHT11": (Adafruit_DHT.DHT11, 1.0)
+}
+
+class SensorSampler:
+    """
+    Reads the sensor in a background thread and caches the latest sample
+    
+    One read returns both temperature and humidity. Requests only ever see
+    the cached sample, so their latency never depends on the sensor (a
+    read_retry with the real driver retries until SENSOR_READ_DEADLINE).
+    """
+    
+    def __init__(self, read_fn: Callable[[], Dict[str, Any]], interval: float = None,
+                 stale_after: float = None, sensor_id: str = "sensor",
+                 min_interval: float = MIN_SAMPLE_INTERVAL, start_delay: float = 0.0):
+        """
+        Initialize the sampler (call start() to begin sampling)
+        
+        Args:
+            read_fn: Blocking read returning {"temperature": ..., "humidity": ...}
+            interval: Seconds between reads, at least min_interval (defaults to config.SENSOR_SAMPLE_INTERVAL)
+            stale_after: Age in seconds after which a sample counts as stale
+                (defaults to config.SENSOR_STALE_AFTER)
+            sensor_id: Sensor identifier added to every sample
+            min_interval: Shortest interval the sensor type supports
+            start_delay: Seconds to wait before the first read
+        """
+        self.read_fn = read_fn
+        self.sensor_id = sensor_id
+        self.interval = max(min_interval, interval or config.SENSOR_SAMPLE_INTERVAL)
+        self.stale_after = stale_after or config.SENSOR_STALE_AFTER
+        self.start_delay = start_delay
+        
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        # Called from the sampler thread with every successful sample
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+    
+    def start(self) -> None:
+        """Start the sampling thread (no-op when it is already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"sensor-sampler-{self.sensor_id}", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5) -> None:
+        """Stop the sampling thread after its current read"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the latest successful sample
+        
+        Returns:
+            Dict with temperature, humidity, timestamp (time of the read),
+            ageSeconds and stale, or None before the first successful read
+        """
+        with self._lock:
+            if self._latest is None:
+                return None
+            sample = dict(self._latest)
+        age = time.monotonic() - sample.pop("monotonic")
+        sample["ageSeconds"] = round(age, 1)
+        sample["stale"] = age > self.stale_after
+        return sample
+    
+    def sample(self) -> bool:
+        """
+        Read the sensor once and cache the result
+        
+        Returns:
+            True if the read succeeded
+        """
+        try:
+            reading = self.read_fn()
+        except Exception as e:
+            reading = {"temperature": None, "humidity": None}
+            self.last_error = str(e)
+        
+        self.reads += 1
+        if reading["temperature"] is None or reading["humidity"] is None:
+            self.failures += 1
+            return False
+        
+        sample = {
+            "sensorId": self.sensor_id,
+            "temperature": reading["temperature"],
+            "humidity": reading["humidity"],
+            "timestamp": datetime.now().isoformat()
+        }
+        with self._lock:
+            self._latest = {**sample, "monotonic": time.monotonic()}
+        for listener in self.listeners:
+            try:
+                listener(sample)
+            except Exception as e:
+                # A broken listener must not stop the sampler
+                self.last_error = str(e)
+        return True
+    
+    def _run(self) -> None:
+        """Sampling loop, one read per interval"""
+        self._stop.wait(self.start_delay)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
 
 class SensorService:
-    def __init__(self):
-        pass
+    def __init__(self, sensors=None):
+        # sensor id -> {"id", "type", "pin", "zone", "interval"} (defaults to config.SENSORS)
+        self.sensors = {sensor['id']: sensor for sensor in (sensors or config.SENSORS)}
+        # /sensor/temp and /sensor/hum answer for this sensor when no sensorId is given
+        self.default_sensor_id = next(iter(self.sensors))
+        # Pushes every new sample to the /sensor/stream and /sensor/ws subscribers
+        self.broadcaster = SensorBroadcaster(max_queued=config.SENSOR_STREAM_QUEUE * len(self.sensors))
+        # On-device history, opened by start() (SENSOR_STORE_PATH empty disables it)
+        self.store = None
+        # 1 min / 15 min / hourly min-mean-max over the history, serves /sensor/history
+        self.rollups = None
+        
+        # One sampler thread per sensor, so one sensor's read retries never delay another
+        self.samplers = {}
+        spread = min(sensor['interval'] for sensor in self.sensors.values())
+        for position, sensor in enumerate(self.sensors.values()):
+            if sensor['type'] not in SENSOR_TYPES:
+                raise ValueError(f"Unsupported sensor type '{sensor['type']}' for {sensor['id']}, "
+                                 f"use one of {', '.join(SENSOR_TYPES)}")
+            sampler = SensorSampler(
+                lambda sensor=sensor: self.read_dht(sensor),
+                sensor['interval'],
+                sensor_id=sensor['id'],
+                min_interval=SENSOR_TYPES[sensor['type']][1],
+                # Spread the first reads over one interval instead of reading every sensor at once
+                start_delay=spread * position / len(self.sensors)
+            )
+            sampler.listeners.append(lambda sample: self.broadcaster.publish(self.stream_frame(sample)))
+            sampler.listeners.append(self.record_sample)
+            self.samplers[sensor['id']] = sampler
+        REGISTRY.collector("sensor_driver", self.driver_metrics)
+    
+    def start(self):
+        if self.store is None and config.SENSOR_STORE_PATH:
+            self.store = SensorStore()
+            self.rollups = SensorRollups(self.store)
+            self.rollups.restore()
+        for sampler in self.samplers.values():
+            sampler.start()
+    
+    def stop(self):
+        for sampler in self.samplers.values():
+            sampler.stop()
+        if self.store is not None:
+            self.rollups.close()
+            self.store.close()
+    
+    def record_sample(self, sample):
+        """Append a sample to the on-device history and its rollups"""
+        if self.store is not None:
+            timestamp = datetime.fromisoformat(sample['timestamp']).timestamp()
+            timestamp = self.store.append(sample['sensorId'], sample['temperature'], sample['humidity'], timestamp)
+            self.rollups.add(sample['sensorId'], sample['temperature'], sample['humidity'], timestamp)
+    
+    def get_history(self, start, end, max_points, sensor_id=None):
+        """
+        Downsampled temperature/humidity history between two epoch timestamps
+        
+        Args:
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+            max_points: Most points returned
+            sensor_id: Only this sensor (default: all sensors merged)
+        
+        Returns:
+            Response dict with the tier used and min/mean/max per point (raw points
+            also carry their sensorId)
+        """
+        history = self.rollups.history(start, end, max_points, sensor_id)
+        points = [
+            {
+                "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+                "count": count,
+                "temperature": {"min": round(tmin, 2), "mean": round(tmean, 2), "max": round(tmax, 2)},
+                "humidity": {"min": round(hmin, 2), "mean": round(hmean, 2), "max": round(hmax, 2)}
+            }
+            for timestamp, count, tmin, tmean, tmax, hmin, hmean, hmax in history['points']
+        ]
+        # Raw points are single samples, tell the sensors apart instead of merging them
+        for point, point_sensor in zip(points, history.get('sensor_ids', ())):
+            point["sensorId"] = point_sensor
+        return {
+            "status": "success",
+            "data": {
+                "sensorId": sensor_id,
+                "start": datetime.fromtimestamp(start).isoformat(),
+                "end": datetime.fromtimestamp(end).isoformat(),
+                "tier": history['tier'],
+                "bucketSeconds": history['bucket_seconds'],
+                "units": {"temperature": "°C", "humidity": "%"},
+                "points": points
+            }
+        }
     
-    def read_dht22(self):
-        humidity, temperature = Adafruit_DHT.read_retry(DHT_SENSOR, DHT_PIN)
+    def get_latest(self, sensor_id=None):
+        # Started by the app startup hook, this only covers callers that skip it
+        self.start()
+        return self.samplers[sensor_id or self.default_sensor_id].latest()
+    
+    def stream_frame(self, sample):
+        """Combined temperature/humidity frame pushed to stream subscribers"""
+        return {
+            "sensorId": sample['sensorId'],
+            "zone": self.sensors[sample['sensorId']]['zone'],
+            "temperature": sample['temperature'],
+            "humidity": sample['humidity'],
+            "timestamp": sample['timestamp'],
+            "units": {"temperature": "°C", "humidity": "%"}
+        }
+    
+    def read_dht(self, sensor):
+        # Bounded by a deadline with backoff + jitter instead of the driver's 15 x 2 s retries
+        read_start = time.perf_counter()
+        humidity = temperature = None
+        try:
+            humidity, temperature = Adafruit_DHT.read_retry(
+                SENSOR_TYPES[sensor['type']][0], sensor['pin'],
+                retries=None,
+                delay_seconds=SENSOR_TYPES[sensor['type']][1],
+                deadline_seconds=config.SENSOR_READ_DEADLINE,
+                backoff=1.5,
+                max_delay_seconds=8,
+                jitter=0.25
+            )
+        finally:
+            SENSOR_READ_SECONDS.labels(sensor['id']).observe(time.perf_counter() - read_start)
+            if humidity is None or temperature is None:
+                SENSOR_READ_FAILURES.labels(sensor['id']).inc()
         if humidity is not None and temperature is not None:
             return {"temperature": round(temperature, 1), "humidity": round(humidity, 1)}
         else:
             return {"temperature": None, "humidity": None}
     
-    def get_temperature(self):
-        sensor_data = self.read_dht22()
+    def driver_metrics(self):
+        """Attempt and error counters the DHT driver keeps per sensor (none with the mock)"""
+        samples = []
+        for sensor in self.sensors.values():
+            stats = Adafruit_DHT.get_stats(SENSOR_TYPES[sensor['type']][0], sensor['pin'])
+            labels = {"sensor": sensor['id']}
+            for key, name, help_text in (
+                ("attempts", "autofeather_sensor_read_attempts_total", "Single sensor read attempts, retries included"),
+                ("failed_attempts", "autofeather_sensor_read_failed_attempts_total", "Sensor read attempts that failed and were retried"),
+                ("errors", "autofeather_sensor_driver_errors_total", "Errors raised by the sensor driver")
+            ):
+                if key in stats:
+                    samples.append((name, help_text, "counter", labels, stats[key]))
+        return samples
+    
+    def get_temperature(self, sensor_id=None):
+        sensor_id = sensor_id or self.default_sensor_id
+        sensor_data = self.get_latest(sensor_id)
         
-        if sensor_data['temperature'] is not None:
+        if sensor_data is not None:
             return {
                 "status": "success",
                 "data": {
                     "temperature": sensor_data['temperature'],
-                    "timestamp": datetime.now().isoformat(),
-                    "sensorId": "DHT22_SENSOR_01",
-                    "unit": "°C"
+                    "timestamp": sensor_data['timestamp'],
+                    "sensorId": sensor_id,
+                    "zone": self.sensors[sensor_id]['zone'],
+                    "unit": "°C",
+                    "ageSeconds": sensor_data['ageSeconds'],
+                    "stale": sensor_data['stale']
                 }
             }
         else:
@@ -52,17 +337,21 @@ class SensorService:
                 "data": None
             }
     
-    def get_humidity(self):
-        sensor_data = self.read_dht22()
+    def get_humidity(self, sensor_id=None):
+        sensor_id = sensor_id or self.default_sensor_id
+        sensor_data = self.get_latest(sensor_id)
         
-        if sensor_data['humidity'] is not None:
+        if sensor_data is not None:
             return {
                 "status": "success",
                 "data": {
                     "humidity": sensor_data['humidity'],
-                    "timestamp": datetime.now().isoformat(),
-                    "sensorId": "DHT22_SENSOR_01",
-                    "unit": "%"
+                    "timestamp": sensor_data['timestamp'],
+                    "sensorId": sensor_id,
+                    "zone": self.sensors[sensor_id]['zone'],
+                    "unit": "%",
+                    "ageSeconds": sensor_data['ageSeconds'],
+                    "stale": sensor_data['stale']
                 }
             }
         else:
@@ -72,8 +361,68 @@ class SensorService:
                 "data": None
             }
 
+    def get_readings(self, sensor_id=None):
+        """
+        Latest combined sample of one sensor or of every configured sensor
+        
+        Only cached samples are read, so the response time does not grow
+        with the number of sensors or depend on any of them.
+        
+        Args:
+            sensor_id: Only this sensor (default: all sensors)
+        
+        Returns:
+            Response dict with one reading per sensor; temperature and
+            humidity are None until a sensor's first successful read
+        """
+        self.start()
+        readings = []
+        for current_id in ([sensor_id] if sensor_id else self.sensors):
+            sensor = self.sensors[current_id]
+            sensor_data = self.samplers[current_id].latest() or {}
+            readings.append({
+                "sensorId": current_id,
+                "zone": sensor['zone'],
+                "type": sensor['type'],
+                "temperature": sensor_data.get('temperature'),
+                "humidity": sensor_data.get('humidity'),
+                "timestamp": sensor_data.get('timestamp'),
+                "ageSeconds": sensor_data.get('ageSeconds'),
+                "stale": sensor_data.get('stale', True),
+                "units": {"temperature": "°C", "humidity": "%"}
+            })
+        return {
+            "status": "success",
+            "data": readings
+        }
+
+    def get_stats(self):
+        """Per sensor read counters and error rate of the samplers and the driver"""
+        data = []
+        for sensor_id, sampler in self.samplers.items():
+            sensor = self.sensors[sensor_id]
+            data.append({
+                "sensorId": sensor_id,
+                "zone": sensor['zone'],
+                "type": sensor['type'],
+                "pin": sensor['pin'],
+                "intervalSeconds": sampler.interval,
+                "reads": sampler.reads,
+                "failures": sampler.failures,
+                "errorRate": round(sampler.failures / sampler.reads, 4) if sampler.reads else None,
+                "lastError": sampler.last_error,
+                "driver": Adafruit_DHT.get_stats(SENSOR_TYPES[sensor['type']][0], sensor['pin'])
+            })
+        return {
+            "status": "success",
+            "data": data
+        }
+
 # Example usage:
 if __name__ == "__main__":
     service = SensorService()
+    for sampler in service.samplers.values():
+        sampler.sample()
     print(service.get_temperature())
-    print(service.get_humidity())
\ No newline at end of file
+    print(service.get_humidity())
+    print(service.get_readings())
\ No newline at end of file
@@ -0,0 +1,418 @@
+"""
+Sensor Store - Append-Only Time-Series Segments
+Keeps sensor samples on disk as fixed-width records in one segment file per day
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import config
+
+SEGMENT_SUFFIX = ".seg"
+# Records read per chunk while scanning, keeps query memory bounded
+SCAN_CHUNK_RECORDS = 4096
+
+Sample = Tuple[float, str, float, float]
+
+
+class SegmentLog:
+    """
+    Append-only log of fixed-width, checksummed records split into time segments
+    
+    Every record starts with its timestamp (float64 epoch seconds) and ends
+    with a CRC32 of the fields before it. Records go to the segment file
+    named after their UTC time (segment_format, e.g. one file per day) and
+    must be appended in time order, so range scans binary-search each
+    segment and then read it in bounded chunks.
+    
+    Appends are buffered and written + fsynced in batches (every
+    flush_interval seconds or flush_records records), which keeps SD card
+    writes few and sequential; at most one batch is lost on power failure.
+    On open, a torn tail left by a crash is cut back to the last record
+    with a valid checksum. Whole segments older than retention_days are
+    deleted.
+    """
+    
+    def __init__(self, path: Path, payload_format: str, segment_format: str = "%Y%m%d",
+                 retention_days: float = None, flush_interval: float = None, flush_records: int = None):
+        """
+        Open (or create) the log
+        
+        Args:
+            path: Directory of the segment files
+            payload_format: struct format of a record without its checksum, starting with "<d"
+            segment_format: strftime format naming the segment of a timestamp (UTC)
+            retention_days: Days of segments kept (defaults to config.SENSOR_STORE_RETENTION_DAYS)
+            flush_interval: Longest time a record stays buffered in seconds
+                (defaults to config.SENSOR_STORE_FLUSH_SECONDS)
+            flush_records: Buffered records that trigger a flush (defaults to config.SENSOR_STORE_FLUSH_RECORDS)
+        """
+        self.path = Path(path)
+        self.payload = struct.Struct(payload_format)
+        self.record = struct.Struct(payload_format + "I")
+        self.segment_format = segment_format
+        self.retention_days = retention_days or config.SENSOR_STORE_RETENTION_DAYS
+        self.flush_interval = config.SENSOR_STORE_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self.flush_records = flush_records or config.SENSOR_STORE_FLUSH_RECORDS
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple[str, bytes]] = []
+        self._last_flush = time.monotonic()
+        self._segment_name: Optional[str] = None
+        self._segment_file = None
+        self.appended = 0
+        self.flushes = 0
+        self.recovered_bytes = 0
+        # Newest valid record on disk when opened, lets owners resume where they stopped
+        self.last_record: Optional[tuple] = None
+        
+        segments = self._segments()
+        if segments:
+            self._recover(segments[-1])
+        self.enforce_retention()
+    
+    def append(self, *fields) -> None:
+        """
+        Buffer one record, flushing the buffer when it is due
+        
+        Args:
+            *fields: Record fields matching payload_format, timestamp first
+        """
+        payload = self.payload.pack(*fields)
+        record = payload + struct.pack("<I", zlib.crc32(payload))
+        with self._lock:
+            self._buffer.append((self.segment_for(fields[0]), record))
+            self.appended += 1
+            if (len(self._buffer) >= self.flush_records
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+    
+    def flush(self) -> None:
+        """Write and fsync every buffered record"""
+        with self._lock:
+            self._flush()
+    
+    def scan(self, start: float, end: float) -> Iterator[tuple]:
+        """
+        Iterate the valid records with start <= timestamp <= end in time order
+        
+        Buffered records that are not on disk yet are included.
+        
+        Args:
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+        
+        Yields:
+            Record fields without the checksum
+        """
+        first, last = self.segment_for(start), self.segment_for(end)
+        # Snapshot segment lengths together with the buffer, so a flush while
+        # scanning neither duplicates nor loses records
+        with self._lock:
+            buffered = [record for _, record in self._buffer]
+            segments = [
+                (segment, segment.stat().st_size // self.record.size)
+                for segment in self._segments() if first <= segment.stem <= last
+            ]
+        
+        for segment, count in segments:
+            yield from self._scan(segment, count, start, end)
+        
+        for record in buffered:
+            fields = self.unpack(record)
+            if fields is not None and start <= fields[0] <= end:
+                yield fields
+    
+    def unpack(self, record: bytes) -> Optional[tuple]:
+        """Decode a record, None when its checksum does not match (torn or corrupt write)"""
+        *fields, checksum = self.record.unpack(record)
+        if zlib.crc32(record[:self.payload.size]) != checksum:
+            return None
+        return tuple(fields)
+    
+    def enforce_retention(self, now: float = None) -> List[str]:
+        """
+        Delete segments that lie completely outside the retention window
+        
+        Returns:
+            Names of the deleted segment files
+        """
+        cutoff = self.segment_for((time.time() if now is None else now) - self.retention_days * 86400)
+        deleted = []
+        for segment in self._segments():
+            if segment.stem < cutoff and segment.stem != self._segment_name:
+                segment.unlink()
+                deleted.append(segment.name)
+        return deleted
+    
+    def stats(self) -> Dict[str, object]:
+        """Get segment count, disk usage and write counters"""
+        segments = self._segments()
+        with self._lock:
+            return {
+                "segments": len(segments),
+                "oldest_segment": segments[0].stem if segments else None,
+                "bytes": sum(segment.stat().st_size for segment in segments),
+                "record_bytes": self.record.size,
+                "buffered": len(self._buffer),
+                "appended": self.appended,
+                "flushes": self.flushes,
+                "recovered_bytes": self.recovered_bytes,
+                "retention_days": self.retention_days
+            }
+    
+    def close(self) -> None:
+        """Flush and close the open segment"""
+        with self._lock:
+            self._flush()
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+                self._segment_name = None
+    
+    def segment_for(self, timestamp: float) -> str:
+        """Segment name (UTC) a timestamp belongs to"""
+        return datetime.fromtimestamp(max(0.0, timestamp), tz=timezone.utc).strftime(self.segment_format)
+    
+    def _segments(self) -> List[Path]:
+        """Segment files sorted by time"""
+        return sorted(self.path.glob(f"*{SEGMENT_SUFFIX}"))
+    
+    def _flush(self) -> None:
+        """Append buffered records to their segments and fsync (lock held)"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        for segment_name in sorted({name for name, _ in self._buffer}):
+            if segment_name != self._segment_name:
+                self._open_segment(segment_name)
+            self._segment_file.write(b"".join(record for name, record in self._buffer if name == segment_name))
+            self._segment_file.flush()
+            os.fsync(self._segment_file.fileno())
+        self._buffer.clear()
+        self.flushes += 1
+    
+    def _open_segment(self, segment_name: str) -> None:
+        """Switch appends to another segment (lock held)"""
+        if self._segment_file is not None:
+            self._segment_file.close()
+        rotated = self._segment_name is not None
+        self._segment_name = segment_name
+        self._segment_file = open(self.path / f"{segment_name}{SEGMENT_SUFFIX}", "ab")
+        if rotated:
+            self.enforce_retention()
+    
+    def _recover(self, segment: Path) -> None:
+        """Cut a torn or corrupt tail (crash during append) back to the last valid record"""
+        size = segment.stat().st_size
+        valid = size - size % self.record.size
+        with open(segment, "rb") as segment_file:
+            while valid > 0:
+                segment_file.seek(valid - self.record.size)
+                self.last_record = self.unpack(segment_file.read(self.record.size))
+                if self.last_record is not None:
+                    break
+                valid -= self.record.size
+        if valid != size:
+            with open(segment, "r+b") as segment_file:
+                segment_file.truncate(valid)
+                os.fsync(segment_file.fileno())
+            self.recovered_bytes += size - valid
+    
+    def _scan(self, segment: Path, count: int, start: float, end: float) -> Iterator[tuple]:
+        """Yield the valid records among the first count of a segment within [start, end]"""
+        size = self.record.size
+        try:
+            segment_file = open(segment, "rb")
+        except FileNotFoundError:
+            # Deleted by retention in the meantime
+            return
+        with segment_file:
+            # First record with timestamp >= start; timestamps sit at the start of each record
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                segment_file.seek(middle * size)
+                timestamp = struct.unpack("<d", segment_file.read(8))[0]
+                if timestamp < start:
+                    low = middle + 1
+                else:
+                    high = middle
+            
+            segment_file.seek(low * size)
+            while low < count:
+                chunk = segment_file.read(min(SCAN_CHUNK_RECORDS, count - low) * size)
+                if not chunk:
+                    return
+                for offset in range(0, len(chunk), size):
+                    fields = self.unpack(chunk[offset:offset + size])
+                    if fields is None:
+                        continue
+                    if fields[0] > end:
+                        return
+                    yield fields
+                low += len(chunk) // size
+
+
+class SensorStore:
+    """
+    Append-only store of (timestamp, temperature, humidity, sensor id) samples
+    
+    Samples go to a SegmentLog with one segment file per UTC day as 22 byte
+    records (timestamp, temperature, humidity, sensor index, CRC32), so a
+    day of 2 s samples is under 1 MB and time-range queries binary-search a
+    day instead of scanning it. Sensor ids are stored once in sensors.json.
+    
+    Records within a segment are expected in time order; small backward
+    clock steps are clamped to the previous timestamp.
+    """
+    
+    # timestamp (epoch s), temperature, humidity, sensor index
+    PAYLOAD_FORMAT = "<dffH"
+    
+    def __init__(self, path: str = None, retention_days: float = None,
+                 flush_interval: float = None, flush_records: int = None):
+        """
+        Open (or create) the store
+        
+        Args:
+            path: Directory of the segment files (defaults to config.SENSOR_STORE_PATH)
+            retention_days: Days of segments kept (defaults to config.SENSOR_STORE_RETENTION_DAYS)
+            flush_interval: Longest time a sample stays buffered in seconds
+                (defaults to config.SENSOR_STORE_FLUSH_SECONDS)
+            flush_records: Buffered records that trigger a flush (defaults to config.SENSOR_STORE_FLUSH_RECORDS)
+        """
+        self.path = Path(path or config.SENSOR_STORE_PATH)
+        self.log = SegmentLog(self.path, self.PAYLOAD_FORMAT, "%Y%m%d", retention_days, flush_interval, flush_records)
+        self._lock = threading.Lock()
+        self._last_timestamp = self.log.last_record[0] if self.log.last_record else 0.0
+        
+        self._sensors_path = self.path / "sensors.json"
+        self._sensor_ids: List[str] = []
+        if self._sensors_path.exists():
+            with open(self._sensors_path) as sensors_file:
+                self._sensor_ids = json.load(sensors_file)
+        self._sensor_index: Dict[str, int] = {sensor_id: idx for idx, sensor_id in enumerate(self._sensor_ids)}
+    
+    @property
+    def last_timestamp(self) -> float:
+        """Timestamp of the newest stored sample (0 when empty)"""
+        return self._last_timestamp
+    
+    def append(self, sensor_id: str, temperature: float, humidity: float, timestamp: float = None) -> float:
+        """
+        Buffer one sample, flushing the buffer when it is due
+        
+        Args:
+            sensor_id: Sensor identifier
+            temperature: Temperature in °C
+            humidity: Relative humidity in %
+            timestamp: Epoch seconds of the reading (defaults to now)
+        
+        Returns:
+            The timestamp stored, after clamping backward clock steps
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            timestamp = max(timestamp, self._last_timestamp)
+            self._last_timestamp = timestamp
+            self.log.append(timestamp, temperature, humidity, self._sensor_index_of(sensor_id))
+        return timestamp
+    
+    def flush(self) -> None:
+        """Write and fsync every buffered record"""
+        self.log.flush()
+    
+    def sensor_index(self, sensor_id: str) -> int:
+        """Small integer a sensor id is stored as, registering new ids durably"""
+        with self._lock:
+            return self._sensor_index_of(sensor_id)
+    
+    def sensor_ids(self) -> List[str]:
+        """Known sensor ids, position = stored index"""
+        with self._lock:
+            return list(self._sensor_ids)
+    
+    def query(self, start: float, end: float, sensor_id: str = None) -> Iterator[Sample]:
+        """
+        Iterate samples with start <= timestamp <= end in time order
+        
+        Buffered samples that are not on disk yet are included.
+        
+        Args:
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+            sensor_id: Only samples of this sensor (default: all sensors)
+        
+        Yields:
+            (timestamp, sensor_id, temperature, humidity) tuples
+        """
+        sensor_ids = self.sensor_ids()
+        wanted = None if sensor_id is None else (sensor_ids.index(sensor_id) if sensor_id in sensor_ids else -1)
+        for timestamp, temperature, humidity, index in self.log.scan(start, end):
+            if (wanted is None or index == wanted) and index < len(sensor_ids):
+                yield timestamp, sensor_ids[index], temperature, humidity
+    
+    def enforce_retention(self, now: float = None) -> List[str]:
+        """
+        Delete segments that lie completely outside the retention window
+        
+        Returns:
+            Names of the deleted segment files
+        """
+        return self.log.enforce_retention(now)
+    
+    def stats(self) -> Dict[str, object]:
+        """Get segment count, disk usage and write counters"""
+        return {"path": str(self.path), "sensors": self.sensor_ids(), **self.log.stats()}
+    
+    def close(self) -> None:
+        """Flush and close the open segment"""
+        self.log.close()
+    
+    def _sensor_index_of(self, sensor_id: str) -> int:
+        """Index of a sensor id, registering new ids durably (lock held)"""
+        index = self._sensor_index.get(sensor_id)
+        if index is None:
+            index = len(self._sensor_ids)
+            self._sensor_ids.append(sensor_id)
+            self._sensor_index[sensor_id] = index
+            temp_path = self._sensors_path.with_suffix(".tmp")
+            with open(temp_path, "w") as sensors_file:
+                json.dump(self._sensor_ids, sensors_file)
+                sensors_file.flush()
+                os.fsync(sensors_file.fileno())
+            os.replace(temp_path, self._sensors_path)
+        return index
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    
+    # Write and query timings for three days of 2 s samples (recovery and
+    # retention are checked in tests/test_sensor_store.py)
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp(prefix="sensor-store-")
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    store = SensorStore(directory, retention_days=3650, flush_interval=3600, flush_records=1024)
+    
+    start = time.perf_counter()
+    for step in range(3 * 43200):
+        store.append("DHT22_SENSOR_01", 20 + step % 10, 50 + step % 7, base + step * 2)
+    store.close()
+    print(f"appended {store.log.appended} samples in {time.perf_counter() - start:.2f} s, {store.log.flushes} flushes")
+    print(store.stats())
+    
+    start = time.perf_counter()
+    window = list(store.query(base + 86400 + 3600, base + 86400 + 7200))
+    print(f"1 hour query: {len(window)} samples in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+# how to run
+# python sensor_store.py [directory]
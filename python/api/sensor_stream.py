@@ -0,0 +1,128 @@
+"""
+Sensor Stream - Server-Push Fan-Out
+Pushes sensor samples to many SSE / WebSocket subscribers with per-client backpressure
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional
+import config
+
+
+class SubscriberLimitError(Exception):
+    """Raised when the stream already has the maximum number of subscribers"""
+
+
+class Subscription:
+    """
+    One client's bounded frame queue
+    
+    Lives on the event loop of the connection. When the client falls
+    behind, the oldest queued frame is dropped for the newest one, so a
+    slow consumer always gets recent samples and never grows memory.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queued))
+        self.dropped = 0
+    
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next frame
+        
+        Args:
+            timeout: Seconds to wait
+        
+        Returns:
+            The frame, or None when nothing arrived in time
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    def offer(self, frame: Dict[str, Any]) -> None:
+        """Queue a frame, dropping the oldest one when full (event loop thread only)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait({**frame, "dropped": self.dropped})
+
+
+class SensorBroadcaster:
+    """
+    Fans samples produced by the sampler thread out to every subscriber
+    
+    publish() is called from the sampler thread and never blocks on a
+    client: frames are handed to each subscriber's event loop with
+    call_soon_threadsafe and queued there.
+    """
+    
+    def __init__(self, max_queued: int = None, max_subscribers: int = None):
+        """
+        Initialize the broadcaster
+        
+        Args:
+            max_queued: Frames buffered per subscriber (defaults to config.SENSOR_STREAM_QUEUE)
+            max_subscribers: Most concurrent subscribers (defaults to config.SENSOR_STREAM_MAX_SUBSCRIBERS)
+        """
+        self.max_queued = max_queued or config.SENSOR_STREAM_QUEUE
+        self.max_subscribers = max_subscribers or config.SENSOR_STREAM_MAX_SUBSCRIBERS
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+    
+    def subscribe(self) -> Subscription:
+        """
+        Register a subscriber on the running event loop
+        
+        Raises:
+            SubscriberLimitError: If max_subscribers are already connected
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitError(f"Sensor stream is limited to {self.max_subscribers} subscribers")
+            self._subscribers.append(subscription)
+        return subscription
+    
+    def full(self) -> bool:
+        """Whether subscribe() would raise SubscriberLimitError right now"""
+        with self._lock:
+            return len(self._subscribers) >= self.max_subscribers
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber (safe to call twice)"""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+    
+    def publish(self, frame: Dict[str, Any]) -> None:
+        """Hand a frame to every subscriber without waiting for any of them"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, frame)
+            except RuntimeError:
+                # The subscriber's event loop is closed
+                self.unsubscribe(subscription)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get subscriber count and drop counters"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "max_subscribers": self.max_subscribers,
+            "max_queued": self.max_queued,
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in subscribers)
+        }
+
+
+def sse_event(frame: Dict[str, Any], event: str = "sample") -> str:
+    """Format a frame as a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(frame)}\n\n"
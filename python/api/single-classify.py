@@ -1,24 +1,43 @@
 import sys
 import os
-from ultralytics import YOLO
-
-MODEL_PATH = "../model/final-version/weights/best.pt"
+import config
+from classify_daemon import DaemonError, connect_daemon
 
 def classify(image_path):
     if not os.path.exists(image_path):
         print(f"Error: file '{image_path}' does not exist")
         return
 
-    model = YOLO(MODEL_PATH)
+    # A running classify_daemon.py already has the model loaded
+    client = connect_daemon()
+    if client is not None:
+        with client, open(image_path, "rb") as image_file:
+            try:
+                result = client.classify(image_file.read())
+            except DaemonError as e:
+                print(f"Error: {e}")
+                return
+            except OSError as e:
+                # Daemon died or timed out mid-request (ConnectionError, socket.timeout)
+                print(f"Classification daemon unavailable ({e}), loading the model")
+                result = None
+        if result is not None:
+            print(f"Class: {result['class']}, Confidence: {result['confidence']:.4f}")
+            return
+
+    # No daemon: load the model in this process, decoded and run like the daemon's service does
+    import numpy as np
+    from image_decode import decode_image
+    from inference_backends import create_backend
+    from predict_service import PredictionService
+    backend = create_backend(config.MODEL_PATH)
+    with open(image_path, "rb") as image_file:
+        image, _ = decode_image(image_file.read(), PredictionService.resolve_decode_size(backend.input_size))
     
     # Run prediction
-    results = model.predict(image_path, imgsz=640)
-
-    for result in results:
-        class_id = result.probs.top1
-        confidence = result.probs.top1conf.item()
-        class_name = model.names[class_id]
-        print(f"Class: {class_name}, Confidence: {confidence:.4f}")
+    probs = backend.infer([image])[0]
+    class_id = int(np.argmax(probs))
+    print(f"Class: {backend.names[class_id]}, Confidence: {float(probs[class_id]):.4f}")
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
@@ -35,4 +54,5 @@ if __name__ == "__main__":
 
 
 # how to run
-# python single-classify.py cls "C:/Users/Admin/Documents/thesis/dataset/high/img_000001.jpg"
\ No newline at end of file
+# python single-classify.py cls "C:/Users/Admin/Documents/thesis/dataset/high/img_000001.jpg"
+# (start "python classify_daemon.py serve" once to skip the model load on every call)
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Telemetry - Lightweight Statistics
+Histograms, counters and gauges reporting inference and sensor behaviour,
+served in the Prometheus text format on /metrics
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values, safe to update from any thread"""
+    
+    def __init__(self, buckets: List[float]):
+        """
+        Initialize an empty histogram
+        
+        Args:
+            buckets: Sorted upper bounds of the histogram buckets
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """Record a single observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+    
+    def values(self) -> Tuple[List[int], int, float]:
+        """Consistent copy of bucket counts, count and sum"""
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the histogram as a JSON serializable dictionary"""
+        counts, count, total = self.values()
+        labels = [f"<={bound:g}" for bound in self.buckets] + [f">{self.buckets[-1]:g}"]
+        return {
+            "count": count,
+            "sum": round(total, 2),
+            "mean": round(total / count, 2) if count else 0,
+            "buckets": dict(zip(labels, counts))
+        }
+
+
+class Counter:
+    """Monotonically increasing value (requests, errors, ...)"""
+    
+    __slots__ = ("value", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down (model load time, queue depth, ...)"""
+    
+    __slots__ = ("value", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+    
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class MetricFamily:
+    """
+    A named metric split by label values
+    
+    labels() creates a child the first time a combination is seen and
+    returns the same child afterwards; hot paths look their children up
+    once and keep them, so recording only takes the child's own lock.
+    """
+    
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str],
+                 factory: Callable[[], Any]):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def labels(self, *values: Any) -> Any:
+        """Child metric for one combination of label values"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+    
+    def children(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.label_names, key)), child) for key, child in items]
+
+
+class Registry:
+    """
+    Metrics served in the Prometheus text format on /metrics
+    
+    Each counter, gauge and histogram guards its updates with its own lock:
+    `+=` on a shared value is a read-modify-write that loses increments when
+    pool workers, the batcher and the sensor sampler update it at once. The
+    locks are uncontended most of the time, cheap enough for every request,
+    and a scrape never waits on another metric. Values only known at scrape
+    time (queue depth, driver statistics) come from collector callbacks.
+    """
+    
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = {}
+        self._lock = threading.Lock()
+    
+    def _family(self, name: str, help_text: str, kind: str, label_names: Sequence[str],
+                factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, label_names, factory)
+        # Unlabelled metrics are used directly, labelled ones through labels()
+        return family if family.label_names else family.labels()
+    
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Any:
+        """Get or create a counter (a MetricFamily when label_names are given)"""
+        return self._family(name, help_text, "counter", label_names, Counter)
+    
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Any:
+        """Get or create a gauge (a MetricFamily when label_names are given)"""
+        return self._family(name, help_text, "gauge", label_names, Gauge)
+    
+    def histogram(self, name: str, help_text: str, buckets: List[float], label_names: Sequence[str] = ()) -> Any:
+        """Get or create a histogram (a MetricFamily when label_names are given)"""
+        return self._family(name, help_text, "histogram", label_names, lambda: Histogram(buckets))
+    
+    def register(self, name: str, help_text: str, metric: Any) -> None:
+        """
+        Expose an existing Counter, Gauge or Histogram (e.g. a batcher's own
+        histogram), replacing whatever was registered under the name before
+        """
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+        family = MetricFamily(name, help_text, kind, (), lambda: metric)
+        family.labels()
+        with self._lock:
+            self._families[name] = family
+    
+    def collector(self, key: str, collect: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """
+        Register a callback run on every scrape, replacing an earlier one with the same key
+        
+        Args:
+            key: Identity of the callback
+            collect: Returns (name, help, "counter" | "gauge", labels, value) samples
+        """
+        with self._lock:
+            self._collectors[key] = collect
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+            collectors = list(self._collectors.values())
+        
+        lines = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, child in family.children():
+                if family.kind == "histogram":
+                    lines.extend(_histogram_lines(family.name, labels, child))
+                else:
+                    lines.append(f"{family.name}{_labels(labels)} {_number(child.value)}")
+        
+        described = set()
+        for collect in collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                continue
+            for name, help_text, kind, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    """Cumulative le buckets, sum and count of a histogram"""
+    counts, count, total = histogram.values()
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets + [float("inf")], counts):
+        cumulative += bucket_count
+        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+    lines.append(f"{name}_count{_labels(labels)} {count}")
+    return lines
+
+
+# Global registry served by /metrics
+REGISTRY = Registry()
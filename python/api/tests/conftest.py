@@ -0,0 +1,8 @@
+"""
+Test configuration
+The API modules are flat scripts run from python/api, put it on the import path
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
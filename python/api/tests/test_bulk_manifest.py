@@ -0,0 +1,106 @@
+"""
+Resumable bulk manifest (bulk_manifest.py)
+A crash may only lose the torn last line, and results of another model must never be reused
+"""
+import json
+import pytest
+from bulk_manifest import BulkManifest
+
+
+def entry(idx, class_name="HIGH"):
+    return (100 + idx, 1000 + idx, f"hash{idx}", class_name, 0.9)
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Manifest of ten images from model-a, written in batches of three"""
+    path = tmp_path / "manifest.jsonl"
+    manifest = BulkManifest(path, "model-a", flush_records=3)
+    for idx in range(10):
+        manifest.add(f"img{idx}.jpg", entry(idx))
+    assert manifest.flushes == 3
+    manifest.close()
+    return path
+
+
+def line_count(path):
+    with open(path, encoding="utf-8") as manifest_file:
+        return sum(1 for _ in manifest_file)
+
+
+def test_lookups(path):
+    manifest = BulkManifest(path, "model-a")
+    assert len(manifest.entries) == 10 and manifest.recovered_bytes == 0
+    assert manifest.lookup("img3.jpg", 103, 1003)[3] == "HIGH"
+    # Touched file: size/mtime no longer match, the content hash still does
+    assert manifest.lookup("img3.jpg", 103, 9999) is None
+    assert manifest.lookup_content("img3.jpg", "hash3") is not None
+    assert manifest.lookup_content("img3.jpg", "other") is None
+    manifest.close()
+
+
+def test_newest_line_wins(path):
+    manifest = BulkManifest(path, "model-a")
+    manifest.add("img3.jpg", (103, 9999, "hash3", "LOW", 0.8))
+    # Entries loaded at open are not updated during a run
+    assert manifest.entries["img3.jpg"][3] == "HIGH"
+    manifest.close()
+    assert BulkManifest(path, "model-a").entries["img3.jpg"][3] == "LOW"
+
+
+def test_torn_tail_is_cut(path):
+    size = path.stat().st_size
+    torn = '{"path": "img10.jpg", "size"'
+    with open(path, "a", encoding="utf-8") as manifest_file:
+        manifest_file.write(torn)
+    manifest = BulkManifest(path, "model-a")
+    assert len(manifest.entries) == 10 and manifest.recovered_bytes == len(torn)
+    assert path.stat().st_size == size
+    # Appends continue on a clean line boundary
+    manifest.add("img10.jpg", entry(10))
+    manifest.close()
+    assert len(BulkManifest(path, "model-a").entries) == 11
+
+
+def test_corrupt_line_cuts_the_rest(path):
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    lines[5] = "not json\n"
+    path.write_text("".join(lines), encoding="utf-8")
+    manifest = BulkManifest(path, "model-a")
+    # Header plus the four lines before the corrupt one survive
+    assert sorted(manifest.entries) == [f"img{idx}.jpg" for idx in range(4)]
+    assert line_count(path) == 5
+    manifest.close()
+
+
+@pytest.mark.parametrize("header", ['{"version": 1, "model": "model-b"}\n', '{"version": 0, "model": "model-a"}\n',
+                                    "garbage\n"])
+def test_other_model_is_discarded(path, header):
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    path.write_text(header + "".join(lines[1:]), encoding="utf-8")
+    manifest = BulkManifest(path, "model-a")
+    assert not manifest.entries
+    manifest.close()
+    # The file starts over with the current model's header
+    assert json.loads(path.read_text(encoding="utf-8")) == {"version": 1, "model": "model-a"}
+
+
+def test_mismatched_model_starts_over(path):
+    manifest = BulkManifest(path, "model-b")
+    manifest.close()
+    assert not manifest.entries and line_count(path) == 1
+    # Switching back does not bring the model-a results back either
+    assert not BulkManifest(path, "model-a").entries
+
+
+def test_superseded_lines_are_compacted(path):
+    manifest = BulkManifest(path, "model-a", flush_records=1000)
+    for _ in range(1200):
+        manifest.add("same.jpg", (1, 1, "h", "HIGH", 0.5))
+    manifest.close()
+    assert line_count(path) == 1211
+    manifest = BulkManifest(path, "model-a")
+    manifest.close()
+    # Header plus one line per path
+    assert line_count(path) == 12 and len(manifest.entries) == 11
+    assert BulkManifest(path, "model-a").entries == manifest.entries
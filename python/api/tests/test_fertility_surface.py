@@ -0,0 +1,77 @@
+"""
+Precomputed fertility surface against the exact fuzzy engine
+The interpolated score must stay within FERTILITY_SURFACE_TOLERANCE of the exact one
+"""
+import math
+import numpy as np
+import pytest
+import config
+from fertility_surface import FertilitySurface, fertility_history
+from fuzzy_service import get_fuzzy_logic_service
+
+# Breakpoints, level thresholds, grid edges and missing humidity
+EDGE_READINGS = [(0, 50), (27, 75), (50, 100), (-10, 0), (36, np.nan), (18, 60), (24, 45), (16, 65),
+                 (21, 85), (30, 75), (27, np.nan), (0, 0)]
+
+
+@pytest.fixture(scope="module")
+def surface():
+    return FertilitySurface.build(config.FERTILITY_SURFACE_TEMPERATURE_RANGE, config.FERTILITY_SURFACE_TEMPERATURE_STEP,
+                                  config.FERTILITY_SURFACE_HUMIDITY_STEP, config.FERTILITY_SURFACE_TOLERANCE)
+
+
+@pytest.fixture(scope="module")
+def readings():
+    """Random readings, a fifth without humidity and some outside the grid, plus the edge readings"""
+    rng = np.random.default_rng(42)
+    count = 50000
+    densities = rng.choice(["LOW", "HIGH"], count)
+    temperatures = rng.uniform(-15, 55, count)
+    humidities = np.where(rng.random(count) < 0.2, np.nan, rng.uniform(0, 100, count))
+    temperatures[:len(EDGE_READINGS)], humidities[:len(EDGE_READINGS)] = zip(*EDGE_READINGS)
+    return densities, temperatures, humidities
+
+
+@pytest.fixture(scope="module")
+def scored(surface, readings):
+    return surface.score(*readings), get_fuzzy_logic_service().infer_batch(*readings)
+
+
+def test_build_measures_error_within_tolerance(surface):
+    assert surface.tolerance == config.FERTILITY_SURFACE_TOLERANCE
+    assert np.all(surface.max_error <= surface.tolerance), surface.max_error
+
+
+def test_scores_within_tolerance(surface, scored):
+    result, exact = scored
+    error = np.abs(result["fertility_score"] - exact["fertility_score"])
+    assert error.max() <= surface.tolerance
+    # Edge readings (jumps, out of grid, no humidity) are scored exactly
+    assert np.all(error[:len(EDGE_READINGS)] <= 1e-9)
+
+
+def test_levels_only_differ_near_thresholds(surface, scored):
+    result, exact = scored
+    mismatch = result["fertility_level"] != exact["fertility_level"]
+    near = np.minimum(np.abs(exact["fertility_score"] - 40), np.abs(exact["fertility_score"] - 70))
+    assert np.all(near[mismatch] <= surface.tolerance)
+
+
+def test_cache_round_trip(surface, readings, scored, tmp_path):
+    path = tmp_path / "surface.npz"
+    surface.save(path)
+    assert FertilitySurface.load(path, "other") is None
+    loaded = FertilitySurface.load(path, surface.fingerprint)
+    assert loaded is not None
+    assert np.array_equal(loaded.score(*readings)["fertility_score"], scored[0]["fertility_score"])
+
+
+def test_history_buckets(surface):
+    # 3 days of 2 s samples in hourly buckets
+    timestamps = 1.7e9 + np.arange(0, 3 * 86400, 2.0)
+    samples = [(timestamp, "S1", 20 + 10 * math.sin(timestamp / 86400 * 2 * math.pi), 60.0)
+               for timestamp in timestamps]
+    history = fertility_history(surface, samples, "HIGH", timestamps[0], timestamps[-1] + 1, 72)
+    assert history["count"] == len(samples) and len(history["points"]) == 72
+    assert sum(point[1] for point in history["points"]) == len(samples)
+    assert sum(history["levels"].values()) == pytest.approx(1)
@@ -0,0 +1,164 @@
+"""
+Fuzzy fertility engine against the documented examples and the TypeScript service
+README values come from the root README.md ("Fuzzy Logic Fertility Prediction System")
+"""
+from typing import Any, Dict
+import numpy as np
+import pytest
+from fuzzy_service import (
+    FEATHER_SETS, HUMIDITY_SETS, RULE_NAMES, RULES, TEMPERATURE_SETS, fertility_levels,
+    get_fuzzy_logic_service, humidity_stress, membership, round_half_up, temperature_stress
+)
+
+# (label, value function, expected) for the single values the README works through
+README_VALUES = [
+    ("temperature stress 21°C", lambda: temperature_stress(np.float64(21)), 0.20),
+    ("temperature stress 10°C", lambda: temperature_stress(np.float64(10)), 0.47),
+    ("temperature stress 35°C", lambda: temperature_stress(np.float64(35)), 0.75),
+    ("temperature stress 40°C", lambda: temperature_stress(np.float64(40)), 1.00),
+    ("humidity stress 60%", lambda: humidity_stress(np.float64(60)), 0.10),
+    ("humidity stress 30%", lambda: humidity_stress(np.float64(30)), 0.26),
+    ("humidity stress 85%", lambda: humidity_stress(np.float64(85)), 0.35),
+    ("humidity stress 100%", lambda: humidity_stress(np.float64(100)), 0.60),
+    ("FDS 0.75 low", lambda: membership(0.75, *FEATHER_SETS["low"]), 0.0),
+    ("FDS 0.75 medium", lambda: membership(0.75, *FEATHER_SETS["medium"]), 0.0),
+    ("FDS 0.75 high", lambda: membership(0.75, *FEATHER_SETS["high"]), 1.0),
+    ("FDS 0.25 low", lambda: membership(0.25, *FEATHER_SETS["low"]), 1.0),
+    # README: 0.25, but (0.25 - 0.2) / (0.5 - 0.2) of the documented set is 0.17
+    ("FDS 0.25 medium", lambda: membership(0.25, *FEATHER_SETS["medium"]), 0.17),
+    ("FDS 0.25 high", lambda: membership(0.25, *FEATHER_SETS["high"]), 0.0),
+    ("cold MF 10°C", lambda: membership(10, *TEMPERATURE_SETS["cold"]), 1.0),
+    ("cold MF 21°C", lambda: membership(21, *TEMPERATURE_SETS["cold"]), 0.5),
+    ("cold MF 25°C", lambda: membership(25, *TEMPERATURE_SETS["cold"]), 0.0)
+]
+
+# README membership tables: value -> (cold, optimal, hot) and (low, optimal, high). Where the
+# README assumes a peaked triangle for a 3-parameter set, the NestJS code (and the port) use a
+# flat top from b to c; the code is the reference, so those rows hold the code's values
+# (README: 25°C optimal 0.33, 22°C cold 0.0 / optimal 0.73 / hot 0.07, 50% optimal 0.67).
+TEMPERATURE_TABLE = {10: (1.00, 0.00, 0.00), 18: (1.00, 0.40, 0.00), 21: (0.50, 1.00, 0.00),
+                     25: (0.00, 1.00, 0.44), 30: (0.00, 0.00, 1.00), 22: (0.33, 1.00, 0.11)}
+HUMIDITY_TABLE = {20: (1.00, 0.00, 0.00), 50: (0.50, 0.33, 0.00), 60: (0.00, 1.00, 0.00),
+                  75: (0.00, 0.00, 0.50), 90: (0.00, 0.00, 1.00)}
+
+
+def _reference_infer(feather_density: str, temperature: float, humidity: float = None) -> Dict[str, Any]:
+    """Line-by-line scalar port of fuzzy-logic.service.ts, the parity reference"""
+    def mf(x, a, b, c, d=None):
+        if d is None:
+            d = c
+        if x <= a or x >= d:
+            return 0
+        if b <= x <= c:
+            return 1
+        if a < x < b:
+            return (x - a) / (b - a)
+        if c < x < d:
+            return (d - x) / (d - c)
+        return 0
+    
+    def temp_stress(temp):
+        if 18 <= temp <= 24:
+            return 0.2
+        if temp < 18:
+            return min(1, 0.2 + (18 - temp) / 18 * 0.6)
+        return min(1, 0.2 + (temp - 24) / 16 * 0.8)
+    
+    def hum_stress(hum):
+        if 50 <= hum <= 70:
+            return 0.1
+        if hum < 50:
+            return min(1, 0.1 + (50 - hum) / 50 * 0.4)
+        return min(1, 0.1 + (hum - 70) / 30 * 0.5)
+    
+    fds = 0.75 if feather_density == "HIGH" else 0.25
+    tci = temp_stress(temperature) * 0.7 + hum_stress(humidity) * 0.3 if humidity is not None else temp_stress(temperature)
+    tci = min(1, max(0, tci))
+    feather = {name: mf(fds, *params) for name, params in FEATHER_SETS.items()}
+    temp = {name: mf(temperature, *params) for name, params in TEMPERATURE_SETS.items()}
+    
+    rules = {
+        "rule1_high_feather_optimal_temp": min(feather["high"], temp["optimal"]),
+        "rule2_high_feather_cold_temp": min(feather["high"], temp["cold"]),
+        "rule3_high_feather_hot_temp": min(feather["high"], temp["hot"]),
+        "rule4_medium_feather_optimal_temp": min(feather["medium"], temp["optimal"]),
+        "rule5_medium_feather_cold_temp": min(feather["medium"], temp["cold"]),
+        "rule6_medium_feather_hot_temp": min(feather["medium"], temp["hot"]),
+        "rule7_low_feather_cold_temp": min(feather["low"], temp["cold"]),
+        "rule8_low_feather_optimal_temp": min(feather["low"], temp["optimal"]),
+        "rule9_low_feather_hot_temp": min(feather["low"], temp["hot"])
+    }
+    if humidity is not None:
+        hum = {name: mf(humidity, *params) for name, params in HUMIDITY_SETS.items()}
+        rules["rule10_perfect_conditions"] = min(feather["high"], temp["optimal"], hum["optimal"])
+        rules["rule11_low_humidity_stress"] = min(feather["high"], hum["low"])
+        rules["rule12_high_humidity_stress"] = min(feather["high"], hum["high"])
+    if tci >= 0.8:
+        rules["rule13_high_heat_stress"] = tci
+    active = {rule: strength for rule, strength in rules.items() if strength > 0}
+    
+    outputs = {name: (center, width) for name, center, width in RULES}
+    numerator = denominator = 0
+    for z in range(101):
+        membership_at_z = 0
+        for rule, strength in active.items():
+            center, width = outputs[rule]
+            membership_at_z = max(membership_at_z, min(strength, mf(z, center - width, center, center + width)))
+        numerator += membership_at_z * z
+        denominator += membership_at_z
+    score = max(0, min(100, numerator / denominator if denominator > 0 else 50))
+    return {"score": score, "tci": tci, "feather": feather, "temp": temp, "rules": active}
+
+
+@pytest.mark.parametrize("label, value, expected", README_VALUES, ids=[label for label, _, _ in README_VALUES])
+def test_readme_values(label, value, expected):
+    assert float(value()) == pytest.approx(expected, abs=0.005)
+
+
+@pytest.mark.parametrize("temperature", sorted(TEMPERATURE_TABLE))
+def test_temperature_membership_table(temperature):
+    values = [float(membership(temperature, *TEMPERATURE_SETS[name])) for name in ("cold", "optimal", "hot")]
+    assert values == pytest.approx(TEMPERATURE_TABLE[temperature], abs=0.005)
+
+
+@pytest.mark.parametrize("humidity", sorted(HUMIDITY_TABLE))
+def test_humidity_membership_table(humidity):
+    values = [float(membership(humidity, *HUMIDITY_SETS[name])) for name in ("low", "optimal", "high")]
+    assert values == pytest.approx(HUMIDITY_TABLE[humidity], abs=0.005)
+
+
+@pytest.mark.parametrize("score, level", [(22.7, "LOW"), (39.99, "LOW"), (40, "MEDIUM"), (55.1, "MEDIUM"),
+                                          (69.99, "MEDIUM"), (70, "HIGH"), (82.4, "HIGH")])
+def test_fertility_level_thresholds(score, level):
+    assert fertility_levels(score) == level
+
+
+def test_worked_example():
+    # README worked example: HIGH feather density at 22°C, no humidity reading
+    result = get_fuzzy_logic_service().infer("HIGH", 22)
+    assert result["fertilityLevel"] == "HIGH"
+    assert result["fertilityScore"] == round_half_up(_reference_infer("HIGH", 22)["score"])
+
+
+def test_batch_matches_reference():
+    # Dense temperature sweep plus random readings, a fifth without humidity, every boundary humidity
+    rng = np.random.default_rng(0)
+    count = 5000
+    densities = rng.choice(["LOW", "HIGH"], count)
+    temperatures = np.concatenate([np.arange(-5, 50, 0.5), rng.uniform(-10, 55, count - 110)])
+    humidities = np.where(rng.random(count) < 0.2, np.nan, rng.uniform(0, 100, count))
+    humidities[:20] = [0, 40, 45, 50, 60, 65, 70, 75, 85, 100] * 2
+    
+    batch = get_fuzzy_logic_service().infer_batch(densities, temperatures, humidities)
+    for idx in range(count):
+        humidity = None if np.isnan(humidities[idx]) else float(humidities[idx])
+        reference = _reference_infer(str(densities[idx]), float(temperatures[idx]), humidity)
+        assert batch["fertility_score"][idx] == pytest.approx(reference["score"], abs=1e-9), idx
+        assert batch["tci"][idx] == pytest.approx(reference["tci"], abs=1e-12), idx
+        active = {name for name, strength in zip(RULE_NAMES, batch["rule_strengths"][idx]) if strength > 0}
+        assert active == reference["rules"].keys(), idx
+
+
+def test_single_matches_reference():
+    result = get_fuzzy_logic_service().infer("LOW", 31.5, 82)
+    assert result["fertilityScore"] == round_half_up(_reference_infer("LOW", 31.5, 82)["score"])
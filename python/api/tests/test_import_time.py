@@ -0,0 +1,28 @@
+"""
+Import-time budget of main (see check_import_time.py)
+Sensor-only nodes must boot fast and neither mode may import the ML stack at import time
+"""
+import pytest
+from check_import_time import DEFAULT_BUDGET_MS, HEAVY_MODULES, check, measure
+
+MODES = {
+    # Sensor-only node: prediction router not even imported
+    "sensor-only": {"PREDICTION_ENABLED": "False"},
+    # Full API: the router is imported, the ML stack loads later in the startup hook
+    "full": {"PREDICTION_ENABLED": "True"}
+}
+
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_import_main_within_budget(mode):
+    total_ms, packages, slowest = measure(MODES[mode])
+    
+    loaded_heavy = sorted(module for module in HEAVY_MODULES if module in packages)
+    assert not loaded_heavy, f"import main pulled in {', '.join(loaded_heavy)}"
+    assert total_ms <= DEFAULT_BUDGET_MS, f"import main took {total_ms:.0f} ms, slowest: {slowest}"
+
+
+def test_check_reports_failures():
+    # A budget nothing can meet and a module every mode imports must both fail the check
+    assert not check("zero budget", MODES["sensor-only"], 0, ())
+    assert not check("forbidden fastapi", MODES["sensor-only"], DEFAULT_BUDGET_MS, ("fastapi",))
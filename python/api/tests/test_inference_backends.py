@@ -0,0 +1,42 @@
+"""
+Backend input handling and parity against the torch backend
+Parity needs torch/ultralytics and the trained weights (config.MODEL_PATH), skipped otherwise
+"""
+from pathlib import Path
+import numpy as np
+import pytest
+import config
+from inference_backends import classify_preprocess
+
+# Training batch mosaics shipped with the model: real images of the classified domain
+SAMPLE_IMAGES = sorted((config.BASE_DIR.parent / "model" / "final-version").glob("train_batch*.jpg"))
+RUNTIMES = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+
+@pytest.fixture(scope="module")
+def torch_reference():
+    pytest.importorskip("torch")
+    pytest.importorskip("ultralytics")
+    if not Path(config.MODEL_PATH).exists():
+        pytest.skip(f"Model weights not found: {config.MODEL_PATH}")
+    if not SAMPLE_IMAGES:
+        pytest.skip("No sample images")
+
+
+def test_preprocess_keeps_rgb_order():
+    red = np.zeros((32, 48, 3), dtype=np.uint8)
+    red[..., 0] = 255
+    batch = classify_preprocess([red], 16)
+    assert batch.shape == (1, 3, 16, 16)
+    assert np.all(batch[0, 0] == 1.0) and not batch[0, 1:].any()
+
+
+@pytest.mark.usefixtures("torch_reference")
+@pytest.mark.parametrize("backend_name", sorted(RUNTIMES))
+def test_backend_matches_torch(backend_name, monkeypatch):
+    pytest.importorskip(RUNTIMES[backend_name])
+    from inference_backends import parity
+    
+    # Parity is defined for the fp32 export, int8 is checked by quantize.py
+    monkeypatch.setattr(config, "MODEL_PRECISION", "fp32")
+    assert parity([str(path) for path in SAMPLE_IMAGES], backend_name)
@@ -0,0 +1,42 @@
+"""
+Request batching (predict_service.InferenceBatcher)
+Every submitted image must get a result or an error, whatever the model returns
+"""
+import numpy as np
+import pytest
+from predict_service import InferenceBatcher
+
+
+def make_batcher(infer_fn):
+    # Long wait, so the images submitted below all land in one batch
+    return InferenceBatcher(infer_fn, max_batch_size=3, max_wait_ms=200)
+
+
+def test_every_image_gets_its_output():
+    batcher = make_batcher(lambda images: [np.array([float(image[0, 0, 0])]) for image in images])
+    futures = [batcher.submit(np.full((4, 4, 3), idx, dtype=np.uint8)) for idx in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+    assert [float(result["probs"][0]) for result in results] == [0.0, 1.0, 2.0]
+    assert all(result["batch_size"] == 3 for result in results)
+
+
+def test_missing_outputs_fail_instead_of_hanging():
+    batcher = make_batcher(lambda images: [np.array([1.0])] * (len(images) - 1))
+    futures = [batcher.submit(np.zeros((4, 4, 3), dtype=np.uint8)) for _ in range(3)]
+    assert futures[0].result(timeout=5)["probs"][0] == 1.0
+    with pytest.raises(RuntimeError, match="2 output"):
+        futures[2].result(timeout=5)
+    batcher.close()
+
+
+def test_model_error_fails_the_batch():
+    def failing(images):
+        raise ValueError("boom")
+    
+    batcher = make_batcher(failing)
+    futures = [batcher.submit(np.zeros((4, 4, 3), dtype=np.uint8)) for _ in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    batcher.close()
@@ -0,0 +1,83 @@
+"""
+Offline evaluation (metrics.py) with a stand-in backend
+The eval cache must key models like the prediction cache and bulk manifests
+"""
+import os
+import numpy as np
+import pytest
+import config
+import metrics
+import multi
+from predict_service import PredictionService
+from prediction_cache import model_fingerprint
+
+
+class FakeBackend:
+    """Backend stand-in: every image is HIGH at 0.7"""
+    
+    name = "torch"
+    names = {0: "HIGH", 1: "LOW"}
+    input_size = 224
+    loads = 0
+    
+    def __init__(self, *args):
+        FakeBackend.loads += 1
+    
+    def infer(self, images):
+        return [np.array([0.7, 0.3]) for _ in images]
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    path = tmp_path / "weights" / "best.pt"
+    path.parent.mkdir()
+    path.write_bytes(b"weights v1")
+    monkeypatch.setattr(config, "MODEL_PATH", str(path))
+    monkeypatch.setattr(metrics, "create_backend", FakeBackend)
+    FakeBackend.loads = 0
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = metrics.EvalCache(str(tmp_path / "eval.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_fingerprint_follows_weights_content(weights, tmp_path):
+    before = model_fingerprint(weights, "torch")
+    os.utime(weights, ns=(1, 1))
+    moved = weights.rename(tmp_path / "moved.pt")
+    assert model_fingerprint(moved, "torch") == before
+    moved.write_bytes(b"weights v2")
+    assert model_fingerprint(moved, "torch") != before
+
+
+def test_eval_cache_agrees_with_service_and_manifests(weights, cache, tmp_path):
+    split = tmp_path / "val"
+    (split / "HIGH").mkdir(parents=True)
+    (split / "HIGH" / "broken.jpg").write_bytes(b"not an image")
+    run = metrics.evaluate(str(split), str(weights), cache=cache)
+    
+    decode_size = PredictionService.resolve_decode_size(FakeBackend.input_size)
+    service = PredictionService.model_identity(str(weights), config.INFERENCE_BACKEND, config.MODEL_PRECISION,
+                                               decode_size)
+    assert run["model"] == service
+    assert multi.FolderClassifier(backend=FakeBackend()).fingerprint == service
+
+
+def test_all_unreadable_images(weights, cache, tmp_path):
+    split = tmp_path / "val"
+    for name in ("HIGH", "LOW"):
+        (split / name).mkdir(parents=True)
+        (split / name / "broken.jpg").write_bytes(b"not an image")
+    
+    for _ in range(2):
+        run = metrics.evaluate(str(split), str(weights), cache=cache)
+        assert run["probs"].shape == (0, 2) and run["errors"] == 2
+    # Second run: input size, names and the error rows all came from the cache
+    assert FakeBackend.loads == 1 and run["cached"] == 2
+    
+    report = metrics.score(run)
+    assert report["images"] == 0 and report["accuracy"] == 0.0 and report["coverage"] == 0.0
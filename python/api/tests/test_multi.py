@@ -0,0 +1,114 @@
+"""
+Bulk classification pipeline (multi.py) with a stand-in backend
+Unreadable paths must become error records and a failed stage must end the run
+"""
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import pytest
+from PIL import Image
+import config
+import multi
+
+# Training batch mosaics shipped with the model: real images of the classified domain
+SAMPLE_IMAGES = sorted((config.BASE_DIR.parent / "model" / "final-version").glob("train_batch*.jpg"))
+
+
+class FakeBackend:
+    """Backend stand-in: every image is HIGH at 0.7"""
+    
+    name = "torch"
+    names = {0: "HIGH", 1: "LOW"}
+    input_size = 224
+    
+    def infer(self, images):
+        return [np.array([0.7, 0.3]) for _ in images]
+
+
+def run_with_timeout(fn, timeout=10):
+    """Run fn on a thread and fail the test instead of hanging the suite"""
+    outcome = {}
+    
+    def target():
+        try:
+            outcome["result"] = fn()
+        except Exception as e:
+            outcome["error"] = e
+    
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "run() did not return"
+    return outcome
+
+
+@pytest.fixture
+def classifier():
+    return multi.FolderClassifier(backend=FakeBackend(), decode_workers=2, batch_size=2, queue_depth=2)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for idx in range(5):
+        Image.new("RGB", (64, 64), (idx, 0, 0)).save(tmp_path / f"img{idx}.jpg")
+    return tmp_path
+
+
+def test_unreadable_paths_become_error_records(classifier, folder, monkeypatch):
+    os.symlink(folder / "missing.jpg", folder / "broken.jpg")
+    (folder / "locked").mkdir()
+    scandir = os.scandir
+    
+    def locked_scandir(path):
+        if str(path).endswith("locked"):
+            raise PermissionError(13, "Permission denied", str(path))
+        return scandir(path)
+    
+    monkeypatch.setattr(multi.os, "scandir", locked_scandir)
+    summary = run_with_timeout(lambda: classifier.run(str(folder), None, ""))["result"]
+    assert summary["images"] == 7 and summary["errors"] == 2
+    assert summary["classes"] == {"HIGH": 5}
+
+
+def test_failed_writer_raises(classifier, folder):
+    outcome = run_with_timeout(lambda: classifier.run(str(folder), str(folder / "missing" / "out.jsonl"), ""))
+    assert isinstance(outcome.get("error"), RuntimeError) and "write stage" in str(outcome["error"])
+
+
+def test_failed_walk_raises(classifier, folder, monkeypatch):
+    def failing_stat(path, *args, **kwargs):
+        raise RuntimeError("boom")
+    
+    monkeypatch.setattr(multi.os, "stat", failing_stat)
+    outcome = run_with_timeout(lambda: classifier.run(str(folder), None, ""))
+    assert isinstance(outcome.get("error"), RuntimeError) and "walk stage" in str(outcome["error"])
+
+
+def test_labels_match_original_cli(tmp_path):
+    """
+    Bulk labels against the original CLI call, model.predict(path, imgsz=640)
+    on the file (BGR via cv2), while the pipeline runs at the model's
+    imgsz. Needs torch/ultralytics and the trained weights.
+    """
+    pytest.importorskip("torch")
+    ultralytics = pytest.importorskip("ultralytics")
+    if not Path(config.MODEL_PATH).exists():
+        pytest.skip(f"Model weights not found: {config.MODEL_PATH}")
+    if not SAMPLE_IMAGES:
+        pytest.skip("No sample images")
+    from inference_backends import create_backend
+    
+    model = ultralytics.YOLO(config.MODEL_PATH)
+    expected = {}
+    for path in SAMPLE_IMAGES:
+        result = model.predict(str(path), imgsz=640, verbose=False)[0]
+        expected[path.name] = model.names[result.probs.top1]
+    
+    output = tmp_path / "results.jsonl"
+    classifier = multi.FolderClassifier(backend=create_backend())
+    assert "error" not in run_with_timeout(lambda: classifier.run(str(SAMPLE_IMAGES[0].parent), str(output), ""), 300)
+    with open(output) as output_file:
+        labels = {Path(record["path"]).name: record["class"] for record in map(json.loads, output_file)}
+    assert {name: labels[name] for name in expected} == expected
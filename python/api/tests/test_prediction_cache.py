@@ -0,0 +1,68 @@
+"""
+Prediction cache (prediction_cache.py) with its SQLite store
+An entry must expire ttl_seconds after it was put, however it is read back
+"""
+import time
+import pytest
+import prediction_cache
+from prediction_cache import PredictionCache
+
+TTL = 100
+RESULT = {"class": "HIGH", "confidence": 0.9}
+
+
+class Clock:
+    """Stand-in for the time module, moved by hand"""
+    
+    def __init__(self):
+        self.now = time.time()
+    
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, "time", clock)
+    return clock
+
+
+def open_cache(tmp_path, **kwargs):
+    return PredictionCache("model", ttl_seconds=TTL, disk_path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_memory_entry_expires(clock, tmp_path):
+    cache = PredictionCache("model", ttl_seconds=TTL, disk_path="")
+    key = cache.key(b"image")
+    cache.put(key, RESULT)
+    clock.now += TTL - 1
+    assert cache.get(key) == RESULT
+    clock.now += 2
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_hit_keeps_the_original_expiry(clock, tmp_path):
+    key = open_cache(tmp_path).key(b"image")
+    open_cache(tmp_path).put(key, RESULT)
+    # A restarted process finds the entry on disk only
+    clock.now += TTL - 10
+    cache = open_cache(tmp_path)
+    assert cache.get(key) == RESULT and cache.stats()["disk_hits"] == 1
+    # Served from memory now, but still gone TTL seconds after the put
+    clock.now += 5
+    assert cache.get(key) == RESULT and cache.stats()["hits"] == 1
+    clock.now += 6
+    assert cache.get(key) is None
+    assert open_cache(tmp_path).get(key) is None
+
+
+def test_evicted_entry_comes_back_from_disk(clock, tmp_path):
+    cache = open_cache(tmp_path, max_entries=1)
+    first, second = cache.key(b"first"), cache.key(b"second")
+    cache.put(first, RESULT)
+    cache.put(second, {**RESULT, "class": "LOW"})
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(first) == RESULT and cache.stats()["disk_hits"] == 1
+    assert cache.get(second)["class"] == "LOW"
@@ -0,0 +1,101 @@
+"""
+Request profiling (request_profiler.py)
+Only the newest traces are kept, and trace downloads never leave the trace directory
+"""
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import config
+import predict_controller
+import request_profiler
+from request_profiler import RequestProfiler
+
+
+def work():
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return {"class": "HIGH"}
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(str(tmp_path / "profiles"), max_traces=3, sample_rate=0.0, interval_ms=1)
+
+
+@pytest.fixture
+def client(profiler, monkeypatch):
+    """The profile routes, served from the test profiler"""
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(request_profiler, "_request_profiler", profiler)
+    app = FastAPI()
+    app.include_router(predict_controller.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("1", True), ("true", True), (" Yes ", True), ("on", True), ("0", False), ("false", False), ("", False)
+])
+def test_header_decides(profiler, header, expected):
+    assert profiler.should_profile(header) is expected
+
+
+def test_sample_rate_without_header(tmp_path, monkeypatch):
+    assert not RequestProfiler(str(tmp_path), sample_rate=0.0).should_profile(None)
+    sampled = RequestProfiler(str(tmp_path), sample_rate=0.25)
+    monkeypatch.setattr(request_profiler.random, "random", lambda: 0.2)
+    assert sampled.should_profile(None)
+    monkeypatch.setattr(request_profiler.random, "random", lambda: 0.3)
+    assert not sampled.should_profile(None)
+    # An explicit header wins over the sample rate
+    assert not sampled.should_profile("0")
+
+
+def test_ring_keeps_newest_traces(profiler):
+    ids = [profiler.wrap(work, "/test")()["profile_id"] for _ in range(5)]
+    traces = profiler.list()
+    assert [trace["id"] for trace in traces] == ids[:-4:-1]
+    assert sorted(path.name for path in profiler.directory.iterdir()) == sorted(
+        f"{trace_id}{suffix}" for trace_id in ids[-3:] for suffix in (".json", ".folded"))
+    assert traces[0]["route"] == "/test" and traces[0]["samples"] > 0
+    assert any(frame["frame"].startswith("request: ") for frame in traces[0]["top_frames"])
+
+
+def test_failed_request_keeps_its_trace(profiler):
+    def failing():
+        raise ValueError("boom")
+    
+    with pytest.raises(ValueError):
+        profiler.wrap(failing, "/test")()
+    assert profiler.list()[0]["error"] == "boom"
+
+
+@pytest.mark.parametrize("trace_id", [
+    "../etc/passwd", "../../profiles/x", "/etc/passwd", "0123456789abcdef012", "0123456789abcdef0123/..",
+    "0123456789ABCDEF0123", "0123456789abcdef0123\n", ""
+])
+def test_trace_path_rejects_other_ids(profiler, trace_id):
+    assert profiler.trace_path(trace_id) is None
+
+
+def test_trace_path_needs_an_existing_trace(profiler):
+    trace_id = profiler.wrap(work, "/test")()["profile_id"]
+    assert profiler.trace_path(trace_id) == profiler.directory / f"{trace_id}.folded"
+    assert profiler.trace_path("0" * 20) is None
+
+
+def test_download_stays_in_trace_directory(profiler, client, tmp_path):
+    (tmp_path / "secret.folded").write_text("secret")
+    trace_id = profiler.wrap(work, "/test")()["profile_id"]
+    response = client.get(f"/profiles/{trace_id}")
+    assert response.status_code == 200 and response.text == (profiler.directory / f"{trace_id}.folded").read_text()
+    for path in ("/profiles/..%2Fsecret", "/profiles/%2E%2E%2Fsecret", "/profiles/..%5Csecret", "/profiles/secret"):
+        response = client.get(path)
+        assert response.status_code == 404 and response.text != "secret"
+
+
+def test_download_disabled(profiler, client, monkeypatch):
+    trace_id = profiler.wrap(work, "/test")()["profile_id"]
+    monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+    assert client.get(f"/profiles/{trace_id}").status_code == 404
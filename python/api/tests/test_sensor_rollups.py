@@ -0,0 +1,119 @@
+"""
+Rollup tiers over the raw sensor history (sensor_rollups.py)
+Every tier must agree with the raw samples it summarizes, also after a restart
+"""
+from datetime import datetime, timezone
+import pytest
+from sensor_rollups import TIERS, SensorRollups
+from sensor_store import SensorStore
+
+BASE = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+SAMPLES = 3 * 43200
+END = BASE + (SAMPLES - 1) * 2
+KEEP = {tier: 3650 for tier in TIERS}
+
+
+def open_history(directory):
+    store = SensorStore(str(directory), retention_days=3650, flush_interval=3600, flush_records=1024)
+    return store, SensorRollups(store, retention_days=KEEP)
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    """Three days of 2 s samples from one sensor"""
+    directory = tmp_path_factory.mktemp("sensor")
+    store, rollups = open_history(directory)
+    for step in range(SAMPLES):
+        timestamp = store.append("DHT22_SENSOR_01", 20 + step % 10, 50 + step % 7, BASE + step * 2)
+        rollups.add("DHT22_SENSOR_01", 20 + step % 10, 50 + step % 7, timestamp)
+    yield directory, store, rollups
+    rollups.close()
+    store.close()
+
+
+@pytest.mark.parametrize("span, budget, expected", [
+    (600, 500, "raw"), (3 * 3600, 500, "1m"), (86400, 500, "15m"), (3 * 86400, 200, "1h"), (3 * 86400, 24, "1h")
+])
+def test_tiers_match_raw_samples(history, span, budget, expected):
+    _, store, rollups = history
+    result = rollups.history(END - span, END, budget)
+    points = result["points"]
+    assert result["tier"] == expected and 0 < len(points) <= budget
+    # Every point holds min/mean/max of the raw samples it covers
+    width = result["bucket_seconds"] or 1
+    for point in points[1:-1]:
+        temperatures = [sample[2] for sample in store.query(point[0], point[0] + width - 1e-6)]
+        assert point[1] == len(temperatures)
+        assert (point[2], point[4]) == (min(temperatures), max(temperatures))
+        assert point[3] == pytest.approx(sum(temperatures) / len(temperatures), abs=1e-3)
+
+
+def test_merged_hours_are_multiples_of_an_hour(history):
+    _, _, rollups = history
+    result = rollups.history(END - 3 * 86400, END, 24)
+    assert result["bucket_seconds"] % 3600 == 0 and result["bucket_seconds"] > 3600
+    assert sum(point[1] for point in result["points"]) == SAMPLES
+
+
+def test_choose_tier_counts_every_sensor(history):
+    _, _, rollups = history
+    # A sensor sampled every second overflows a budget a 2 s sensor fits in raw
+    assert rollups.choose_tier(END - 600, END, 500, [2.0])[0] == "raw"
+    assert rollups.choose_tier(END - 600, END, 500, [1.0])[0] == "1m"
+    assert rollups.choose_tier(END - 600, END, 500, [2.0, 2.0])[0] == "1m"
+
+
+def test_restore_after_restart(history):
+    directory, store, rollups = history
+    spans = (3 * 3600, 86400)
+    before = [rollups.history(END - span, END, 500)["points"] for span in spans]
+    rollups.close()
+    store.close()
+    store, rollups = open_history(directory)
+    # Open buckets come back from the raw store, finished ones are not emitted twice
+    assert rollups.restore(now=END) > 0
+    assert [rollups.history(END - span, END, 500)["points"] for span in spans] == before
+    rollups.close()
+    store.close()
+
+
+def test_raw_points_carry_their_sensor(tmp_path):
+    store, rollups = open_history(tmp_path)
+    for step in range(10):
+        sensor_id = "S1" if step % 2 else "S0"
+        store.append(sensor_id, 20 + step, 50, BASE + step)
+        rollups.add(sensor_id, 20 + step, 50, BASE + step)
+    result = rollups.history(BASE, BASE + 20, 500)
+    assert result["tier"] == "raw"
+    assert result["sensor_ids"] == ["S0", "S1"] * 5
+    assert [point[2] for point in result["points"]] == [20 + step for step in range(10)]
+    only = rollups.history(BASE, BASE + 20, 500, "S1")
+    assert only["sensor_ids"] == ["S1"] * 5
+    rollups.close()
+    store.close()
+
+
+def test_retention_per_tier(tmp_path):
+    # Two months of 10 minute samples, one monthly segment each per tier
+    store, rollups = open_history(tmp_path)
+    for step in range(59 * 144):
+        timestamp = store.append("S0", 20, 50, BASE + step * 600)
+        rollups.add("S0", 20, 50, timestamp)
+    rollups.logs["1m"].retention_days = 30
+    march = datetime(2025, 3, 15, tzinfo=timezone.utc).timestamp()
+    assert rollups.logs["1m"].enforce_retention(now=march) == ["202501.seg"]
+    assert rollups.logs["15m"].enforce_retention(now=march) == []
+    january = datetime(2025, 1, 31, tzinfo=timezone.utc).timestamp()
+    assert rollups.history(BASE, january, 50000)["tier"] == "1m"
+    assert rollups.history(BASE, january, 50000)["points"] == []
+    assert len(rollups.history(BASE, january, 5000)["points"]) == 30 * 96 + 1
+    rollups.close()
+    store.close()
+    
+    # Retention also runs when the tiers are opened: 2025 is long gone at a day of 1h rollups
+    store = SensorStore(str(tmp_path), retention_days=3650)
+    rollups = SensorRollups(store, retention_days={**KEEP, "1h": 1})
+    assert rollups.logs["1h"].stats()["segments"] == 0
+    assert rollups.logs["15m"].stats()["segments"] == 2
+    rollups.close()
+    store.close()
@@ -0,0 +1,110 @@
+"""
+Append-only sensor store (sensor_store.py)
+Torn or corrupt tails must be cut on open, retention must only drop whole old days
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+from sensor_store import SEGMENT_SUFFIX, SensorStore
+
+BASE = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+STEP = 60
+DAYS = 3
+SAMPLES = DAYS * 86400 // STEP
+
+
+def open_store(directory, **kwargs):
+    return SensorStore(str(directory), **{"retention_days": 3650, "flush_interval": 3600, **kwargs})
+
+
+@pytest.fixture
+def directory(tmp_path):
+    """Three days of one-minute samples from two sensors, closed (flushed) afterwards"""
+    store = open_store(tmp_path, flush_records=256)
+    for step in range(SAMPLES):
+        store.append("S1" if step % 2 else "S0", 20 + step % 10, 50 + step % 7, BASE + step * STEP)
+    store.close()
+    return tmp_path
+
+
+def segments(directory):
+    return sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+
+
+def segments_name(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y%m%d") + SEGMENT_SUFFIX
+
+
+def test_query_window(directory):
+    store = open_store(directory)
+    window = list(store.query(BASE + 86400 + 3600, BASE + 86400 + 7200))
+    assert len(window) == 61 and window[0][0] == BASE + 86400 + 3600
+    assert {sensor_id for _, sensor_id, _, _ in window} == {"S0", "S1"}
+    assert len(list(store.query(BASE + 86400 + 3600, BASE + 86400 + 7200, "S1"))) == 30
+    assert list(store.query(BASE, BASE + 86400, "unknown")) == []
+    assert len(segments(directory)) == DAYS
+    store.close()
+
+
+def test_torn_tail_is_cut(directory):
+    with open(segments(directory)[-1], "ab") as segment_file:
+        segment_file.write(b"\x00" * 7)
+    store = open_store(directory)
+    assert store.log.recovered_bytes == 7
+    assert store.last_timestamp == BASE + (SAMPLES - 1) * STEP
+    assert len(list(store.query(BASE, BASE + DAYS * 86400))) == SAMPLES
+    store.close()
+
+
+def test_crc_mismatch_tail_is_cut(directory):
+    last = segments(directory)[-1]
+    data = bytearray(last.read_bytes())
+    # Flip a temperature byte of the last record, its checksum no longer matches
+    data[-10] ^= 0xFF
+    last.write_bytes(bytes(data))
+    store = open_store(directory)
+    assert store.log.recovered_bytes == store.log.record.size
+    assert store.last_timestamp == BASE + (SAMPLES - 2) * STEP
+    assert last.stat().st_size == len(data) - store.log.record.size
+    # New samples continue after the last valid one
+    store.append("S0", 21, 55, BASE + (SAMPLES - 1) * STEP)
+    store.close()
+    assert len(list(open_store(directory).query(BASE, BASE + DAYS * 86400))) == SAMPLES
+
+
+def test_corrupt_record_inside_segment_is_skipped(directory):
+    first = segments(directory)[0]
+    data = bytearray(first.read_bytes())
+    data[100 * 22 + 10] ^= 0xFF
+    first.write_bytes(bytes(data))
+    store = open_store(directory)
+    timestamps = [timestamp for timestamp, _, _, _ in store.query(BASE, BASE + 86400 - 1)]
+    assert len(timestamps) == 86400 // STEP - 1 and BASE + 100 * STEP not in timestamps
+    store.close()
+
+
+def test_retention_drops_whole_old_days(directory):
+    store = open_store(directory)
+    store.log.retention_days = 2
+    # Day 0 still overlaps the window that starts 2 days before now
+    assert store.enforce_retention(now=BASE + 2 * 86400 + 1) == []
+    deleted = store.enforce_retention(now=BASE + 3 * 86400 + 1)
+    assert deleted == [segments_name(BASE)]
+    assert len(segments(directory)) == DAYS - 1
+    assert list(store.query(BASE, BASE + 86400 - 1)) == []
+    store.close()
+
+
+def test_retention_runs_on_open(directory):
+    # The samples are from 2025, a day of retention leaves none of them
+    open_store(directory, retention_days=1).close()
+    assert segments(directory) == []
+
+
+def test_backward_clock_step_is_clamped(tmp_path):
+    store = open_store(tmp_path)
+    store.append("S0", 20, 50, BASE + 10)
+    assert store.append("S0", 20, 50, BASE + 5) == BASE + 10
+    # Buffered samples are visible before they are flushed
+    assert [timestamp for timestamp, _, _, _ in store.query(BASE, BASE + 20)] == [BASE + 10, BASE + 10]
+    store.close()
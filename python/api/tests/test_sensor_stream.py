@@ -0,0 +1,67 @@
+"""
+Server-Sent Events stream (sensor_controller.stream_sensor)
+A stream holds a subscriber slot only while its body is streamed
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+import sensor_controller
+from sensor_controller import sensor_service, stream_sensor
+
+
+class DisconnectedRequest:
+    """Request of a client that is already gone"""
+    
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def no_latest_frames(monkeypatch):
+    monkeypatch.setattr(sensor_controller, "latest_frames", lambda sensor_id: [])
+
+
+def subscribers():
+    return sensor_service.broadcaster.stats()["subscribers"]
+
+
+def test_unstarted_stream_holds_no_slot():
+    async def scenario():
+        # A client that leaves before the body is sent never starts the generator
+        await stream_sensor(DisconnectedRequest(), None)
+        assert subscribers() == 0
+    
+    asyncio.run(scenario())
+    assert subscribers() == 0
+
+
+def test_slot_released_after_the_stream():
+    async def scenario():
+        response = await stream_sensor(DisconnectedRequest(), None)
+        body = response.body_iterator
+        assert await body.__anext__() == "retry: 3000\n\n"
+        assert subscribers() == 1
+        assert [chunk async for chunk in body] == []
+    
+    asyncio.run(scenario())
+    assert subscribers() == 0
+
+
+def test_subscriber_limit(monkeypatch):
+    monkeypatch.setattr(sensor_service.broadcaster, "max_subscribers", 1)
+    
+    async def scenario():
+        first = (await stream_sensor(DisconnectedRequest(), None)).body_iterator
+        racing = (await stream_sensor(DisconnectedRequest(), None)).body_iterator
+        await first.__anext__()
+        with pytest.raises(HTTPException) as error:
+            await stream_sensor(DisconnectedRequest(), None)
+        assert error.value.status_code == 503
+        # A stream that passed the check but lost the slot ends with an error event
+        assert [chunk async for chunk in racing] == [
+            'event: error\ndata: {"error": "Sensor stream is limited to 1 subscribers"}\n\n'
+        ]
+        await first.aclose()
+    
+    asyncio.run(scenario())
+    assert subscribers() == 0
@@ -0,0 +1,67 @@
+"""
+Telemetry metrics updated from many threads at once
+No increment or observation may be lost to a concurrent update
+"""
+import sys
+import threading
+import pytest
+from telemetry import Counter, Gauge, Histogram, Registry
+
+THREADS = 8
+UPDATES = 20000
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    # Switch threads as often as possible so racing updates interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def hammer(update):
+    barrier = threading.Barrier(THREADS)
+    
+    def worker():
+        barrier.wait()
+        for _ in range(UPDATES):
+            update()
+    
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_counter_and_gauge_keep_every_increment():
+    counter, gauge = Counter(), Gauge()
+    
+    def update():
+        counter.inc()
+        gauge.inc(2)
+        gauge.dec()
+    
+    hammer(update)
+    assert counter.value == THREADS * UPDATES
+    assert gauge.value == THREADS * UPDATES
+
+
+def test_histogram_keeps_every_observation():
+    histogram = Histogram([1, 10])
+    hammer(lambda: histogram.observe(5))
+    counts, count, total = histogram.values()
+    assert counts == [0, THREADS * UPDATES, 0]
+    assert count == THREADS * UPDATES and total == 5 * THREADS * UPDATES
+
+
+def test_render_matches_updates():
+    registry = Registry()
+    counter = registry.counter("test_requests_total", "Requests", ("route",)).labels("/predict")
+    histogram = registry.histogram("test_latency_ms", "Latency", [1, 10])
+    hammer(lambda: (counter.inc(), histogram.observe(0.5)))
+    text = registry.render()
+    assert f'test_requests_total{{route="/predict"}} {THREADS * UPDATES}' in text
+    assert f'test_latency_ms_bucket{{le="1"}} {THREADS * UPDATES}' in text
+    assert f"test_latency_ms_count {THREADS * UPDATES}" in text